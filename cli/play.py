@@ -55,9 +55,21 @@ class PlayConfig:
     leader: int
     players: List[str]
     replay_out: Optional[str]
+    search_budget_ms: float = 200.0
+    search_workers: int = 1
 
 
-def _build_policies(config: PlayConfig) -> List[Callable]:
+def _build_search_agent(config: PlayConfig):
+    if config.search_workers > 1:
+        from search.parallel import ParallelSearch
+
+        return ParallelSearch(config.search_workers, seed=config.seed or 0)
+    from search.ismcts import ISMCTSAgent
+
+    return ISMCTSAgent(seed=config.seed)
+
+
+def _build_policies(config: PlayConfig, search_agent=None) -> List[Callable]:
     policies: List[Callable] = []
     for idx, kind in enumerate(config.players):
         if kind == "human":
@@ -67,23 +79,39 @@ def _build_policies(config: PlayConfig) -> List[Callable]:
             policies.append(_policy_random(rng))
         elif kind == "low":
             policies.append(_policy_lowest)
+        elif kind == "mcts":
+            from search.anytime import deadline_policy
+
+            policies.append(deadline_policy(search_agent, config.search_budget_ms))
         else:
             raise ValueError(f"unknown player type: {kind}")
     return policies
 
 
 def run(config: PlayConfig) -> None:
-    policies = _build_policies(config)
-    result = play_round(
-        policies,
-        mode=config.mode,
-        trump_suit=config.trump_suit,
-        seed=config.seed,
-        leader=config.leader,
-    )
+    search_agent = _build_search_agent(config) if "mcts" in config.players else None
+    policies = _build_policies(config, search_agent)
+    try:
+        result = play_round(
+            policies,
+            mode=config.mode,
+            trump_suit=config.trump_suit,
+            seed=config.seed,
+            leader=config.leader,
+        )
+    finally:
+        if search_agent is not None and hasattr(search_agent, "close"):
+            search_agent.close()
 
     print("Round finished.")
     print(f"Team points: {result.state.team_points}")
+    if search_agent is not None:
+        latency = search_agent.latency.summary()
+        print(
+            "Search latency ms: "
+            f"p50={latency['p50']:.1f} p95={latency['p95']:.1f} p99={latency['p99']:.1f} "
+            f"max={latency['max']:.1f} (mean iterations {latency['mean_iterations']:.0f})"
+        )
 
     if config.replay_out:
         from cli.replay import build_replay, save_replay
@@ -108,9 +136,13 @@ def _parse_args() -> PlayConfig:
     parser.add_argument(
         "--players",
         default="low,low,low,low",
-        help="Comma list for 4 players: low,random,human",
+        help="Comma list for 4 players: low,random,human,mcts",
     )
     parser.add_argument("--replay-out")
+    parser.add_argument(
+        "--search-budget-ms", type=float, default=200.0, help="Per-move budget for mcts players"
+    )
+    parser.add_argument("--search-workers", type=int, default=1)
     args = parser.parse_args()
 
     players = [p.strip() for p in args.players.split(",") if p.strip()]
@@ -128,6 +160,8 @@ def _parse_args() -> PlayConfig:
         leader=args.leader,
         players=players,
         replay_out=args.replay_out,
+        search_budget_ms=args.search_budget_ms,
+        search_workers=max(1, args.search_workers),
     )
 
 
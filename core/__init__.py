@@ -13,6 +13,8 @@ from .scoring import (
     trick_points,
 )
 from .state import GameState, Trick, TrickResult
+from .beliefs import BeliefTracker
+from .determinization import DealConstraints, DealSampler, determinize, infer_constraints, sample_deals
 
 __all__ = [
     "ALL_CARDS",
@@ -46,4 +48,10 @@ __all__ = [
     "UNEUFE_POINTS",
     "card_points",
     "trick_points",
+    "BeliefTracker",
+    "DealConstraints",
+    "DealSampler",
+    "determinize",
+    "infer_constraints",
+    "sample_deals",
 ]
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from .cards import CARD_INDEX, FULL_MASK, SUIT_MASKS, SUITS, Card, MODE_TRUMP
+from .legal_moves import RuleSet
+from .rankings import card_strength
+from .state import GameState
+
+SUIT_BITS = {suit: 1 << idx for idx, suit in enumerate(SUITS)}
+
+
+def _trump_mask_above(card: Card, trump_suit: str) -> int:
+    # Trumps that beat `card` (itself a trump).
+    floor = card_strength(card, trump_suit, MODE_TRUMP, trump_suit)
+    mask = 0
+    for other, idx in CARD_INDEX.items():
+        if other.suit == trump_suit and card_strength(
+            other, trump_suit, MODE_TRUMP, trump_suit
+        ) > floor:
+            mask |= 1 << idx
+    return mask
+
+
+_OVERTRUMP_MASKS = {
+    card: _trump_mask_above(card, card.suit) for card in CARD_INDEX
+}
+
+
+class BeliefTracker:
+    # Public knowledge about who may still hold which card. Every play updates
+    # the tracker in constant time: the played card leaves all hands, and if the
+    # play reveals a void (failing to follow, declining to trump) or a missing
+    # overtrump, those cards leave the player's possible set.
+
+    def __init__(
+        self,
+        mode: str,
+        trump_suit: Optional[str] = None,
+        ruleset: Optional[RuleSet] = None,
+    ) -> None:
+        self.ruleset = ruleset or RuleSet()
+        self.reset(mode, trump_suit)
+
+    def reset(self, mode: str, trump_suit: Optional[str] = None) -> None:
+        if mode == MODE_TRUMP and trump_suit is None:
+            raise ValueError("trump_suit is required for trump mode")
+        self.mode = mode
+        self.trump_suit = trump_suit if mode == MODE_TRUMP else None
+        self.possible: List[int] = [FULL_MASK] * 4
+        self.voids: List[int] = [0] * 4
+        self.played = 0
+        self._trick: List[Card] = []
+        self._winner = 0
+        self._winning: Optional[Card] = None
+        self._top_trump: Optional[Card] = None
+
+    @classmethod
+    def from_state(cls, state: GameState, ruleset: Optional[RuleSet] = None) -> "BeliefTracker":
+        tracker = cls(state.mode, state.trump_suit, ruleset=ruleset)
+        for trick in state.completed_tricks:
+            for player, card in trick.plays:
+                tracker.record_play(player, card)
+        for player, card in state.trick.plays:
+            tracker.record_play(player, card)
+        return tracker
+
+    def exclusions(self, player: int, card: Card) -> int:
+        if not self._trick:
+            return 0
+        rules = self.ruleset
+        led_suit = self._trick[0].suit
+        trump_suit = self.trump_suit
+        excluded = 0
+
+        if rules.must_follow_suit:
+            if card.suit == led_suit:
+                if led_suit == trump_suit and rules.must_overtrump:
+                    excluded |= self._missing_overtrumps(card)
+                return excluded
+            excluded |= SUIT_MASKS[led_suit]
+
+        if trump_suit is not None and rules.must_trump:
+            partner_is_winning = self._winner == GameState.partner(player)
+            if not partner_is_winning or rules.must_trump_if_partner_winning:
+                if card.suit != trump_suit:
+                    excluded |= SUIT_MASKS[trump_suit]
+                elif rules.must_overtrump:
+                    excluded |= self._missing_overtrumps(card)
+        return excluded
+
+    def _missing_overtrumps(self, card: Card) -> int:
+        # Undertrumping is only legal without a trump that beats the trick.
+        if self._top_trump is None:
+            return 0
+        above = _OVERTRUMP_MASKS[self._top_trump]
+        if above >> CARD_INDEX[card] & 1:
+            return 0
+        return above
+
+    def record_play(self, player: int, card: Card) -> None:
+        bit = 1 << CARD_INDEX[card]
+        excluded = self.exclusions(player, card)
+        if excluded:
+            self.possible[player] &= ~excluded
+            for suit in (self._trick[0].suit, self.trump_suit):
+                if suit is not None and excluded & SUIT_MASKS[suit] == SUIT_MASKS[suit]:
+                    self.voids[player] |= SUIT_BITS[suit]
+        for seat in range(4):
+            self.possible[seat] &= ~bit
+        self.played |= bit
+
+        if not self._trick:
+            self._winner = player
+            self._winning = card
+        elif card_strength(card, self._trick[0].suit, self.mode, self.trump_suit) > card_strength(
+            self._winning, self._trick[0].suit, self.mode, self.trump_suit
+        ):
+            self._winner = player
+            self._winning = card
+        if card.suit == self.trump_suit and (
+            self._top_trump is None or _OVERTRUMP_MASKS[self._top_trump] & bit
+        ):
+            self._top_trump = card
+        self._trick.append(card)
+
+        if len(self._trick) == 4:
+            self._trick = []
+            self._winning = None
+            self._top_trump = None
+
+    def may_hold(self, player: int, card: Card) -> bool:
+        return bool(self.possible[player] >> CARD_INDEX[card] & 1)
+
+    def is_void(self, player: int, suit: str) -> bool:
+        return bool(self.voids[player] & SUIT_BITS[suit])
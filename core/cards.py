@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 # Generic suits/ranks; use a consistent ordering for deck creation.
 SUITS: Tuple[str, ...] = ("schellen", "rosen", "schilten", "eicheln")
@@ -38,3 +38,27 @@ def iter_deck() -> Iterable[Card]:
 
 
 ALL_CARDS: Tuple[Card, ...] = tuple(iter_deck())
+
+CARD_INDEX: Dict[Card, int] = {card: idx for idx, card in enumerate(ALL_CARDS)}
+
+# Card sets as 36-bit ints (bit i <-> ALL_CARDS[i]), suit-major like the deck.
+FULL_MASK = (1 << len(ALL_CARDS)) - 1
+SUIT_MASKS: Dict[str, int] = {
+    suit: ((1 << len(RANKS)) - 1) << (idx * len(RANKS)) for idx, suit in enumerate(SUITS)
+}
+
+
+def card_mask(cards: Iterable[Card]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << CARD_INDEX[card]
+    return mask
+
+
+def mask_cards(mask: int) -> List[Card]:
+    cards: List[Card] = []
+    while mask:
+        low = mask & -mask
+        cards.append(ALL_CARDS[low.bit_length() - 1])
+        mask ^= low
+    return cards
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import random
+from bisect import bisect_right
+from dataclasses import dataclass
+from math import factorial
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .cards import ALL_CARDS, FULL_MASK, Card, card_mask, mask_cards
+from .beliefs import BeliefTracker
+from .legal_moves import RuleSet
+from .state import GameState, Trick
+
+Deal = Tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class DealConstraints:
+    player: int
+    # Per seat: cards it may hold (for `player` exactly its own hand).
+    allowed: Tuple[int, int, int, int]
+    hand_sizes: Tuple[int, int, int, int]
+    unseen: int
+
+
+def tracker_constraints(
+    tracker: BeliefTracker, player: int, hand: Iterable[Card], hand_sizes: Sequence[int]
+) -> DealConstraints:
+    own = card_mask(hand)
+    unseen = FULL_MASK & ~own & ~tracker.played
+    allowed = tuple(
+        own if seat == player else tracker.possible[seat] & unseen for seat in range(4)
+    )
+    return DealConstraints(
+        player=player,
+        allowed=allowed,  # type: ignore[arg-type]
+        hand_sizes=tuple(hand_sizes),  # type: ignore[arg-type]
+        unseen=unseen,
+    )
+
+
+def infer_constraints(
+    state: GameState,
+    player: int,
+    ruleset: Optional[RuleSet] = None,
+    tracker: Optional[BeliefTracker] = None,
+) -> DealConstraints:
+    # Pass a tracker that has followed the round to skip replaying the history.
+    if tracker is None:
+        tracker = BeliefTracker.from_state(state, ruleset=ruleset)
+    return tracker_constraints(
+        tracker, player, state.hands[player], [len(hand) for hand in state.hands]
+    )
+
+
+def _compositions(total: int, caps: Sequence[int]) -> Iterator[Tuple[int, ...]]:
+    if len(caps) == 1:
+        if total <= caps[0]:
+            yield (total,)
+        return
+    for first in range(min(total, caps[0]) + 1):
+        for rest in _compositions(total - first, caps[1:]):
+            yield (first,) + rest
+
+
+# Exact uniform sampling over all deals consistent with the constraints. Unseen
+# cards are grouped by the set of seats that may hold them and a DP over the
+# groups counts completions, so a draw is a single pass without rejection. The
+# DP table is shared by all draws, which keeps large batches cheap.
+class DealSampler:
+    def __init__(self, constraints: DealConstraints) -> None:
+        self.constraints = constraints
+        self.others = [seat for seat in range(4) if seat != constraints.player]
+
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        remaining = constraints.unseen
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            seats = tuple(
+                slot
+                for slot, seat in enumerate(self.others)
+                if constraints.allowed[seat] & bit
+            )
+            if not seats:
+                card = ALL_CARDS[bit.bit_length() - 1]
+                raise ValueError(f"no seat may hold {card}")
+            groups.setdefault(seats, []).append(bit)
+        self._groups = sorted(groups.items())
+
+        sizes = tuple(constraints.hand_sizes[seat] for seat in self.others)
+        if sum(sizes) != bin(constraints.unseen).count("1"):
+            raise ValueError("hand sizes do not match unseen cards")
+        self._sizes = sizes
+        self._table: Dict[Tuple[int, Tuple[int, ...]], Tuple[int, List[int], List[Tuple[int, ...]]]] = {}
+        self.count = self._ways(0, sizes)
+        if self.count == 0:
+            raise ValueError("constraints admit no deal")
+
+    def _ways(self, group: int, remaining: Tuple[int, ...]) -> int:
+        if group == len(self._groups):
+            return 1 if not any(remaining) else 0
+        key = (group, remaining)
+        cached = self._table.get(key)
+        if cached is not None:
+            return cached[0]
+
+        seats, bits = self._groups[group]
+        size = len(bits)
+        total = 0
+        cumulative: List[int] = []
+        splits: List[Tuple[int, ...]] = []
+        for parts in _compositions(size, [remaining[slot] for slot in seats]):
+            split = [0] * len(remaining)
+            for slot, count in zip(seats, parts):
+                split[slot] = count
+            rest = tuple(r - s for r, s in zip(remaining, split))
+            ways = self._ways(group + 1, rest)
+            if not ways:
+                continue
+            multinomial = factorial(size)
+            for count in parts:
+                multinomial //= factorial(count)
+            total += multinomial * ways
+            cumulative.append(total)
+            splits.append(tuple(split))
+        self._table[key] = (total, cumulative, splits)
+        return total
+
+    def sample_mask(self, rng: random.Random) -> Deal:
+        masks = [0, 0, 0]
+        remaining = self._sizes
+        for group, (_, bits) in enumerate(self._groups):
+            total, cumulative, splits = self._table[(group, remaining)]
+            split = splits[bisect_right(cumulative, rng.randrange(total))]
+            shuffled = list(bits)
+            rng.shuffle(shuffled)
+            pos = 0
+            for slot, count in enumerate(split):
+                for bit in shuffled[pos : pos + count]:
+                    masks[slot] |= bit
+                pos += count
+            remaining = tuple(r - s for r, s in zip(remaining, split))
+
+        deal = [0, 0, 0, 0]
+        deal[self.constraints.player] = self.constraints.allowed[self.constraints.player]
+        for slot, seat in enumerate(self.others):
+            deal[seat] = masks[slot]
+        return tuple(deal)  # type: ignore[return-value]
+
+    def sample_masks(self, n: int, rng: random.Random) -> List[Deal]:
+        return [self.sample_mask(rng) for _ in range(n)]
+
+    def sample(self, rng: random.Random) -> List[List[Card]]:
+        return [mask_cards(mask) for mask in self.sample_mask(rng)]
+
+
+def sample_deals(
+    state: GameState,
+    player: int,
+    n: int,
+    rng: Optional[random.Random] = None,
+    ruleset: Optional[RuleSet] = None,
+    tracker: Optional[BeliefTracker] = None,
+) -> List[Deal]:
+    sampler = DealSampler(infer_constraints(state, player, ruleset=ruleset, tracker=tracker))
+    return sampler.sample_masks(n, rng or random.Random())
+
+
+def with_hands(state: GameState, hands: List[List[Card]]) -> GameState:
+    return GameState(
+        hands=hands,
+        mode=state.mode,
+        trump_suit=state.trump_suit,
+        leader=state.leader,
+        trick_index=state.trick_index,
+        trick=Trick(plays=list(state.trick.plays)),
+        team_points=list(state.team_points),
+        completed_tricks=list(state.completed_tricks),
+    )
+
+
+def determinize(
+    state: GameState,
+    player: int,
+    rng: Optional[random.Random] = None,
+    ruleset: Optional[RuleSet] = None,
+    tracker: Optional[BeliefTracker] = None,
+) -> GameState:
+    sampler = DealSampler(infer_constraints(state, player, ruleset=ruleset, tracker=tracker))
+    hands = sampler.sample(rng or random.Random())
+    hands[player] = list(state.hands[player])
+    return with_hands(state, hands)
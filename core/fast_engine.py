@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import random
+from typing import List, Optional, Sequence, Tuple
+
+from .cards import ALL_CARDS, CARD_INDEX, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, RANKS, SUITS, card_mask
+from .legal_moves import RuleSet
+from .rankings import card_strength
+from .scoring import card_points
+from .state import GameState
+
+# Compact round engine for search and rollouts: cards are ints (ALL_CARDS
+# index), hands are 36-bit masks and the six mode variants (four trump suits,
+# Obeabe, Uneufe) index precomputed tables. Rules follow core.legal_moves.
+
+VARIANTS: Tuple[Tuple[str, Optional[str]], ...] = tuple(
+    [(MODE_TRUMP, suit) for suit in SUITS] + [(MODE_OBEABE, None), (MODE_UNEUFE, None)]
+)
+VARIANT_INDEX = {variant: idx for idx, variant in enumerate(VARIANTS)}
+SUIT_COUNT = len(SUITS)
+SUIT_SIZE = len(RANKS)
+SUIT_MASK_LIST = [((1 << SUIT_SIZE) - 1) << (idx * SUIT_SIZE) for idx in range(SUIT_COUNT)]
+
+
+def variant_index(mode: str, trump_suit: Optional[str] = None) -> int:
+    if mode != MODE_TRUMP:
+        trump_suit = None
+    key = (mode, trump_suit)
+    if key not in VARIANT_INDEX:
+        raise ValueError(f"unknown mode: {mode} / {trump_suit}")
+    return VARIANT_INDEX[key]
+
+
+def _build_tables():
+    points: List[List[int]] = []
+    strength: List[List[List[int]]] = []
+    overtrumps: List[List[int]] = []
+    for mode, trump_suit in VARIANTS:
+        points.append([card_points(card, mode, trump_suit) for card in ALL_CARDS])
+        by_led = []
+        for led_suit in SUITS:
+            row = []
+            for card in ALL_CARDS:
+                tier, score = card_strength(card, led_suit, mode, trump_suit)
+                row.append(tier * 16 + score)
+            by_led.append(row)
+        strength.append(by_led)
+        over = []
+        for card in ALL_CARDS:
+            mask = 0
+            if trump_suit is not None and card.suit == trump_suit:
+                for other in ALL_CARDS:
+                    if other.suit == trump_suit and by_led[0][CARD_INDEX[other]] > by_led[0][CARD_INDEX[card]]:
+                        mask |= 1 << CARD_INDEX[other]
+            over.append(mask)
+        overtrumps.append(over)
+    return points, strength, overtrumps
+
+
+POINTS, STRENGTH, OVERTRUMPS = _build_tables()
+TRUMP_SUIT_INDEX = [SUITS.index(trump) if trump else -1 for _, trump in VARIANTS]
+
+
+def iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def random_card(mask: int, rng: random.Random) -> int:
+    cards = list(iter_bits(mask))
+    return cards[rng.randrange(len(cards))] if len(cards) > 1 else cards[0]
+
+
+def legal_mask(
+    hand: int,
+    led: int,
+    variant: int,
+    partner_is_winning: bool,
+    top_trump: int,
+    rules: RuleSet,
+) -> int:
+    # Legal cards for a non-leading player; `led` is the led suit index and
+    # `top_trump` the highest trump in the trick (-1 if none).
+    if rules.must_follow_suit:
+        suited = hand & SUIT_MASK_LIST[led]
+        if suited:
+            if led == TRUMP_SUIT_INDEX[variant] and rules.must_overtrump and top_trump >= 0:
+                return suited & OVERTRUMPS[variant][top_trump] or suited
+            return suited
+
+    trump = TRUMP_SUIT_INDEX[variant]
+    if trump >= 0 and rules.must_trump:
+        if not partner_is_winning or rules.must_trump_if_partner_winning:
+            trumps = hand & SUIT_MASK_LIST[trump]
+            if trumps:
+                if rules.must_overtrump and top_trump >= 0:
+                    return trumps & OVERTRUMPS[variant][top_trump] or trumps
+                return trumps
+    return hand
+
+
+class FastState:
+    __slots__ = (
+        "hands",
+        "variant",
+        "leader",
+        "trick",
+        "winner",
+        "top",
+        "top_trump",
+        "points",
+        "tricks_played",
+        "rules",
+    )
+
+    def __init__(
+        self,
+        hands: Sequence[int],
+        variant: int,
+        leader: int = 0,
+        rules: Optional[RuleSet] = None,
+    ) -> None:
+        self.hands = list(hands)
+        self.variant = variant
+        self.leader = leader
+        self.trick: List[int] = []
+        self.winner = leader
+        self.top = -1
+        self.top_trump = -1
+        self.points = [0, 0]
+        self.tricks_played = 0
+        self.rules = rules or RuleSet()
+
+    @classmethod
+    def from_game_state(
+        cls,
+        state: GameState,
+        hands: Optional[Sequence[int]] = None,
+        rules: Optional[RuleSet] = None,
+    ) -> "FastState":
+        if hands is None:
+            hands = [card_mask(hand) for hand in state.hands]
+        fast = cls(hands, variant_index(state.mode, state.trump_suit), state.leader, rules)
+        fast.points = list(state.team_points)
+        fast.tricks_played = len(state.completed_tricks)
+        for player, card in state.trick.plays:
+            fast.add_to_trick(player, CARD_INDEX[card])
+        return fast
+
+    def clone(self) -> "FastState":
+        other = FastState.__new__(FastState)
+        other.hands = self.hands[:]
+        other.variant = self.variant
+        other.leader = self.leader
+        other.trick = self.trick[:]
+        other.winner = self.winner
+        other.top = self.top
+        other.top_trump = self.top_trump
+        other.points = self.points[:]
+        other.tricks_played = self.tricks_played
+        other.rules = self.rules
+        return other
+
+    def reset(self, hands: Sequence[int], variant: int, leader: int = 0) -> None:
+        # Starts a new round in place, keeping the rules (same as __init__).
+        self.hands[:] = hands
+        self.variant = variant
+        self.leader = leader
+        self.trick.clear()
+        self.winner = leader
+        self.top = -1
+        self.top_trump = -1
+        self.points[:] = (0, 0)
+        self.tricks_played = 0
+
+    @property
+    def current_player(self) -> int:
+        return (self.leader + len(self.trick)) % 4
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.tricks_played == 9
+
+    def legal_mask(self) -> int:
+        player = (self.leader + len(self.trick)) % 4
+        if not self.trick:
+            return self.hands[player]
+        return legal_mask(
+            self.hands[player],
+            self.trick[0] // SUIT_SIZE,
+            self.variant,
+            self.winner == (player + 2) % 4,
+            self.top_trump,
+            self.rules,
+        )
+
+    def add_to_trick(self, player: int, card: int) -> None:
+        if not self.trick:
+            self.winner = player
+            self.top = card
+        else:
+            row = STRENGTH[self.variant][self.trick[0] // SUIT_SIZE]
+            if row[card] > row[self.top]:
+                self.winner = player
+                self.top = card
+        if card // SUIT_SIZE == TRUMP_SUIT_INDEX[self.variant] and (
+            self.top_trump < 0 or OVERTRUMPS[self.variant][self.top_trump] >> card & 1
+        ):
+            self.top_trump = card
+        self.trick.append(card)
+
+    def play(self, card: int) -> None:
+        player = (self.leader + len(self.trick)) % 4
+        self.hands[player] &= ~(1 << card)
+        self.add_to_trick(player, card)
+        if len(self.trick) == 4:
+            self._resolve_trick()
+
+    def _resolve_trick(self) -> None:
+        table = POINTS[self.variant]
+        points = table[self.trick[0]] + table[self.trick[1]] + table[self.trick[2]] + table[self.trick[3]]
+        self.tricks_played += 1
+        if self.tricks_played == 9:
+            points += 5
+        self.points[self.winner % 2] += points
+        self.leader = self.winner
+        self.trick = []
+        self.top = -1
+        self.top_trump = -1
+
+
+def random_playout(state: FastState, rng: random.Random) -> List[int]:
+    # Plays `state` to the end in place and returns the final team points.
+    while state.tricks_played < 9:
+        state.play(random_card(state.legal_mask(), rng))
+    return state.points
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable
+
+PHASES = ("bidding", "announce", "play")
+
+
+@dataclass
+class EnvStats:
+    # Counters filled by instrumented envs (instrument=True). Instrumentation
+    # replaces the env's methods with timed wrappers on the instance, so an env
+    # without it runs the plain methods at no cost.
+    phase_steps: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(PHASES, 0))
+    phase_seconds: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+    section_calls: Dict[str, int] = field(default_factory=dict)
+    section_seconds: Dict[str, float] = field(default_factory=dict)
+    opponent_calls: int = 0
+    opponent_seconds: float = 0.0
+    # Learner-facing steps of a single-agent env, including opponent time.
+    agent_steps: int = 0
+    agent_seconds: float = 0.0
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        self.phase_steps[phase] = self.phase_steps.get(phase, 0) + 1
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    def timed_section(self, name: str, fn: Callable) -> Callable:
+        calls = self.section_calls
+        seconds = self.section_seconds
+        calls.setdefault(name, 0)
+        seconds.setdefault(name, 0.0)
+
+        def _timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                calls[name] += 1
+                seconds[name] += time.perf_counter() - started
+
+        return _timed
+
+    def timed_opponent(self, policy: Callable) -> Callable:
+        def _timed(env, agent):
+            started = time.perf_counter()
+            try:
+                return policy(env, agent)
+            finally:
+                self.opponent_calls += 1
+                self.opponent_seconds += time.perf_counter() - started
+
+        return _timed
+
+    def merge(self, other: "EnvStats") -> "EnvStats":
+        merged = EnvStats()
+        for source in (self, other):
+            for target_dict, source_dict in (
+                (merged.phase_steps, source.phase_steps),
+                (merged.phase_seconds, source.phase_seconds),
+                (merged.section_calls, source.section_calls),
+                (merged.section_seconds, source.section_seconds),
+            ):
+                for key, value in source_dict.items():
+                    target_dict[key] = target_dict.get(key, 0) + value
+            merged.opponent_calls += source.opponent_calls
+            merged.opponent_seconds += source.opponent_seconds
+            merged.agent_steps += source.agent_steps
+            merged.agent_seconds += source.agent_seconds
+        return merged
+
+    def summary(self) -> Dict[str, float]:
+        # Flat dict for logging. Engine time is the env's own step time, which
+        # never includes the opponent policies a single-agent env calls
+        # between steps; the remainder of agent_seconds is wrapper overhead.
+        summary: Dict[str, float] = {}
+        for phase in self.phase_steps:
+            summary[f"{phase}_steps"] = self.phase_steps[phase]
+            summary[f"{phase}_seconds"] = self.phase_seconds[phase]
+        for name in self.section_calls:
+            summary[f"{name}_calls"] = self.section_calls[name]
+            summary[f"{name}_seconds"] = self.section_seconds[name]
+        engine_steps = sum(self.phase_steps.values())
+        engine_seconds = sum(self.phase_seconds.values())
+        summary["engine_seconds"] = engine_seconds
+        summary["opponent_calls"] = self.opponent_calls
+        summary["opponent_seconds"] = self.opponent_seconds
+        summary["agent_steps"] = self.agent_steps
+        summary["agent_seconds"] = self.agent_seconds
+        summary["other_seconds"] = max(0.0, self.agent_seconds - engine_seconds - self.opponent_seconds)
+        summary["engine_steps_per_sec"] = engine_steps / engine_seconds if engine_seconds else 0.0
+        summary["steps_per_sec"] = self.agent_steps / self.agent_seconds if self.agent_seconds else 0.0
+        return summary
+
+
+def merge_stats(stats: Iterable[EnvStats]) -> EnvStats:
+    # e.g. merge_stats(venv.env_method("stats")) across vec-env workers.
+    merged = EnvStats()
+    for item in stats:
+        merged = merged.merge(item)
+    return merged
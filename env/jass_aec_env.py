@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import random
+import time
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
@@ -16,13 +17,16 @@ try:
 except ImportError:  # pragma: no cover - optional fallback
     from gym import spaces  # type: ignore
 
+from core.beliefs import BeliefTracker
 from core.bidding import BiddingAction
-from core.cards import ALL_CARDS, Card, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, SUITS
+from core.cards import ALL_CARDS, Card, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, SUITS, card_mask
 from core.legal_moves import RuleSet
 from core.rankings import winning_card
 from core.scoring import trick_points
 from core.announcements.weis import resolve_weis
 from core.state import GameState, Trick, TrickResult
+from env.instrumentation import EnvStats
+from env.observation_packing import PACKED_OBS_SIZE, pack_observation
 
 
 BIDDING_TRUMP_ACTIONS = {36: "schellen", 37: "rosen", 38: "schilten", 39: "eicheln"}
@@ -41,6 +45,12 @@ OBS_TRUMP_SUIT_OFFSET = 111
 OBS_POINTS_OFFSET = 115
 OBS_TRICK_INDEX_OFFSET = 117
 
+# Optional "beliefs" block, per opponent seat relative to the observer (left,
+# partner, right): 36 cards it may still hold followed by 4 revealed voids.
+BELIEF_SEAT_SIZE = 40
+BELIEF_VOID_OFFSET = 36
+BELIEF_OBS_SIZE = 3 * BELIEF_SEAT_SIZE
+
 
 @dataclass
 class BiddingStatus:
@@ -55,6 +65,36 @@ class AnnouncementStatus:
     index: int
 
 
+@dataclass(frozen=True)
+class EnvSnapshot:
+    # Game-relevant state of a JassAECEnv (see snapshot()/restore()). Card
+    # collections are tuples and TrickResults are shared, never copied.
+    phase: str
+    agents: Tuple[str, ...]
+    agent_selection: str
+    skip_agent_selection: Optional[str]
+    bidding: Optional[Tuple[int, int, bool]]
+    announcement: Optional[Tuple[Tuple[int, ...], int]]
+    announced_cards: Tuple[Tuple[int, Tuple[Card, ...]], ...]
+    mode: Optional[str]
+    trump_suit: Optional[str]
+    dealt_hands: Optional[Tuple[Tuple[Card, ...], ...]]
+    # Compact GameState; hands is None while bidding.
+    hands: Optional[Tuple[Tuple[Card, ...], ...]]
+    leader: int
+    trick_index: int
+    trick: Tuple[Tuple[int, Card], ...]
+    team_points: Tuple[int, int]
+    completed_tricks: Tuple[TrickResult, ...]
+    rng_state: tuple
+    # (agent, value) pairs in agent order.
+    rewards: Tuple[Tuple[str, float], ...]
+    cumulative_rewards: Tuple[Tuple[str, float], ...]
+    last_rewards: Tuple[Tuple[str, float], ...]
+    terminations: Tuple[Tuple[str, bool], ...]
+    truncations: Tuple[Tuple[str, bool], ...]
+
+
 class JassAECEnv(AECEnv):
     metadata = {"name": "jass_aec_env", "render_modes": []}
 
@@ -67,6 +107,9 @@ class JassAECEnv(AECEnv):
         mode: Optional[str] = None,
         trump_suit: Optional[str] = None,
         starter: int = 0,
+        belief_observation: bool = False,
+        packed_observation: bool = False,
+        instrument: bool = False,
     ) -> None:
         super().__init__()
         self.possible_agents = ["p0", "p1", "p2", "p3"]
@@ -79,24 +122,48 @@ class JassAECEnv(AECEnv):
         self.preset_mode = mode
         self.preset_trump_suit = trump_suit
         self.starter = starter
+        self.belief_observation = belief_observation
+        # observation() returns the 20-byte form of env.observation_packing.
+        self.packed_observation = packed_observation
 
         self.card_to_index: Dict[Tuple[str, str], int] = {
             (card.suit, card.rank): idx for idx, card in enumerate(ALL_CARDS)
         }
         self.index_to_card: List[Card] = list(ALL_CARDS)
+        # One row per seat, kept up to date as cards are dealt and played;
+        # _obs_buffer maps agents to their row (a view, not a copy).
+        self._obs_rows = np.zeros((4, 118), dtype=np.float32)
         self._obs_buffer: Dict[str, np.ndarray] = {
-            agent: np.zeros(118, dtype=np.float32) for agent in self.possible_agents
+            agent: self._obs_rows[idx] for idx, agent in enumerate(self.possible_agents)
         }
         self._mask_buffer: Dict[str, np.ndarray] = {
             agent: np.zeros(ACTION_COUNT, dtype=np.int8) for agent in self.possible_agents
         }
 
-        self._observation_space = spaces.Dict(
-            {
-                "observation": spaces.Box(low=0.0, high=1.0, shape=(118,), dtype=np.float32),
-                "action_mask": spaces.Box(low=0, high=1, shape=(ACTION_COUNT,), dtype=np.int8),
-            }
-        )
+        self._belief_buffer: Dict[str, np.ndarray] = {
+            agent: np.zeros(BELIEF_OBS_SIZE, dtype=np.float32) for agent in self.possible_agents
+        }
+        # Masks and belief blocks are rebuilt at most once per state version;
+        # every reset() and step() starts a new version.
+        self._version = 0
+        self._mask_version: Dict[str, int] = {agent: -1 for agent in self.possible_agents}
+        self._belief_version: Dict[str, int] = {agent: -1 for agent in self.possible_agents}
+        self._packed_buffer: Dict[str, np.ndarray] = {}
+        self._packed_version: Dict[str, int] = {agent: -1 for agent in self.possible_agents}
+
+        if packed_observation:
+            observation_space = spaces.Box(low=0, high=255, shape=(PACKED_OBS_SIZE,), dtype=np.uint8)
+        else:
+            observation_space = spaces.Box(low=0.0, high=1.0, shape=(118,), dtype=np.float32)
+        observation_spaces = {
+            "observation": observation_space,
+            "action_mask": spaces.Box(low=0, high=1, shape=(ACTION_COUNT,), dtype=np.int8),
+        }
+        if belief_observation:
+            observation_spaces["beliefs"] = spaces.Box(
+                low=0.0, high=1.0, shape=(BELIEF_OBS_SIZE,), dtype=np.float32
+            )
+        self._observation_space = spaces.Dict(observation_spaces)
         self._action_space = spaces.Discrete(ACTION_COUNT)
 
         self.phase = "bidding"
@@ -104,13 +171,49 @@ class JassAECEnv(AECEnv):
         self.announcement: Optional[AnnouncementStatus] = None
         self._announced_cards: Dict[int, List[Card]] = {}
         self.state: Optional[GameState] = None
+        self._dealt_hands: Optional[List[List[Card]]] = None
+        self.beliefs: Optional[BeliefTracker] = None
+        # Reused by every reset(), so dealing allocates nothing; each round still
+        # gets its own GameState, so a state taken from env.state stays intact.
+        self._deck: List[Card] = list(ALL_CARDS)
+        self._deal_buffer: List[List[Card]] = [[] for _ in range(4)]
+        self._bidding_status = BiddingStatus(starter=starter, current_player=starter, pushed=False)
+        self._announcement_status = AnnouncementStatus(order=[0, 1, 2, 3], index=0)
 
         self.rewards: Dict[str, float] = {}
+        self._cumulative_rewards: Dict[str, float] = {}
         self.terminations: Dict[str, bool] = {}
         self.truncations: Dict[str, bool] = {}
         self.infos: Dict[str, dict] = {}
         self.last_rewards: Dict[str, float] = {}
 
+        self.env_stats: Optional[EnvStats] = None
+        if instrument:
+            self._instrument()
+
+    def _instrument(self) -> None:
+        # Per-phase step timing plus the heavier internals; see EnvStats.
+        stats = self.env_stats = EnvStats()
+        for section, name in (
+            ("action_mask", "_build_action_mask"),
+            ("resolve_trick", "_resolve_trick"),
+            ("observation_rebuild", "_rebuild_observations"),
+            ("beliefs", "_build_belief_observation"),
+        ):
+            setattr(self, name, stats.timed_section(section, getattr(self, name)))
+        step = self.step
+
+        def _timed_step(action):
+            phase = self.phase
+            started = time.perf_counter()
+            step(action)
+            stats.record_phase(phase, time.perf_counter() - started)
+
+        self.step = _timed_step
+
+    def stats(self) -> EnvStats:
+        return self.env_stats if self.env_stats is not None else EnvStats()
+
     def action_space(self, agent: str):
         return self._action_space
 
@@ -121,25 +224,41 @@ class JassAECEnv(AECEnv):
         if seed is not None:
             self._seed = seed
             self._rng = random.Random(seed)
-        self.agents = self.possible_agents[:]
-        self.rewards = {agent: 0.0 for agent in self.agents}
-        self.last_rewards = {agent: 0.0 for agent in self.agents}
-        self._cumulative_rewards = {agent: 0.0 for agent in self.agents}
-        self.terminations = {agent: False for agent in self.agents}
-        self.truncations = {agent: False for agent in self.agents}
-        self.infos = {agent: {} for agent in self.agents}
+        self.agents[:] = self.possible_agents
+        for agent in self.agents:
+            self.rewards[agent] = 0.0
+            self.last_rewards[agent] = 0.0
+            self._cumulative_rewards[agent] = 0.0
+            self.terminations[agent] = False
+            self.truncations[agent] = False
+            info = self.infos.get(agent)
+            if info is None:
+                self.infos[agent] = {}
+            else:
+                info.clear()
 
+        self._version += 1
+        self._obs_rows.fill(0.0)
         options = options or {}
+        # options["hands"]: four 9-card hands to play instead of a random deal.
+        requested_hands = options.get("hands")
 
         if self.enable_bidding:
             self.phase = "bidding"
-            self.bidding = BiddingStatus(
-                starter=self.starter, current_player=self.starter, pushed=False
-            )
+            self.bidding = self._bidding_status
+            self.bidding.starter = self.bidding.current_player = self.starter
+            self.bidding.pushed = False
             self.announcement = None
-            self._announced_cards = {}
+            self._announced_cards.clear()
             self.mode = None
             self.trump_suit = None
+            self.state = None
+            self.beliefs = None
+            # Cards are dealt before bidding so bidders can look at their hands.
+            if requested_hands is not None:
+                self._dealt_hands = [list(hand) for hand in requested_hands]
+            else:
+                self._dealt_hands = self._deal()
             self.agent_selection = f"p{self.bidding.current_player}"
         else:
             requested_mode = options.get("mode", self.preset_mode)
@@ -154,6 +273,9 @@ class JassAECEnv(AECEnv):
                 self.trump_suit = requested_trump
                 if self.mode == MODE_TRUMP and self.trump_suit is None:
                     self.trump_suit = self._rng.choice(SUITS)
+            self._dealt_hands = None
+            if requested_hands is not None:
+                self._dealt_hands = [list(hand) for hand in requested_hands]
             self._init_state(leader=self.starter)
             if self.enable_weis:
                 self._start_announcement(leader=self.state.leader)
@@ -161,29 +283,176 @@ class JassAECEnv(AECEnv):
                 self.phase = "play"
                 self.agent_selection = f"p{self.state.leader}"
 
-    def _init_state(self, leader: int) -> None:
-        deck = list(ALL_CARDS)
+    def snapshot(self) -> EnvSnapshot:
+        state = self.state
+        return EnvSnapshot(
+            phase=self.phase,
+            agents=tuple(self.agents),
+            agent_selection=self.agent_selection,
+            skip_agent_selection=getattr(self, "_skip_agent_selection", None),
+            bidding=(
+                None
+                if self.bidding is None
+                else (self.bidding.starter, self.bidding.current_player, self.bidding.pushed)
+            ),
+            announcement=(
+                None
+                if self.announcement is None
+                else (tuple(self.announcement.order), self.announcement.index)
+            ),
+            announced_cards=tuple((player, tuple(cards)) for player, cards in self._announced_cards.items()),
+            mode=self.mode,
+            trump_suit=self.trump_suit,
+            dealt_hands=None if self._dealt_hands is None else tuple(map(tuple, self._dealt_hands)),
+            hands=None if state is None else tuple(map(tuple, state.hands)),
+            leader=0 if state is None else state.leader,
+            trick_index=0 if state is None else state.trick_index,
+            trick=() if state is None else tuple(state.trick.plays),
+            team_points=(0, 0) if state is None else (state.team_points[0], state.team_points[1]),
+            completed_tricks=() if state is None else tuple(state.completed_tricks),
+            rng_state=self._rng.getstate(),
+            rewards=tuple(self.rewards.items()),
+            cumulative_rewards=tuple(self._cumulative_rewards.items()),
+            last_rewards=tuple(self.last_rewards.items()),
+            terminations=tuple(self.terminations.items()),
+            truncations=tuple(self.truncations.items()),
+        )
+
+    def restore(self, snapshot: EnvSnapshot) -> None:
+        # Observation rows are rebuilt from the restored state and the version
+        # bump invalidates cached masks and belief blocks.
+        self.phase = snapshot.phase
+        self.agents = list(snapshot.agents)
+        self.agent_selection = snapshot.agent_selection
+        self._skip_agent_selection = snapshot.skip_agent_selection
+        self.bidding = None if snapshot.bidding is None else BiddingStatus(*snapshot.bidding)
+        self.announcement = (
+            None
+            if snapshot.announcement is None
+            else AnnouncementStatus(order=list(snapshot.announcement[0]), index=snapshot.announcement[1])
+        )
+        self._announced_cards = {player: list(cards) for player, cards in snapshot.announced_cards}
+        self.mode = snapshot.mode
+        self.trump_suit = snapshot.trump_suit
+        self._dealt_hands = None if snapshot.dealt_hands is None else [list(hand) for hand in snapshot.dealt_hands]
+        if snapshot.hands is None:
+            self.state = None
+            self.beliefs = None
+        else:
+            self.state = GameState(
+                hands=[list(hand) for hand in snapshot.hands],
+                mode=snapshot.mode,
+                trump_suit=snapshot.trump_suit,
+                leader=snapshot.leader,
+                trick_index=snapshot.trick_index,
+                trick=Trick(plays=list(snapshot.trick)),
+                team_points=list(snapshot.team_points),
+                completed_tricks=list(snapshot.completed_tricks),
+            )
+            if self.belief_observation:
+                self.beliefs = BeliefTracker.from_state(self.state, ruleset=self.ruleset)
+        self._rng.setstate(snapshot.rng_state)
+        self.rewards = dict(snapshot.rewards)
+        self._cumulative_rewards = dict(snapshot.cumulative_rewards)
+        self.last_rewards = dict(snapshot.last_rewards)
+        self.terminations = dict(snapshot.terminations)
+        self.truncations = dict(snapshot.truncations)
+        self.infos = {agent: {} for agent in self.agents}
+        self._version += 1
+        self._rebuild_observations()
+
+    def _deal(self) -> List[List[Card]]:
+        # Shuffles a fresh copy of ALL_CARDS (same deals as a new list would get).
+        deck = self._deck
+        deck[:] = ALL_CARDS
         self._rng.shuffle(deck)
-        hands = [deck[i * 9 : (i + 1) * 9] for i in range(4)]
-        self.state = GameState(hands=hands, mode=self.mode, trump_suit=self.trump_suit)
-        self.state.leader = leader
-        self.state.trick = Trick()
-        self.state.trick_index = 0
+        for i, hand in enumerate(self._deal_buffer):
+            hand[:] = deck[i * 9 : (i + 1) * 9]
+        return self._deal_buffer
+
+    def dealt_hand(self, player: int) -> List[Card]:
+        # The player's nine cards for this round; available from the bidding phase on.
+        if self._dealt_hands is None:
+            raise RuntimeError("no cards dealt yet")
+        return list(self._dealt_hands[player])
+
+    def _init_state(self, leader: int) -> None:
+        if self._dealt_hands is None:
+            self._dealt_hands = self._deal()
+        self.state = GameState(
+            hands=[list(hand) for hand in self._dealt_hands],
+            mode=self.mode,
+            trump_suit=self.trump_suit,
+            leader=leader,
+        )
+        if self.belief_observation:
+            self.beliefs = BeliefTracker(self.mode, self.trump_suit, ruleset=self.ruleset)
+        self._rebuild_observations()
 
     def _start_announcement(self, leader: int) -> None:
-        order = [(leader + offset) % 4 for offset in range(4)]
-        self.announcement = AnnouncementStatus(order=order, index=0)
-        self._announced_cards = {player: [] for player in range(4)}
+        self.announcement = self._announcement_status
+        self.announcement.order[:] = [(leader + offset) % 4 for offset in range(4)]
+        self.announcement.index = 0
+        for player in range(4):
+            self._announced_cards[player] = []
         self.phase = "announce"
         self.agent_selection = f"p{self.announcement.order[self.announcement.index]}"
 
     def observe(self, agent: str):
-        observation = self._build_observation(agent)
-        mask = self._build_action_mask(agent)
+        observation = self.observation(agent)
+        mask = self.action_mask(agent)
+        if self.belief_observation:
+            return {"observation": observation, "action_mask": mask, "beliefs": self.belief_block(agent)}
         return {"observation": observation, "action_mask": mask}
 
-    def _build_observation(self, agent: str) -> np.ndarray:
-        buffer = self._obs_buffer[agent]
+    def observation(self, agent: str) -> np.ndarray:
+        if not self.packed_observation:
+            return self._obs_buffer[agent]
+        if self._packed_version[agent] != self._version:
+            self._packed_buffer[agent] = pack_observation(self._obs_buffer[agent])
+            self._packed_version[agent] = self._version
+        return self._packed_buffer[agent]
+
+    def action_mask(self, agent: str) -> np.ndarray:
+        if self._mask_version[agent] != self._version:
+            self._build_action_mask(agent)
+            self._mask_version[agent] = self._version
+        return self._mask_buffer[agent]
+
+    def belief_block(self, agent: str) -> np.ndarray:
+        if self._belief_version[agent] != self._version:
+            self._build_belief_observation(agent)
+            self._belief_version[agent] = self._version
+        return self._belief_buffer[agent]
+
+    def _build_belief_observation(self, agent: str) -> np.ndarray:
+        buffer = self._belief_buffer[agent]
+        buffer.fill(0.0)
+        if self.state is None or self.beliefs is None:
+            return buffer
+
+        player = int(agent[1:])
+        own = card_mask(self.state.hands[player])
+        for offset in range(1, 4):
+            seat = (player + offset) % 4
+            base = (offset - 1) * BELIEF_SEAT_SIZE
+            possible = self.beliefs.possible[seat] & ~own
+            while possible:
+                low = possible & -possible
+                buffer[base + low.bit_length() - 1] = 1.0
+                possible ^= low
+            for suit_idx in range(len(SUITS)):
+                if self.beliefs.voids[seat] >> suit_idx & 1:
+                    buffer[base + BELIEF_VOID_OFFSET + suit_idx] = 1.0
+        return buffer
+
+    def _rebuild_observations(self) -> None:
+        for agent in self.possible_agents:
+            self._compute_observation(agent, self._obs_buffer[agent])
+
+    def _compute_observation(self, agent: str, buffer: np.ndarray) -> np.ndarray:
+        # Full rebuild from the game state; observe() uses the incrementally
+        # maintained rows instead.
         buffer.fill(0.0)
         if self.state is None:
             return buffer
@@ -215,13 +484,20 @@ class JassAECEnv(AECEnv):
         if self.state.trump_suit:
             buffer[OBS_TRUMP_SUIT_OFFSET + SUITS.index(self.state.trump_suit)] = 1.0
 
-        buffer[OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2] = np.array(
-            self.state.team_points, dtype=np.float32
-        )
+        buffer[OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2] = self.state.team_points
         buffer[OBS_TRICK_INDEX_OFFSET] = float(self.state.trick_index)
 
         return buffer
 
+    def _observe_play(self, player: int, idx: int) -> None:
+        self._obs_rows[player, OBS_HAND_OFFSET + idx] = 0.0
+        self._obs_rows[:, OBS_TRICK_OFFSET + idx] = 1.0
+        self._obs_rows[:, OBS_PLAYED_OFFSET + idx] = 1.0
+
+    def _observe_scores(self) -> None:
+        self._obs_rows[:, OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2] = self.state.team_points
+        self._obs_rows[:, OBS_TRICK_INDEX_OFFSET] = self.state.trick_index
+
     def _build_action_mask(self, agent: str) -> np.ndarray:
         mask = self._mask_buffer[agent]
         mask.fill(0)
@@ -264,6 +540,7 @@ class JassAECEnv(AECEnv):
 
     def step(self, action):
         agent = self.agent_selection
+        self._version += 1
 
         if self.terminations.get(agent) or self.truncations.get(agent):
             self._was_dead_step(action)
@@ -285,6 +562,9 @@ class JassAECEnv(AECEnv):
         card = self._action_to_card(action)
         player = int(agent[1:])
         self.state.play_card(player, card, ruleset=self.ruleset)
+        self._observe_play(player, action)
+        if self.beliefs is not None:
+            self.beliefs.record_play(player, card)
 
         if len(self.state.trick.plays) == 4:
             self._resolve_trick()
@@ -376,6 +656,7 @@ class JassAECEnv(AECEnv):
                 for agent_id in ("p1", "p3"):
                     self.rewards[agent_id] += points_b
 
+            self._observe_scores()
             self.phase = "play"
             self.agent_selection = f"p{self.state.leader}"
             self.announcement = None
@@ -416,6 +697,8 @@ class JassAECEnv(AECEnv):
         self.state.trick = Trick()
         self.state.trick_index += 1
         self.state.leader = winning_player
+        self._obs_rows[:, OBS_TRICK_OFFSET:OBS_PLAYED_OFFSET] = 0.0
+        self._observe_scores()
         self.agent_selection = f"p{self.state.leader}"
 
     def _clear_rewards(self) -> None:
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import numpy as np
+
+# Packed uint8 form of the 118-float observation:
+#   bytes 0-14   the 115 binary entries (hand, trick, played, mode, trump suit)
+#                as bits, np.packbits order (most significant bit first)
+#   bytes 15-18  team points A and B as little-endian uint16
+#   byte  19     trick index
+OBS_SIZE = 118
+PACKED_BITS = 115
+PACKED_BIT_BYTES = 15
+PACKED_OBS_SIZE = 20
+
+
+def pack_observation(obs: np.ndarray) -> np.ndarray:
+    # Packs one observation or a batch (any leading axes).
+    obs = np.asarray(obs)
+    packed = np.empty(obs.shape[:-1] + (PACKED_OBS_SIZE,), dtype=np.uint8)
+    packed[..., :PACKED_BIT_BYTES] = np.packbits(obs[..., :PACKED_BITS] > 0.5, axis=-1)
+    points = obs[..., PACKED_BITS : PACKED_BITS + 2].astype(np.uint16)
+    packed[..., 15:19:2] = points & 0xFF
+    packed[..., 16:19:2] = points >> 8
+    packed[..., 19] = obs[..., OBS_SIZE - 1]
+    return packed
+
+
+def unpack_observation(packed: np.ndarray) -> np.ndarray:
+    packed = np.asarray(packed, dtype=np.uint8)
+    obs = np.empty(packed.shape[:-1] + (OBS_SIZE,), dtype=np.float32)
+    obs[..., :PACKED_BITS] = np.unpackbits(packed[..., :PACKED_BIT_BYTES], axis=-1, count=PACKED_BITS)
+    obs[..., PACKED_BITS : PACKED_BITS + 2] = packed[..., 15:19:2] + 256.0 * packed[..., 16:19:2]
+    obs[..., OBS_SIZE - 1] = packed[..., 19]
+    return obs
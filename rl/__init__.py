@@ -1,3 +1,10 @@
-from .single_agent_env import JassSingleAgentEnv, policy_lowest, policy_random
+from .fused_env import JassFusedEnv
+from .single_agent_env import (
+    JassSingleAgentEnv,
+    policy_bidding,
+    policy_card,
+    policy_lowest,
+    policy_random,
+)
 
-__all__ = ["JassSingleAgentEnv", "policy_lowest", "policy_random"]
+__all__ = ["JassFusedEnv", "JassSingleAgentEnv", "policy_bidding", "policy_card", "policy_lowest", "policy_random"]
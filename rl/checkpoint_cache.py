@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Loads from disk (misses plus prefetches) and the time they took.
+    loads: int = 0
+    load_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CheckpointCache(Generic[T]):
+    # LRU of loaded checkpoints keyed by path. Capacity is a number of entries
+    # (max_entries) and/or a byte budget (max_bytes, measured with `size`); the
+    # most recently used entry is kept even if it alone exceeds max_bytes.
+    #
+    # prefetch() loads a checkpoint ahead of its first get(): right away, or
+    # on a background thread when background=True, in which case a get() for
+    # that path waits for the load instead of starting a second one.
+
+    def __init__(
+        self,
+        load: Callable[[Path], T],
+        size: Optional[Callable[[T], int]] = None,
+        max_entries: Optional[int] = 8,
+        max_bytes: Optional[int] = None,
+        background: bool = False,
+    ) -> None:
+        self.load = load
+        self.size = size
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.background = background
+        self.stats = CacheStats()
+        self._setup()
+
+    def _setup(self) -> None:
+        self._entries: "OrderedDict[Path, T]" = OrderedDict()
+        self._sizes: Dict[Path, int] = {}
+        self._pending: Dict[Path, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # Pickled copies (e.g. sent to vec-env workers) start empty.
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for name in ("_entries", "_sizes", "_pending", "_lock", "_executor"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._setup()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: Path) -> bool:
+        return path in self._entries
+
+    @property
+    def bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def get(self, path: Path) -> T:
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+                self.stats.hits += 1
+                return self._entries[path]
+            future = self._pending.get(path)
+            if future is not None:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        if future is not None:
+            return future.result()
+        return self._load(path)
+
+    def prefetch(self, path: Path) -> None:
+        with self._lock:
+            if path in self._entries or path in self._pending:
+                return
+            if self.background:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-prefetch")
+                self._pending[path] = self._executor.submit(self._load, path)
+                return
+        self._load(path)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _load(self, path: Path) -> T:
+        started = time.perf_counter()
+        value = self.load(path)
+        size = self.size(value) if self.size is not None else 0
+        with self._lock:
+            self._pending.pop(path, None)
+            self.stats.loads += 1
+            self.stats.load_seconds += time.perf_counter() - started
+            self._entries[path] = value
+            self._entries.move_to_end(path)
+            self._sizes[path] = size
+            self._evict()
+        return value
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            path, _ = self._entries.popitem(last=False)
+            del self._sizes[path]
+            self.stats.evictions += 1
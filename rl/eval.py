@@ -5,7 +5,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
-from rl.single_agent_env import JassSingleAgentEnv, policy_lowest
+import numpy as np
+
+from rl.single_agent_env import JassSingleAgentEnv, OpponentPolicy, policy_lowest
+from search.par import ParTable, deal_hands, load_deal_bank
 
 try:
     from sb3_contrib import MaskablePPO
@@ -21,48 +24,74 @@ class EvalConfig:
     enable_bidding: bool
     mode: Optional[str]
     trump_suit: Optional[str]
-
-
-def evaluate(config: EvalConfig) -> dict:
+    # Plays the deals of a search.par deal bank (episode i -> deal i) and, with a
+    # par table, reports points relative to the double-dummy par.
+    deal_bank: Optional[Path] = None
+    par_table: Optional[Path] = None
+    enable_weis: bool = True
+
+
+def evaluate(config: EvalConfig, policy: Optional[OpponentPolicy] = None) -> dict:
+    # `policy` plays p0 instead of the checkpoint at config.model_path.
+    model = MaskablePPO.load(config.model_path) if policy is None else None
+    deals = load_deal_bank(config.deal_bank) if config.deal_bank is not None else None
+    par = ParTable(config.par_table) if config.par_table is not None else None
+    if par is not None and deals is None:
+        raise ValueError("a par table requires the deal bank it was built from")
+    if par is not None and config.enable_weis:
+        # Par values are card points only, so Weis would bias points vs par.
+        raise ValueError("par tables count card points only; evaluate them with enable_weis=False")
     env = JassSingleAgentEnv(
         seed=config.seed,
         enable_bidding=config.enable_bidding,
+        enable_weis=config.enable_weis,
         mode=config.mode,
         trump_suit=config.trump_suit,
         opponent_policy=policy_lowest,
+        # Checkpoints trained with --packed-obs expect uint8 observations.
+        packed_observation=model is not None and model.observation_space.dtype == np.uint8,
     )
 
-    model = MaskablePPO.load(config.model_path)
-
     wins = 0
     ties = 0
     total_points = 0
+    total_par = 0
 
     for ep in range(config.episodes):
-        obs, _ = env.reset(seed=config.seed + ep)
+        options = None
+        if deals is not None:
+            options = {"hands": deal_hands(deals, ep % len(deals))}
+        obs, _ = env.reset(seed=config.seed + ep, options=options)
         done = False
         while not done:
-            mask = env.get_action_mask()
-            action, _ = model.predict(obs, action_masks=mask, deterministic=True)
-            obs, reward, terminated, truncated, _ = env.step(int(action))
+            if model is None:
+                action = policy(env.env, "p0")
+            else:
+                action, _ = model.predict(obs, action_masks=env.get_action_mask(), deterministic=True)
+            obs, reward, terminated, truncated, info = env.step(int(action))
             done = terminated or truncated
 
         state = env.env.state
-        team_a = state.team_points[0]
-        team_b = state.team_points[1]
+        team_a, team_b = info["team_points"]
         total_points += team_a
+        if par is not None:
+            total_par += par.par(ep % len(deals), state.mode, state.trump_suit)
         if team_a > team_b:
             wins += 1
         elif team_a == team_b:
             ties += 1
 
-    return {
+    metrics = {
         "episodes": config.episodes,
         "wins": wins,
         "ties": ties,
         "win_rate": wins / config.episodes,
         "avg_team_a_points": total_points / config.episodes,
     }
+    if par is not None:
+        metrics["avg_par_points"] = total_par / config.episodes
+        metrics["avg_points_vs_par"] = (total_points - total_par) / config.episodes
+    return metrics
 
 
 def _parse_args() -> EvalConfig:
@@ -73,6 +102,9 @@ def _parse_args() -> EvalConfig:
     parser.add_argument("--enable-bidding", action="store_true")
     parser.add_argument("--mode")
     parser.add_argument("--trump-suit")
+    parser.add_argument("--deal-bank", type=Path)
+    parser.add_argument("--par-table", type=Path)
+    parser.add_argument("--no-weis", action="store_true", help="required with --par-table")
     args = parser.parse_args()
 
     return EvalConfig(
@@ -82,6 +114,9 @@ def _parse_args() -> EvalConfig:
         enable_bidding=args.enable_bidding,
         mode=args.mode,
         trump_suit=args.trump_suit,
+        deal_bank=args.deal_bank,
+        par_table=args.par_table,
+        enable_weis=not args.no_weis,
     )
 
 
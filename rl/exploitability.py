@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import argparse
+import math
+import multiprocessing as mp
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from env.jass_aec_env import JassAECEnv
+from env.observation_packing import pack_observation
+from search.ismcts import ISMCTSAgent
+
+try:
+    from sb3_contrib import MaskablePPO
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("sb3-contrib is required for exploitability estimates") from exc
+
+
+@dataclass
+class ExploitabilityConfig:
+    model_path: Path
+    deals: int
+    seed: int
+    workers: int
+    simulations: int
+    chunk_size: int
+    enable_bidding: bool
+    enable_weis: bool
+    mode: Optional[str]
+    trump_suit: Optional[str]
+
+
+@dataclass
+class DealResult:
+    seed: int
+    seat: int
+    # Points of the responder's team with the search player on `seat` and with
+    # the checkpoint itself on `seat` (same deal, same opening decisions).
+    best_response: int
+    baseline: int
+
+    @property
+    def gain(self) -> int:
+        return self.best_response - self.baseline
+
+
+@dataclass
+class _Game:
+    env: JassAECEnv
+    seat: int
+    searcher: Optional[ISMCTSAgent]
+
+    @property
+    def done(self) -> bool:
+        return all(self.env.terminations.values())
+
+
+def _make_env(config: ExploitabilityConfig, seed: int) -> JassAECEnv:
+    env = JassAECEnv(
+        seed=seed,
+        enable_bidding=config.enable_bidding,
+        enable_weis=config.enable_weis,
+        mode=config.mode,
+        trump_suit=config.trump_suit,
+    )
+    env.reset(seed=seed)
+    return env
+
+
+def _advance_responder(game: _Game) -> None:
+    # The responder searches its card play; bidding and Weis stay with the
+    # checkpoint so the gain measures play only.
+    env = game.env
+    while (
+        game.searcher is not None
+        and not game.done
+        and env.phase == "play"
+        and env.agent_selection == f"p{game.seat}"
+    ):
+        card = game.searcher(env.state, game.seat)
+        env.step(env.card_to_index[(card.suit, card.rank)])
+
+
+def play_deals(model: Any, config: ExploitabilityConfig, seeds: List[int]) -> List[DealResult]:
+    # All games of a chunk advance in lockstep so every checkpoint decision of
+    # one step is answered by a single batched forward pass.
+    games: List[_Game] = []
+    for seed in seeds:
+        seat = seed % 4
+        searcher = ISMCTSAgent(simulations=config.simulations, seed=seed)
+        games.append(_Game(_make_env(config, seed), seat, searcher))
+        games.append(_Game(_make_env(config, seed), seat, None))
+
+    # Checkpoints trained with --packed-obs expect uint8 observations.
+    packed = model.observation_space.dtype == np.uint8
+    active = games
+    while active:
+        waiting = []
+        for game in active:
+            _advance_responder(game)
+            if not game.done:
+                waiting.append(game)
+        if not waiting:
+            break
+        observations = [game.env.observe(game.env.agent_selection) for game in waiting]
+        batch = np.stack([obs["observation"] for obs in observations])
+        if packed:
+            batch = pack_observation(batch)
+        actions, _ = model.predict(
+            batch,
+            action_masks=np.stack([obs["action_mask"] for obs in observations]),
+            deterministic=True,
+        )
+        for game, action in zip(waiting, actions):
+            game.env.step(int(action))
+        active = waiting
+
+    results = []
+    for seed, responder, baseline in zip(seeds, games[::2], games[1::2]):
+        team = responder.seat % 2
+        results.append(
+            DealResult(
+                seed=seed,
+                seat=responder.seat,
+                best_response=responder.env.state.team_points[team],
+                baseline=baseline.env.state.team_points[team],
+            )
+        )
+    return results
+
+
+_WORKER_MODEL: Any = None
+_WORKER_CONFIG: Optional[ExploitabilityConfig] = None
+
+
+def _init_worker(config: ExploitabilityConfig) -> None:
+    # Each pool process loads the checkpoint once.
+    global _WORKER_MODEL, _WORKER_CONFIG
+    _WORKER_MODEL = MaskablePPO.load(config.model_path, device="cpu")
+    _WORKER_CONFIG = config
+
+
+def _play_chunk(seeds: List[int]) -> List[DealResult]:
+    return play_deals(_WORKER_MODEL, _WORKER_CONFIG, seeds)
+
+
+def summarize(results: List[DealResult], z: float = 1.96) -> Dict[str, float]:
+    gains = np.array([result.gain for result in results], dtype=np.float64)
+    mean = float(gains.mean()) if len(gains) else 0.0
+    stderr = float(gains.std(ddof=1) / math.sqrt(len(gains))) if len(gains) > 1 else 0.0
+    return {
+        "deals": len(results),
+        "gain_mean": mean,
+        "gain_ci_low": mean - z * stderr,
+        "gain_ci_high": mean + z * stderr,
+        "best_response_points": float(np.mean([r.best_response for r in results])) if results else 0.0,
+        "baseline_points": float(np.mean([r.baseline for r in results])) if results else 0.0,
+    }
+
+
+def estimate(config: ExploitabilityConfig) -> Dict[str, float]:
+    # The responder seat rotates with the deal seed, so every seat is probed.
+    seeds = [config.seed + idx for idx in range(config.deals)]
+    chunks = [seeds[pos : pos + config.chunk_size] for pos in range(0, len(seeds), config.chunk_size)]
+    started = time.perf_counter()
+    results: List[DealResult] = []
+    if config.workers <= 1:
+        model = MaskablePPO.load(config.model_path, device="cpu")
+        for chunk in chunks:
+            results.extend(play_deals(model, config, chunk))
+    else:
+        with mp.get_context().Pool(config.workers, initializer=_init_worker, initargs=(config,)) as pool:
+            for chunk_results in pool.imap_unordered(_play_chunk, chunks):
+                results.extend(chunk_results)
+    summary = summarize(results)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def _parse_args() -> ExploitabilityConfig:
+    parser = argparse.ArgumentParser(description="Best-response exploitability of a Jass checkpoint")
+    parser.add_argument("model_path")
+    parser.add_argument("--deals", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=mp.cpu_count())
+    parser.add_argument("--simulations", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--no-bidding", action="store_true")
+    parser.add_argument("--no-weis", action="store_true")
+    parser.add_argument("--mode")
+    parser.add_argument("--trump-suit")
+    args = parser.parse_args()
+
+    return ExploitabilityConfig(
+        model_path=Path(args.model_path),
+        deals=args.deals,
+        seed=args.seed,
+        workers=args.workers,
+        simulations=args.simulations,
+        chunk_size=max(1, args.chunk_size),
+        enable_bidding=not args.no_bidding,
+        enable_weis=not args.no_weis,
+        mode=args.mode,
+        trump_suit=args.trump_suit,
+    )
+
+
+def main() -> None:
+    config = _parse_args()
+    print(estimate(config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+from __future__ import annotations
+
+import random
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import gymnasium as gym
+except ImportError:  # pragma: no cover
+    import gym  # type: ignore
+
+from core.announcements.weis import resolve_weis
+from core.cards import ALL_CARDS, CARD_INDEX, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, SUITS, Card
+from core.fast_engine import FastState, iter_bits, variant_index
+from core.legal_moves import RuleSet
+from core.state import GameState, Trick, TrickResult
+from env.jass_aec_env import (
+    ACTION_COUNT,
+    ANNOUNCE_ACTION,
+    BIDDING_OBEABE_ACTION,
+    BIDDING_PUSH_ACTION,
+    BIDDING_TRUMP_ACTIONS,
+    BIDDING_UNEUFE_ACTION,
+    OBS_HAND_OFFSET,
+    OBS_PLAYED_OFFSET,
+    OBS_POINTS_OFFSET,
+    OBS_TRICK_INDEX_OFFSET,
+    OBS_TRICK_OFFSET,
+    OBS_TRUMP_MODE_OFFSET,
+    OBS_TRUMP_SUIT_OFFSET,
+    PASS_ACTION,
+    BiddingStatus,
+)
+from env.instrumentation import EnvStats
+from env.observation_packing import PACKED_OBS_SIZE, pack_observation
+from rl.single_agent_env import OpponentPolicy, policy_lowest
+
+AGENTS = ("p0", "p1", "p2", "p3")
+_SEAT = {agent: seat for seat, agent in enumerate(AGENTS)}
+_MODE_SLOT = {MODE_TRUMP: 0, MODE_OBEABE: 1, MODE_UNEUFE: 2}
+
+
+class JassFusedEnv(gym.Env):
+    # Drop-in replacement for JassSingleAgentEnv that runs the round on
+    # core.fast_engine.FastState with integer seats and a scalar reward instead
+    # of driving JassAECEnv. Dealing consumes the RNG exactly like JassAECEnv,
+    # so equal seeds and opponents give identical trajectories.
+    #
+    # Opponent policies still receive (env, agent): the env answers the calls
+    # they make on JassAECEnv (phase, bidding, state, dealt_hand, action_mask,
+    # observation, observe, card_to_index). `state` is rebuilt on demand.
+
+    metadata = {"render_modes": []}
+
+    card_to_index = {(card.suit, card.rank): idx for idx, card in enumerate(ALL_CARDS)}
+    index_to_card: List[Card] = list(ALL_CARDS)
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        enable_bidding: bool = True,
+        enable_weis: bool = True,
+        mode: Optional[str] = None,
+        trump_suit: Optional[str] = None,
+        starter: int = 0,
+        opponent_policy: Optional[OpponentPolicy] = None,
+        opponent_sampler: Optional[Callable[[random.Random], OpponentPolicy]] = None,
+        ruleset: Optional[RuleSet] = None,
+        auto_forced: bool = False,
+        auto_forced_learner: bool = False,
+        auto_announce: bool = False,
+        packed_observation: bool = False,
+        instrument: bool = False,
+        auto_reset: bool = False,
+    ) -> None:
+        super().__init__()
+        # Same automatic decisions and auto-reset as JassSingleAgentEnv.
+        self.auto_forced = auto_forced
+        self.auto_forced_learner = auto_forced_learner
+        self.auto_announce = auto_announce
+        self.auto_reset = auto_reset
+        self._fresh_round = False
+        self.enable_bidding = enable_bidding
+        self.enable_weis = enable_weis
+        self.preset_mode = mode
+        self.preset_trump_suit = trump_suit
+        self.starter = starter
+        self.ruleset = ruleset or RuleSet()
+        # Same two streams as JassSingleAgentEnv: dealing and opponent sampling.
+        self._deal_rng = random.Random(seed)
+        self._rng = random.Random(seed)
+        self.opponent_policy = opponent_policy or policy_lowest
+        self.opponent_sampler = opponent_sampler
+        self._current_opponent_policy: OpponentPolicy = self.opponent_policy
+
+        self.action_space = gym.spaces.Discrete(ACTION_COUNT)
+        self.packed_observation = packed_observation
+        if packed_observation:
+            self.observation_space = gym.spaces.Box(low=0, high=255, shape=(PACKED_OBS_SIZE,), dtype=np.uint8)
+        else:
+            self.observation_space = gym.spaces.Box(low=0.0, high=1.0, shape=(118,), dtype=np.float32)
+        self._terminal_obs = np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+        self._terminal_obs.flags.writeable = False
+
+        self.phase = "bidding"
+        self.current = starter
+        self.bidding: Optional[BiddingStatus] = None
+        self.mode: Optional[str] = None
+        self.trump_suit: Optional[str] = None
+        self._dealt_hands: Optional[List[List[Card]]] = None
+        self._fast: Optional[FastState] = None
+        self._announce_index = 0
+        self._announced: List[bool] = [False] * 4
+        # (plays, winner, points) per finished trick, for the `state` view.
+        self._tricks: List[Tuple[List[Tuple[int, int]], int, int]] = []
+        self._obs_rows = np.zeros((4, 118), dtype=np.float32)
+        self._masks = np.zeros((4, ACTION_COUNT), dtype=np.int8)
+        self._mask_version = [-1] * 4
+        self._version = 0
+        # Team 0 points already paid out as reward this round.
+        self._paid = 0
+        # Reused across rounds, like JassAECEnv's reset buffers.
+        self._deck: List[Card] = list(ALL_CARDS)
+        self._deal_buffer: List[List[Card]] = [[] for _ in range(4)]
+        self._bidding_status = BiddingStatus(starter=starter, current_player=starter, pushed=False)
+        self._spare_fast: Optional[FastState] = None
+        self._timed_opponent: Tuple[Optional[OpponentPolicy], Optional[OpponentPolicy]] = (None, None)
+        self.env_stats: Optional[EnvStats] = None
+        if instrument:
+            self._instrument()
+
+    def _instrument(self) -> None:
+        # Same counters as an instrumented JassSingleAgentEnv; every applied
+        # action (learner or opponent) counts as one engine step of its phase.
+        stats = self.env_stats = EnvStats()
+        self._mask = stats.timed_section("action_mask", self._mask)
+        reset, step, apply = self.reset, self.step, self._apply
+
+        def _timed_apply(seat, action):
+            phase = self.phase
+            started = time.perf_counter()
+            apply(seat, action)
+            stats.record_phase(phase, time.perf_counter() - started)
+
+        def _timed_reset(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return reset(*args, **kwargs)
+            finally:
+                stats.agent_seconds += time.perf_counter() - started
+
+        def _timed_step(action):
+            started = time.perf_counter()
+            try:
+                return step(action)
+            finally:
+                stats.agent_steps += 1
+                stats.agent_seconds += time.perf_counter() - started
+
+        self._apply = _timed_apply
+        self.reset = _timed_reset
+        self.step = _timed_step
+
+    def stats(self) -> EnvStats:
+        return self.env_stats if self.env_stats is not None else EnvStats()
+
+    def set_opponent_sampler(
+        self, sampler: Optional[Callable[[random.Random], OpponentPolicy]]
+    ) -> None:
+        self.opponent_sampler = sampler
+
+    # -- gym interface -------------------------------------------------------
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        if self._fresh_round and seed is None and options is None:
+            self._fresh_round = False
+            return self._observation(0), {}
+        self._fresh_round = False
+        return self._new_round(seed, options)
+
+    def _new_round(self, seed: Optional[int], options: Optional[dict]):
+        if seed is not None:
+            self._rng = random.Random(seed)
+            self._deal_rng = random.Random(seed)
+        self._version += 1
+        self._obs_rows.fill(0.0)
+        self._fast = None
+        self._paid = 0
+        self._tricks.clear()
+        self._announced[:] = (False, False, False, False)
+        options = options or {}
+        requested_hands = options.get("hands")
+        self._dealt_hands = [list(hand) for hand in requested_hands] if requested_hands is not None else None
+
+        if self.enable_bidding:
+            self.phase = "bidding"
+            self.bidding = self._bidding_status
+            self.bidding.starter = self.bidding.current_player = self.starter
+            self.bidding.pushed = False
+            self.mode = None
+            self.trump_suit = None
+            if self._dealt_hands is None:
+                self._dealt_hands = self._deal()
+            self.current = self.starter
+        else:
+            requested_mode = options.get("mode", self.preset_mode)
+            requested_trump = options.get("trump_suit", self.preset_trump_suit)
+            if requested_mode is None:
+                self.mode = self._deal_rng.choice([MODE_TRUMP, MODE_OBEABE, MODE_UNEUFE])
+                self.trump_suit = None
+                if self.mode == MODE_TRUMP:
+                    self.trump_suit = requested_trump or self._deal_rng.choice(SUITS)
+            else:
+                self.mode = requested_mode
+                self.trump_suit = requested_trump
+                if self.mode == MODE_TRUMP and self.trump_suit is None:
+                    self.trump_suit = self._deal_rng.choice(SUITS)
+            self._start_round()
+
+        if self.opponent_sampler is not None:
+            policy = self.opponent_sampler(self._rng)
+        else:
+            policy = self.opponent_policy
+        if self.env_stats is not None:
+            if self._timed_opponent[0] is not policy:
+                self._timed_opponent = (policy, self.env_stats.timed_opponent(policy))
+            policy = self._timed_opponent[1]
+        self._current_opponent_policy = policy
+        self._advance_to_agent()
+        return self._observation(0), {}
+
+    def step(self, action: int):
+        self._fresh_round = False
+        if self.phase == "done":
+            return self._terminal_step(self._payout())
+        self._apply(0, action)
+        self._advance_to_agent()
+        reward = self._payout()
+        if self.phase == "done":
+            return self._terminal_step(reward)
+        return self._observation(0), reward, False, False, {}
+
+    def _terminal_step(self, reward: float = 0.0):
+        info = {"team_points": tuple(self._fast.points)}
+        if not self.auto_reset:
+            return self._terminal_obs, reward, True, False, info
+        obs, _ = self._new_round(None, None)
+        self._fresh_round = True
+        info["terminal_observation"] = self._terminal_obs
+        return obs, reward, True, False, info
+
+    def _payout(self) -> float:
+        points = self._fast.points[0] if self._fast is not None else 0
+        reward = float(points - self._paid)
+        self._paid = points
+        return reward
+
+    def _advance_to_agent(self) -> None:
+        while self.phase != "done":
+            seat = self.current
+            action = self._automatic_action(seat)
+            if action is None:
+                if seat == 0:
+                    return
+                action = self._current_opponent_policy(self, AGENTS[seat])
+            self._apply(seat, action)
+
+    def _automatic_action(self, seat: int) -> Optional[int]:
+        if self.phase == "announce":
+            return ANNOUNCE_ACTION if self.auto_announce else None
+        if self.phase == "play" and (self.auto_forced_learner if seat == 0 else self.auto_forced):
+            legal = self._fast.legal_mask()
+            if not legal & (legal - 1):
+                return legal.bit_length() - 1
+        return None
+
+    def get_action_mask(self) -> np.ndarray:
+        return self._mask(0)
+
+    def action_masks(self) -> np.ndarray:
+        return self._mask(0)
+
+    # -- JassAECEnv surface used by opponent policies -------------------------
+
+    @property
+    def agent_selection(self) -> str:
+        return AGENTS[self.current]
+
+    def dealt_hand(self, player: int) -> List[Card]:
+        if self._dealt_hands is None:
+            raise RuntimeError("no cards dealt yet")
+        return list(self._dealt_hands[player])
+
+    def observation(self, agent: str) -> np.ndarray:
+        return self._observation(_SEAT[agent])
+
+    def action_mask(self, agent: str) -> np.ndarray:
+        return self._mask(_SEAT[agent])
+
+    def observe(self, agent: str):
+        seat = _SEAT[agent]
+        return {"observation": self._observation(seat), "action_mask": self._mask(seat)}
+
+    def _observation(self, seat: int) -> np.ndarray:
+        if self.packed_observation:
+            return pack_observation(self._obs_rows[seat])
+        return self._obs_rows[seat]
+
+    @property
+    def state(self) -> Optional[GameState]:
+        # A core.state.GameState snapshot of the round (for card policies).
+        fast = self._fast
+        if fast is None:
+            return None
+        played = set()
+        completed = []
+        for plays, winner, points in self._tricks:
+            played.update(card for _, card in plays)
+            completed.append(
+                TrickResult(
+                    plays=[(player, ALL_CARDS[card]) for player, card in plays],
+                    winner=winner,
+                    points=points,
+                    last_trick=len(completed) == 8,
+                )
+            )
+        leader = fast.leader
+        trick_plays = [((leader + offset) % 4, card) for offset, card in enumerate(fast.trick)]
+        played.update(fast.trick)
+        hands = [[card for card in hand if CARD_INDEX[card] not in played] for hand in self._dealt_hands]
+        state = GameState(hands=hands, mode=self.mode, trump_suit=self.trump_suit)
+        state.leader = leader
+        state.trick_index = fast.tricks_played
+        state.trick = Trick(plays=[(player, ALL_CARDS[card]) for player, card in trick_plays])
+        state.team_points = list(fast.points)
+        state.completed_tricks = completed
+        return state
+
+    # -- dynamics --------------------------------------------------------------
+
+    def _deal(self) -> List[List[Card]]:
+        deck = self._deck
+        deck[:] = ALL_CARDS
+        self._deal_rng.shuffle(deck)
+        for i, hand in enumerate(self._deal_buffer):
+            hand[:] = deck[i * 9 : (i + 1) * 9]
+        return self._deal_buffer
+
+    def _start_round(self) -> None:
+        leader = self.starter
+        if self._dealt_hands is None:
+            self._dealt_hands = self._deal()
+        hands = []
+        rows = self._obs_rows
+        rows.fill(0.0)
+        for seat, hand in enumerate(self._dealt_hands):
+            mask = 0
+            for card in hand:
+                idx = CARD_INDEX[card]
+                mask |= 1 << idx
+                rows[seat, OBS_HAND_OFFSET + idx] = 1.0
+            hands.append(mask)
+        rows[:, OBS_TRUMP_MODE_OFFSET + _MODE_SLOT[self.mode]] = 1.0
+        if self.trump_suit:
+            rows[:, OBS_TRUMP_SUIT_OFFSET + SUITS.index(self.trump_suit)] = 1.0
+        variant = variant_index(self.mode, self.trump_suit)
+        if self._spare_fast is None:
+            self._spare_fast = FastState(hands, variant, leader, self.ruleset)
+        else:
+            self._spare_fast.reset(hands, variant, leader)
+            self._spare_fast.rules = self.ruleset
+        self._fast = self._spare_fast
+        self.current = leader
+        if self.enable_weis:
+            self.phase = "announce"
+            self._announce_index = 0
+        else:
+            self.phase = "play"
+
+    def _mask(self, seat: int) -> np.ndarray:
+        mask = self._masks[seat]
+        if self._mask_version[seat] == self._version:
+            return mask
+        self._mask_version[seat] = self._version
+        mask.fill(0)
+        if seat != self.current or self.phase == "done":
+            return mask
+        if self.phase == "play":
+            for card in iter_bits(self._fast.legal_mask()):
+                mask[card] = 1
+        elif self.phase == "announce":
+            mask[ANNOUNCE_ACTION] = 1
+            mask[PASS_ACTION] = 1
+        else:
+            mask[36:42] = 1
+            if not self.bidding.pushed and seat == self.bidding.starter:
+                mask[BIDDING_PUSH_ACTION] = 1
+        return mask
+
+    def _apply(self, seat: int, action: int) -> None:
+        self._version += 1
+        if self.phase == "play":
+            self._play(seat, action)
+        elif self.phase == "announce":
+            self._announce(seat, action)
+        else:
+            self._bid(seat, action)
+
+    def _bid(self, seat: int, action: int) -> None:
+        if action == BIDDING_PUSH_ACTION:
+            if self.bidding.pushed or seat != self.bidding.starter:
+                raise ValueError("partner may not push")
+            partner = (self.bidding.starter + 2) % 4
+            self.bidding = BiddingStatus(starter=self.bidding.starter, current_player=partner, pushed=True)
+            self.current = partner
+            return
+        if action in BIDDING_TRUMP_ACTIONS:
+            self.mode, self.trump_suit = MODE_TRUMP, BIDDING_TRUMP_ACTIONS[action]
+        elif action == BIDDING_OBEABE_ACTION:
+            self.mode, self.trump_suit = MODE_OBEABE, None
+        elif action == BIDDING_UNEUFE_ACTION:
+            self.mode, self.trump_suit = MODE_UNEUFE, None
+        else:
+            raise ValueError("invalid bidding action")
+        self._start_round()
+
+    def _announce(self, seat: int, action: int) -> None:
+        if action not in (ANNOUNCE_ACTION, PASS_ACTION):
+            raise ValueError("invalid announce action")
+        self._announced[seat] = action == ANNOUNCE_ACTION
+        self._announce_index += 1
+        leader = self._fast.leader
+        if self._announce_index < 4:
+            self.current = (leader + self._announce_index) % 4
+            return
+        team_cards: List[List[Card]] = [[], []]
+        for player in range(4):
+            if self._announced[player]:
+                team_cards[player % 2].extend(self._dealt_hands[player])
+        points_a, points_b, _, _ = resolve_weis(team_cards[0], team_cards[1])
+        self._fast.points[0] += points_a
+        self._fast.points[1] += points_b
+        self._observe_scores()
+        self.phase = "play"
+        self.current = leader
+
+    def _play(self, seat: int, card: int) -> None:
+        fast = self._fast
+        if card is None or not 0 <= card < 36 or not fast.legal_mask() >> card & 1:
+            raise ValueError("illegal card")
+        closing = len(fast.trick) == 3
+        if closing:
+            plays = [((fast.leader + offset) % 4, played) for offset, played in enumerate(fast.trick)]
+            plays.append((seat, card))
+            points = fast.points[:]
+        fast.play(card)
+        rows = self._obs_rows
+        rows[seat, OBS_HAND_OFFSET + card] = 0.0
+        rows[:, OBS_TRICK_OFFSET + card] = 1.0
+        rows[:, OBS_PLAYED_OFFSET + card] = 1.0
+        if not closing:
+            self.current = (seat + 1) % 4
+            return
+        # Trick complete: FastState has scored it and moved the lead.
+        winner = fast.leader
+        self._tricks.append((plays, winner, fast.points[winner % 2] - points[winner % 2]))
+        rows[:, OBS_TRICK_OFFSET:OBS_PLAYED_OFFSET] = 0.0
+        self._observe_scores()
+        if fast.tricks_played == 9:
+            self.phase = "done"
+        self.current = winner
+
+    def _observe_scores(self) -> None:
+        self._obs_rows[:, OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2] = self._fast.points
+        self._obs_rows[:, OBS_TRICK_INDEX_OFFSET] = self._fast.tricks_played
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from env.jass_aec_env import OBS_POINTS_OFFSET, JassAECEnv
+from env.observation_packing import PACKED_BIT_BYTES
+from rl.single_agent_env import OpponentPolicy, policy_lowest
+
+try:
+    import torch as th
+    from sb3_contrib import MaskablePPO
+    from stable_baselines3.common.utils import obs_as_tensor
+    from stable_baselines3.common.vec_env import VecEnv
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("sb3-contrib is required for multi-seat training") from exc
+
+# Seats driven by the learning policy: all four, or team A (p0, p2) against
+# opponent_policy / opponent_sampler.
+SEAT_SETS = {"all": (0, 1, 2, 3), "team": (0, 2)}
+
+
+def seat_view(observation: np.ndarray, seat: int) -> np.ndarray:
+    # Observations list team points as (A, B). Team B seats get them swapped so
+    # one shared policy always sees (own team, opponents), as p0 does.
+    if seat % 2 == 0:
+        return observation
+    view = observation.copy()
+    if observation.dtype == np.uint8:
+        own = slice(PACKED_BIT_BYTES, PACKED_BIT_BYTES + 2)
+        other = slice(PACKED_BIT_BYTES + 2, PACKED_BIT_BYTES + 4)
+    else:
+        own = slice(OBS_POINTS_OFFSET, OBS_POINTS_OFFSET + 1)
+        other = slice(OBS_POINTS_OFFSET + 1, OBS_POINTS_OFFSET + 2)
+    view[own], view[other] = observation[other], observation[own]
+    return view
+
+
+class MultiSeatVecEnv(VecEnv):
+    # Slot table * len(seats) + k is seat seats[k] of that table, so every
+    # controlled seat has its own trajectory and earns its own team's points.
+    # Only one seat per table acts at a time, which the plain step() API cannot
+    # express: MultiSeatMaskablePPO asks acting_slots() which seat each table
+    # waits for, batches those observations and passes the actions to play().
+    def __init__(
+        self,
+        num_tables: int,
+        seats: str = "all",
+        seed: Optional[int] = None,
+        enable_bidding: bool = True,
+        enable_weis: bool = True,
+        mode: Optional[str] = None,
+        trump_suit: Optional[str] = None,
+        opponent_policy: Optional[OpponentPolicy] = None,
+        opponent_sampler: Optional[Callable[[random.Random], OpponentPolicy]] = None,
+        packed_observation: bool = False,
+    ) -> None:
+        self.seats = SEAT_SETS[seats]
+        self._seat_slot: Dict[int, int] = {seat: k for k, seat in enumerate(self.seats)}
+        self.tables = [
+            JassAECEnv(
+                seed=None if seed is None else seed + index,
+                enable_bidding=enable_bidding,
+                enable_weis=enable_weis,
+                mode=mode,
+                trump_suit=trump_suit,
+                starter=index % 4,
+                packed_observation=packed_observation,
+            )
+            for index in range(num_tables)
+        ]
+        self._rng = random.Random(seed)
+        self.opponent_policy = opponent_policy or policy_lowest
+        self.opponent_sampler = opponent_sampler
+        self._opponents: List[OpponentPolicy] = [self.opponent_policy] * num_tables
+        num_envs = num_tables * len(self.seats)
+        self._rewards = np.zeros(num_envs, dtype=np.float32)
+        self._episode_rewards = np.zeros(num_envs, dtype=np.float64)
+        self._episode_lengths = np.zeros(num_envs, dtype=np.int64)
+        self._started = time.time()
+        # Bumped by reset() so the trainer can drop decisions of old tables.
+        self.resets = 0
+        self.render_mode = None
+        table = self.tables[0]
+        super().__init__(num_envs, table.observation_space("p0")["observation"], table.action_space("p0"))
+
+    def reset(self) -> np.ndarray:
+        self.resets += 1
+        self._rewards[:] = 0.0
+        self._episode_rewards[:] = 0.0
+        self._episode_lengths[:] = 0
+        for index in range(len(self.tables)):
+            self._reset_table(index)
+        obs = np.zeros((self.num_envs,) + self.observation_space.shape, dtype=self.observation_space.dtype)
+        slots = self.acting_slots()
+        obs[slots] = self.slot_observations(slots)
+        return obs
+
+    def step_async(self, actions: np.ndarray) -> None:
+        raise NotImplementedError("MultiSeatVecEnv is stepped through play() by MultiSeatMaskablePPO")
+
+    def step_wait(self):
+        raise NotImplementedError("MultiSeatVecEnv is stepped through play() by MultiSeatMaskablePPO")
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        value = getattr(self, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    def acting_slots(self) -> np.ndarray:
+        # The slot every table waits for, in table order.
+        width = len(self.seats)
+        return np.array(
+            [
+                index * width + self._seat_slot[int(table.agent_selection[1:])]
+                for index, table in enumerate(self.tables)
+            ],
+            dtype=np.int64,
+        )
+
+    def slot_observations(self, slots: np.ndarray) -> np.ndarray:
+        width = len(self.seats)
+        rows = []
+        for slot in slots:
+            table = self.tables[slot // width]
+            seat = self.seats[slot % width]
+            rows.append(seat_view(table.observation(f"p{seat}"), seat))
+        return np.stack(rows)
+
+    def slot_action_masks(self, slots: np.ndarray) -> np.ndarray:
+        width = len(self.seats)
+        return np.stack(
+            [self.tables[slot // width].action_mask(f"p{self.seats[slot % width]}") for slot in slots]
+        )
+
+    def play(self, actions: np.ndarray):
+        # Applies one action per table (for its acting slot) and advances the
+        # table to its next controlled decision. Returns per-slot rewards, dones
+        # (every slot of a finished table) and VecMonitor-style episode infos;
+        # finished tables are reset in place.
+        width = len(self.seats)
+        slots = self.acting_slots()
+        self._rewards[:] = 0.0
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos: List[Dict[str, Any]] = [{} for _ in range(self.num_envs)]
+        for index, action in enumerate(actions):
+            self._episode_lengths[slots[index]] += 1
+            self._step_table(index, int(action))
+            finished = self._advance(index)
+            rows = slice(index * width, (index + 1) * width)
+            self._episode_rewards[rows] += self._rewards[rows]
+            if not finished:
+                continue
+            dones[rows] = True
+            for slot in range(index * width, (index + 1) * width):
+                infos[slot]["episode"] = {
+                    "r": float(self._episode_rewards[slot]),
+                    "l": int(self._episode_lengths[slot]),
+                    "t": round(time.time() - self._started, 6),
+                }
+            self._episode_rewards[rows] = 0.0
+            self._episode_lengths[rows] = 0
+            self.tables[index].starter = (self.tables[index].starter + 1) % 4
+            self._reset_table(index)
+        return self._rewards.copy(), dones, infos
+
+    def _reset_table(self, index: int) -> None:
+        self.tables[index].reset()
+        if self.opponent_sampler is not None:
+            self._opponents[index] = self.opponent_sampler(self._rng)
+        self._advance(index)
+
+    def _advance(self, index: int) -> bool:
+        # Uncontrolled seats act until a controlled one is to move; True once
+        # the round is over.
+        table = self.tables[index]
+        while not table.terminations[table.agent_selection]:
+            agent = table.agent_selection
+            if int(agent[1:]) in self._seat_slot:
+                return False
+            self._step_table(index, self._opponents[index](table, agent))
+        return True
+
+    def _step_table(self, index: int, action: int) -> None:
+        table = self.tables[index]
+        table.step(action)
+        base = index * len(self.seats)
+        for k, seat in enumerate(self.seats):
+            self._rewards[base + k] += table.last_rewards[f"p{seat}"]
+
+
+@dataclass
+class _Decision:
+    obs: np.ndarray
+    action: int
+    mask: np.ndarray
+    value: float
+    log_prob: float
+    episode_start: bool
+    # Points the seat's team earns until the seat's next decision.
+    reward: float = 0.0
+
+
+class MultiSeatMaskablePPO(MaskablePPO):
+    # MaskablePPO on a MultiSeatVecEnv: every ply runs one forward pass over the
+    # acting seat of every table and each decision joins its seat's trajectory.
+    # A rollout holds the first n_steps decisions of every slot; the value of
+    # the next one bootstraps the advantages. Seats that got ahead lose their
+    # surplus decisions, except the latest, which opens the next rollout.
+    def collect_rollouts(self, env, callback, rollout_buffer, n_rollout_steps: int, use_masking: bool = True) -> bool:
+        if not isinstance(env, MultiSeatVecEnv):
+            raise TypeError("MultiSeatMaskablePPO needs a MultiSeatVecEnv")
+        self.policy.set_training_mode(False)
+        rollout_buffer.reset()
+        trajectories = self._open_trajectories(env)
+        callback.on_rollout_start()
+
+        while min(len(trajectory) for trajectory in trajectories) <= n_rollout_steps:
+            slots = env.acting_slots()
+            obs = env.slot_observations(slots)
+            masks = env.slot_action_masks(slots)
+            with th.no_grad():
+                actions, values, log_probs = self.policy(obs_as_tensor(obs, self.device), action_masks=masks)
+            actions = actions.cpu().numpy()
+            values = values.cpu().numpy().flatten()
+            log_probs = log_probs.cpu().numpy()
+            for row, slot in enumerate(slots):
+                trajectories[slot].append(
+                    _Decision(
+                        obs=obs[row],
+                        action=int(actions[row]),
+                        mask=masks[row],
+                        value=float(values[row]),
+                        log_prob=float(log_probs[row]),
+                        episode_start=bool(self._slot_starts[slot]),
+                    )
+                )
+            self._slot_starts[slots] = False
+
+            rewards, dones, infos = env.play(actions)
+            for slot in np.flatnonzero(rewards):
+                trajectories[slot][-1].reward += float(rewards[slot])
+            self._slot_starts[dones] = True
+            self.num_timesteps += len(slots)
+
+            callback.update_locals(locals())
+            if not callback.on_step():
+                return False
+            self._update_info_buffer(infos, dones)
+
+        for step in range(n_rollout_steps):
+            decisions = [trajectory[step] for trajectory in trajectories]
+            rollout_buffer.add(
+                np.stack([decision.obs for decision in decisions]),
+                np.array([[decision.action] for decision in decisions]),
+                np.array([decision.reward for decision in decisions], dtype=np.float32),
+                np.array([decision.episode_start for decision in decisions]),
+                th.tensor([decision.value for decision in decisions]),
+                th.tensor([decision.log_prob for decision in decisions]),
+                action_masks=np.stack([decision.mask for decision in decisions]),
+            )
+        following = [trajectory[n_rollout_steps] for trajectory in trajectories]
+        rollout_buffer.compute_returns_and_advantage(
+            last_values=th.tensor([decision.value for decision in following]),
+            dones=np.array([decision.episode_start for decision in following]),
+        )
+        self._trajectories = [[trajectory[-1]] for trajectory in trajectories]
+
+        callback.on_rollout_end()
+        return True
+
+    def _open_trajectories(self, env: MultiSeatVecEnv) -> List[List[_Decision]]:
+        if getattr(self, "_trajectory_resets", None) != env.resets:
+            self._trajectory_resets = env.resets
+            self._trajectories = [[] for _ in range(env.num_envs)]
+            self._slot_starts = np.ones(env.num_envs, dtype=bool)
+            return self._trajectories
+        # Decisions carried over from the last rollout keep the log-prob of the
+        # policy that made them; their values are refreshed after the update.
+        carried = [trajectory[0] for trajectory in self._trajectories]
+        with th.no_grad():
+            values = self.policy.predict_values(
+                obs_as_tensor(np.stack([decision.obs for decision in carried]), self.device)
+            )
+        for decision, value in zip(carried, values.cpu().numpy().flatten()):
+            decision.value = float(value)
+        return self._trajectories
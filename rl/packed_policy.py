@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from env.observation_packing import OBS_SIZE, PACKED_BIT_BYTES, PACKED_BITS
+
+try:
+    import torch
+    from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("stable-baselines3 is required for packed observations") from exc
+
+
+class PackedObservationExtractor(BaseFeaturesExtractor):
+    # Unpacks env.observation_packing bytes back into the 118 float features
+    # on the policy's device, so the MLP sees exactly the unpacked observation.
+
+    def __init__(self, observation_space) -> None:
+        super().__init__(observation_space, features_dim=OBS_SIZE)
+        self.register_buffer("_shifts", torch.arange(7, -1, -1), persistent=False)
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        packed = observations.long()
+        bits = (packed[:, :PACKED_BIT_BYTES, None] >> self._shifts) & 1
+        bits = bits.reshape(len(packed), -1)[:, :PACKED_BITS]
+        points = packed[:, 15:19:2] + 256 * packed[:, 16:19:2]
+        return torch.cat([bits, points, packed[:, 19:20]], dim=1).float()
+
+
+def packed_policy_kwargs() -> Dict[str, Any]:
+    # policy_kwargs for MaskablePPO("MlpPolicy", ...) on packed observations.
+    return {"features_extractor_class": PackedObservationExtractor}
@@ -0,0 +1,459 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import pickle
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import gymnasium as gym
+except ImportError:  # pragma: no cover
+    import gym  # type: ignore
+
+from env.jass_aec_env import ACTION_COUNT
+from rl.single_agent_env import JassSingleAgentEnv
+
+try:
+    from stable_baselines3.common.vec_env import SubprocVecEnv, VecEnv, VecEnvWrapper
+    from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("stable-baselines3 is required for ShmVecEnv") from exc
+
+OBS_SIZE = 118
+# Step requests are raw action bytes behind this tag; everything else is pickled.
+_STEP = b"S"
+
+# Imported once by the forkserver, so forked workers start with these modules
+# (and their module-level lookup tables) already in copy-on-write memory.
+# Workers unpickle env_fns through stable_baselines3, which pulls in torch.
+WORKER_PRELOAD = (
+    "numpy",
+    "torch",
+    "stable_baselines3",
+    "gymnasium",
+    "pettingzoo",
+    "core.fast_engine",
+    "env.jass_aec_env",
+    "rl.single_agent_env",
+    "rl.fused_env",
+    "rl.vector_env",
+)
+
+
+def preload_forkserver(modules: Sequence[str] = WORKER_PRELOAD) -> None:
+    # Must run before the first forkserver process is started (by ShmVecEnv,
+    # SubprocVecEnv or anything else); later calls have no effect. Modules that
+    # fail to import are skipped by multiprocessing.
+    if "forkserver" in mp.get_all_start_methods():
+        mp.get_context("forkserver").set_forkserver_preload(list(modules))
+
+
+def _fields(observation_space: gym.spaces.Box) -> Dict[str, Tuple[tuple, Any]]:
+    return {
+        "obs": (observation_space.shape, observation_space.dtype),
+        "terminal_obs": (observation_space.shape, observation_space.dtype),
+        "masks": ((ACTION_COUNT,), np.int8),
+        "rewards": ((), np.float32),
+        "dones": ((), np.bool_),
+    }
+
+
+def _attach(names: Dict[str, str], num_envs: int, observation_space: gym.spaces.Box):
+    blocks = {}
+    arrays = {}
+    for field, (shape, dtype) in _fields(observation_space).items():
+        # Workers share the parent's resource tracker, which unlinks the
+        # segments if the parent dies without close().
+        block = shared_memory.SharedMemory(name=names[field])
+        blocks[field] = block
+        arrays[field] = np.ndarray((num_envs,) + shape, dtype=dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def _worker(
+    conn,
+    env_fns: CloudpickleWrapper,
+    names: Dict[str, str],
+    num_envs: int,
+    start: int,
+    observation_space: gym.spaces.Box,
+) -> None:
+    # Owns rows [start, start + len(envs)) of the shared arrays, steps all of its
+    # envs per message and answers every request with an empty message. The
+    # first message reports when the worker started and when its envs were built.
+    entered = time.time()
+    blocks, arrays = _attach(names, num_envs, observation_space)
+    envs = [env_fn() for env_fn in env_fns.var]
+    conn.send((entered, time.time()))
+    stop = start + len(envs)
+    obs_rows = arrays["obs"][start:stop]
+    mask_rows = arrays["masks"][start:stop]
+    reward_rows = arrays["rewards"][start:stop]
+    done_rows = arrays["dones"][start:stop]
+    terminal_rows = arrays["terminal_obs"][start:stop]
+    try:
+        while True:
+            message = conn.recv_bytes()
+            if message[:1] == _STEP:
+                actions = np.frombuffer(message, dtype=np.int64, offset=8)
+                for row, env in enumerate(envs):
+                    obs, reward, terminated, truncated, info = env.step(int(actions[row]))
+                    done = terminated or truncated
+                    if done:
+                        # Auto-resetting envs already return the next round's
+                        # first observation; their reset() then keeps it.
+                        terminal_rows[row] = info.get("terminal_observation", obs)
+                        obs, _ = env.reset()
+                    obs_rows[row] = obs
+                    reward_rows[row] = reward
+                    done_rows[row] = done
+                    mask_rows[row] = env.action_masks()
+                conn.send_bytes(b"")
+                continue
+            command, data = pickle.loads(message)
+            if command == "reset":
+                for row, (seed, options) in enumerate(data):
+                    obs, _ = envs[row].reset(seed=seed, options=options or None)
+                    obs_rows[row] = obs
+                    mask_rows[row] = envs[row].action_masks()
+                conn.send_bytes(b"")
+            elif command == "env_method":
+                rows, (name, args, kwargs) = data
+                conn.send([getattr(envs[row], name)(*args, **kwargs) for row in rows])
+            elif command == "get_attr":
+                rows, name = data
+                conn.send([getattr(envs[row], name) for row in rows])
+            elif command == "set_attr":
+                rows, (name, value) = data
+                for row in rows:
+                    setattr(envs[row], name, value)
+                conn.send(None)
+            elif command == "close":
+                conn.close()
+                return
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+class ShmVecEnv(VecEnv):
+    # Subprocess vector env for JassSingleAgentEnv: observations, masks,
+    # rewards and done flags live in shared memory, so a step only sends the
+    # actions down each pipe and an empty acknowledgement back. action_masks()
+    # reads the shared array without any IPC. Each worker owns a contiguous
+    # slice of `envs_per_worker` envs, which amortises the round trip.
+
+    def __init__(
+        self,
+        env_fns: List[Callable[[], gym.Env]],
+        start_method: Optional[str] = None,
+        envs_per_worker: int = 1,
+        observation_space: Optional[gym.spaces.Box] = None,
+        preload: Optional[Sequence[str]] = WORKER_PRELOAD,
+    ) -> None:
+        # observation_space must match the envs (e.g. their packed_observation).
+        created = time.time()
+        num_envs = len(env_fns)
+        self.envs_per_worker = envs_per_worker = max(1, envs_per_worker)
+        self.render_mode = None
+        if observation_space is None:
+            observation_space = gym.spaces.Box(low=0.0, high=1.0, shape=(OBS_SIZE,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, gym.spaces.Discrete(ACTION_COUNT))
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+        for field, (shape, dtype) in _fields(observation_space).items():
+            size = max(1, int(np.prod((num_envs,) + shape)) * np.dtype(dtype).itemsize)
+            block = shared_memory.SharedMemory(create=True, size=size)
+            self._blocks[field] = block
+            self._arrays[field] = np.ndarray((num_envs,) + shape, dtype=dtype, buffer=block.buf)
+        names = {field: block.name for field, block in self._blocks.items()}
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        if start_method == "forkserver" and preload:
+            preload_forkserver(preload)
+        context = mp.get_context(start_method)
+        self._conns = []
+        self._processes = []
+        # (start, stop) rows and an 8-byte header + int64 actions per worker.
+        self._slices = []
+        self._step_messages = []
+        for start in range(0, num_envs, envs_per_worker):
+            stop = min(num_envs, start + envs_per_worker)
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(child, CloudpickleWrapper(env_fns[start:stop]), names, num_envs, start, observation_space),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+            self._slices.append((start, stop))
+            message = bytearray(8 + 8 * (stop - start))
+            message[:1] = _STEP
+            self._step_messages.append(message)
+        self.closed = False
+        # Seconds since construction began; see startup_stats().
+        started, built = zip(*(conn.recv() for conn in self._conns))
+        self._first_reset_seconds = 0.0
+        self._step_started = 0.0
+        self._startup = {
+            "workers": float(len(self._conns)),
+            "worker_start_seconds": max(started) - created,
+            "env_build_seconds": max(stamp - begin for begin, stamp in zip(started, built)),
+            "ready_seconds": time.time() - created,
+        }
+
+    @property
+    def num_workers(self) -> int:
+        return len(self._conns)
+
+    def startup_stats(self) -> Dict[str, float]:
+        # worker_start_seconds: until the slowest worker ran (process start,
+        # imports and unpickling its env_fns); env_build_seconds: slowest env
+        # construction; ready_seconds: until every worker was ready;
+        # first_step_seconds: ready_seconds plus the first reset() and step()
+        # round trips, leaving out whatever the caller did in between (e.g.
+        # building the model).
+        return dict(self._startup)
+
+    def reset(self) -> np.ndarray:
+        started = time.time()
+        for conn, (start, stop) in zip(self._conns, self._slices):
+            data = [(self._seeds[index], self._options[index]) for index in range(start, stop)]
+            conn.send_bytes(pickle.dumps(("reset", data)))
+        for conn in self._conns:
+            conn.recv_bytes()
+        if "first_step_seconds" not in self._startup:
+            self._first_reset_seconds = time.time() - started
+        self._reset_seeds()
+        self._reset_options()
+        return self._arrays["obs"].copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._step_started = time.time()
+        actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+        for conn, (start, stop), message in zip(self._conns, self._slices, self._step_messages):
+            message[8:] = actions[start:stop].tobytes()
+            conn.send_bytes(message)
+
+    def step_wait(self):
+        for conn in self._conns:
+            conn.recv_bytes()
+        if "first_step_seconds" not in self._startup:
+            self._startup["first_step_seconds"] = (
+                self._startup["ready_seconds"] + self._first_reset_seconds + time.time() - self._step_started
+            )
+        dones = self._arrays["dones"].copy()
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        for index in np.flatnonzero(dones):
+            infos[index]["terminal_observation"] = self._arrays["terminal_obs"][index].copy()
+        return self._arrays["obs"].copy(), self._arrays["rewards"].copy(), dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        return self._arrays["masks"].copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send_bytes(pickle.dumps(("close", None)))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._arrays = {}
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+        self.closed = True
+
+    def _request(self, command: str, data: Any, indices) -> List[Any]:
+        # One message per worker holding any of `indices`; results come back
+        # in the order of `indices`.
+        indices = list(self._get_indices(indices))
+        rows: Dict[int, List[int]] = {}
+        for index in indices:
+            worker, row = divmod(index, self.envs_per_worker)
+            rows.setdefault(worker, []).append(row)
+        for worker, local in rows.items():
+            self._conns[worker].send_bytes(pickle.dumps((command, (local, data))))
+        results: Dict[int, Any] = {}
+        for worker, local in rows.items():
+            reply = self._conns[worker].recv()
+            if reply is None:
+                continue
+            start = self._slices[worker][0]
+            for row, value in zip(local, reply):
+                results[start + row] = value
+        return [results.get(index) for index in indices]
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return self._request("get_attr", attr_name, indices)
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        self._request("set_attr", (attr_name, value), indices)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            return list(self._arrays["masks"][list(self._get_indices(indices))])
+        return self._request("env_method", (method_name, method_args, method_kwargs), indices)
+
+    def has_attr(self, attr_name: str) -> bool:
+        return attr_name == "action_masks" or super().has_attr(attr_name)
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+
+class StartupTimer(VecEnvWrapper):
+    # startup_stats() for vec envs that have none, e.g. SB3's SubprocVecEnv:
+    # ready_seconds is how long building `venv` took (measured by the caller)
+    # and first_step_seconds adds the first reset() and step() round trips,
+    # as ShmVecEnv does.
+
+    def __init__(self, venv: VecEnv, ready_seconds: float, workers: Optional[int] = None) -> None:
+        super().__init__(venv)
+        self._startup = {
+            "workers": float(venv.num_envs if workers is None else workers),
+            "ready_seconds": ready_seconds,
+        }
+        self._first_reset_seconds = 0.0
+        self._step_started = 0.0
+
+    def startup_stats(self) -> Dict[str, float]:
+        return dict(self._startup)
+
+    def reset(self) -> np.ndarray:
+        started = time.time()
+        obs = self.venv.reset()
+        if "first_step_seconds" not in self._startup:
+            self._first_reset_seconds = time.time() - started
+        return obs
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._step_started = time.time()
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        result = self.venv.step_wait()
+        if "first_step_seconds" not in self._startup:
+            self._startup["first_step_seconds"] = (
+                self._startup["ready_seconds"] + self._first_reset_seconds + time.time() - self._step_started
+            )
+        return result
+
+
+def _bench_env(seed: int) -> JassSingleAgentEnv:
+    return JassSingleAgentEnv(seed=seed)
+
+
+def _steps_per_sec(venv: VecEnv, seconds: float, seed: int) -> float:
+    rng = np.random.default_rng(seed)
+    venv.reset()
+    steps = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        masks = np.stack(venv.env_method("action_masks"))
+        venv.step(np.argmax(rng.random(masks.shape) * masks, axis=1))
+        steps += venv.num_envs
+    return steps / (time.perf_counter() - started)
+
+
+def scaling_report(
+    worker_counts: Sequence[int], seconds: float = 3.0, envs_per_worker: int = 1
+) -> List[Dict[str, float]]:
+    # SubprocVecEnv always runs one env per process; ShmVecEnv packs
+    # `envs_per_worker` envs into each of `workers` processes.
+    rows = []
+    for workers in worker_counts:
+        num_envs = workers * envs_per_worker
+        env_fns = [lambda rank=rank: _bench_env(rank) for rank in range(num_envs)]
+        row: Dict[str, float] = {"workers": workers, "envs": num_envs}
+        factories = (
+            ("subproc", lambda: SubprocVecEnv(env_fns)),
+            ("shm", lambda: ShmVecEnv(env_fns, envs_per_worker=envs_per_worker)),
+        )
+        for name, factory in factories:
+            venv = factory()
+            try:
+                row[name] = _steps_per_sec(venv, seconds, workers)
+            finally:
+                venv.close()
+        rows.append(row)
+    return rows
+
+
+def startup_report(
+    workers: int, envs_per_worker: int = 1, preload: bool = True, transport: str = "shm"
+) -> Dict[str, float]:
+    # The forkserver is shared by the whole process, so only the first report
+    # of a run shows the cost of starting (and preloading) it. SubprocVecEnv
+    # runs one env per worker.
+    num_envs = workers * envs_per_worker if transport == "shm" else workers
+    env_fns = [lambda rank=rank: _bench_env(rank) for rank in range(num_envs)]
+    if transport == "shm":
+        venv = ShmVecEnv(env_fns, envs_per_worker=envs_per_worker, preload=WORKER_PRELOAD if preload else None)
+    else:
+        start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        if start_method == "forkserver" and preload:
+            preload_forkserver(WORKER_PRELOAD)
+        created = time.time()
+        venv = StartupTimer(SubprocVecEnv(env_fns, start_method=start_method), ready_seconds=time.time() - created)
+    try:
+        venv.reset()
+        venv.step(np.argmax(np.stack(venv.env_method("action_masks")), axis=1))
+        return venv.startup_stats()
+    finally:
+        venv.close()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SubprocVecEnv vs ShmVecEnv throughput")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--envs-per-worker", type=int, default=1)
+    parser.add_argument("--startup", action="store_true", help="report worker time-to-first-step instead")
+    parser.add_argument("--no-preload", action="store_true")
+    parser.add_argument("--transport", choices=["shm", "subproc"], default="shm")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.startup:
+        for workers in args.workers:
+            stats = startup_report(
+                workers, args.envs_per_worker, preload=not args.no_preload, transport=args.transport
+            )
+            workers_line = f"workers={workers:>3}"
+            if "worker_start_seconds" in stats:
+                workers_line += (
+                    f" worker start={stats['worker_start_seconds']:.2f}s"
+                    f" env build={stats['env_build_seconds']:.3f}s"
+                )
+            print(
+                f"{workers_line} ready={stats['ready_seconds']:.2f}s "
+                f"first step={stats['first_step_seconds']:.2f}s"
+            )
+        return
+    for row in scaling_report(args.workers, args.seconds, args.envs_per_worker):
+        print(
+            f"workers={row['workers']:>3} envs={row['envs']:>4} subproc={row['subproc']:>9.0f} steps/s "
+            f"shm={row['shm']:>9.0f} steps/s speedup={row['shm'] / row['subproc']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
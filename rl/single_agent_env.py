@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import random
-from typing import Callable, Optional
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
 
 import numpy as np
 
@@ -10,29 +12,79 @@ try:
 except ImportError:  # pragma: no cover
     import gym  # type: ignore
 
-from env.jass_aec_env import ACTION_COUNT, JassAECEnv
+from core.cards import MODE_OBEABE
+from core.game import Policy
+from env.jass_aec_env import (
+    ACTION_COUNT,
+    ANNOUNCE_ACTION,
+    BIDDING_OBEABE_ACTION,
+    BIDDING_PUSH_ACTION,
+    BIDDING_TRUMP_ACTIONS,
+    BIDDING_UNEUFE_ACTION,
+    EnvSnapshot,
+    JassAECEnv,
+)
+from env.instrumentation import EnvStats
 
 
 OpponentPolicy = Callable[[JassAECEnv, str], int]
 
 
 def policy_lowest(env: JassAECEnv, agent: str) -> int:
-    obs = env.observe(agent)
-    mask = obs["action_mask"]
-    legal = np.flatnonzero(mask)
+    legal = np.flatnonzero(env.action_mask(agent))
     return int(legal[0])
 
 
 def policy_random(rng: random.Random) -> OpponentPolicy:
     def _policy(env: JassAECEnv, agent: str) -> int:
-        obs = env.observe(agent)
-        mask = obs["action_mask"]
-        legal = np.flatnonzero(mask)
+        legal = np.flatnonzero(env.action_mask(agent))
         return int(rng.choice(list(legal)))
 
     return _policy
 
 
+def policy_card(card_policy: Policy) -> OpponentPolicy:
+    # Adapts a core.game.Policy (e.g. search.ISMCTSAgent) for the play phase;
+    # bidding and announce decisions fall back to policy_lowest.
+    def _policy(env: JassAECEnv, agent: str) -> int:
+        if env.phase != "play":
+            return policy_lowest(env, agent)
+        card = card_policy(env.state, int(agent[1:]))
+        return env.card_to_index[(card.suit, card.rank)]
+
+    return _policy
+
+
+def policy_bidding(advisor, fallback: OpponentPolicy = policy_lowest) -> OpponentPolicy:
+    # Bids with a search.BiddingAdvisor (anything with advise(hand, can_push))
+    # from the seat's dealt hand; other phases are handled by `fallback`.
+    trump_actions = {suit: action for action, suit in BIDDING_TRUMP_ACTIONS.items()}
+
+    def _policy(env: JassAECEnv, agent: str) -> int:
+        if env.phase != "bidding":
+            return fallback(env, agent)
+        advice = advisor.advise(env.dealt_hand(int(agent[1:])), can_push=not env.bidding.pushed)
+        if advice.push:
+            return BIDDING_PUSH_ACTION
+        if advice.best.trump_suit is not None:
+            return trump_actions[advice.best.trump_suit]
+        if advice.best.mode == MODE_OBEABE:
+            return BIDDING_OBEABE_ACTION
+        return BIDDING_UNEUFE_ACTION
+
+    return _policy
+
+
+@dataclass(frozen=True)
+class SingleAgentSnapshot:
+    env: EnvSnapshot
+    rng_state: tuple
+    # The opponent policy drawn for this round; its own internal state (e.g. a
+    # policy_random RNG) is not captured.
+    opponent_policy: OpponentPolicy
+    pending_reward: float
+
+
 class JassSingleAgentEnv(gym.Env):
     metadata = {"render_modes": []}
 
@@ -46,8 +98,33 @@ class JassSingleAgentEnv(gym.Env):
         starter: int = 0,
         opponent_policy: Optional[OpponentPolicy] = None,
         opponent_sampler: Optional[Callable[[random.Random], OpponentPolicy]] = None,
+        auto_forced: bool = False,
+        auto_forced_learner: bool = False,
+        auto_announce: bool = False,
+        packed_observation: bool = False,
+        instrument: bool = False,
+        auto_reset: bool = False,
     ) -> None:
         super().__init__()
+        # auto_forced / auto_forced_learner play cards without a decision when
+        # exactly one is legal (opponents / p0); auto_announce makes every seat
+        # announce its Weis. Rewards of skipped plies go to the next step, also
+        # those scored during reset(); without these options reset() scores
+        # nothing, since p0 takes part in every announcement and trick.
+        self.auto_forced = auto_forced
+        self.auto_forced_learner = auto_forced_learner
+        self.auto_announce = auto_announce
+        self._pending_reward = 0.0
+        # auto_reset: the terminal step starts the next round and returns its
+        # first observation (the zero terminal observation moves to
+        # info["terminal_observation"]); a plain reset() right after that keeps
+        # the fresh round instead of dealing another one. SB3's DummyVecEnv and
+        # SubprocVecEnv overwrite info["terminal_observation"] with the returned
+        # observation; only truncated episodes read it and rounds never are.
+        # Either way env.state already holds the next round after the terminal
+        # step, so the final scores are in info["team_points"].
+        self.auto_reset = auto_reset
+        self._fresh_round = False
         self.env = JassAECEnv(
             seed=seed,
             enable_bidding=enable_bidding,
@@ -55,6 +132,8 @@ class JassSingleAgentEnv(gym.Env):
             mode=mode,
             trump_suit=trump_suit,
             starter=starter,
+            packed_observation=packed_observation,
+            instrument=instrument,
         )
         self._rng = random.Random(seed)
         self.opponent_policy = opponent_policy or policy_lowest
@@ -62,9 +141,40 @@ class JassSingleAgentEnv(gym.Env):
         self._current_opponent_policy: OpponentPolicy = self.opponent_policy
 
         self.action_space = gym.spaces.Discrete(ACTION_COUNT)
-        self.observation_space = gym.spaces.Box(
-            low=0.0, high=1.0, shape=(118,), dtype=np.float32
-        )
+        self.observation_space = self.env.observation_space("p0")["observation"]
+        self._terminal_obs = np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+        self._terminal_obs.flags.writeable = False
+        # The last opponent policy drawn and its timed wrapper (instrument=True).
+        self._timed_opponent: Tuple[Optional[OpponentPolicy], Optional[OpponentPolicy]] = (None, None)
+        if instrument:
+            self._instrument()
+
+    def _instrument(self) -> None:
+        # Shares the AEC env's EnvStats and adds learner step and reset time;
+        # opponent policies are wrapped when drawn in reset().
+        stats = self.env.env_stats
+        reset, step = self.reset, self.step
+
+        def _timed_reset(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return reset(*args, **kwargs)
+            finally:
+                stats.agent_seconds += time.perf_counter() - started
+
+        def _timed_step(action):
+            started = time.perf_counter()
+            try:
+                return step(action)
+            finally:
+                stats.agent_steps += 1
+                stats.agent_seconds += time.perf_counter() - started
+
+        self.reset = _timed_reset
+        self.step = _timed_step
+
+    def stats(self) -> EnvStats:
+        return self.env.stats()
 
     def set_opponent_sampler(
         self, sampler: Optional[Callable[[random.Random], OpponentPolicy]]
@@ -72,22 +182,35 @@ class JassSingleAgentEnv(gym.Env):
         self.opponent_sampler = sampler
 
     def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        if self._fresh_round and seed is None and options is None:
+            self._fresh_round = False
+            return self.env.observation("p0"), {}
+        self._fresh_round = False
+        return self._new_round(seed, options)
+
+    def _new_round(self, seed: Optional[int], options: Optional[dict]):
         if seed is not None:
             self._rng = random.Random(seed)
         self.env.reset(seed=seed, options=options)
         if self.opponent_sampler is not None:
-            self._current_opponent_policy = self.opponent_sampler(self._rng)
+            policy = self.opponent_sampler(self._rng)
         else:
-            self._current_opponent_policy = self.opponent_policy
-        self._advance_to_agent()
-        obs = self.env.observe("p0")["observation"]
+            policy = self.opponent_policy
+        if self.env.env_stats is not None:
+            if self._timed_opponent[0] is not policy:
+                self._timed_opponent = (policy, self.env.env_stats.timed_opponent(policy))
+            policy = self._timed_opponent[1]
+        self._current_opponent_policy = policy
+        self._pending_reward = self._advance_to_agent()
+        obs = self.env.observation("p0")
         return obs, {}
 
     def step(self, action: int):
+        self._fresh_round = False
+        reward, self._pending_reward = self._pending_reward, 0.0
         if self.env.terminations.get("p0") or self.env.truncations.get("p0"):
-            return self._terminal_step()
+            return self._terminal_step(reward)
 
-        reward = 0.0
         self.env.step(action)
         reward += self.env.last_rewards.get("p0", 0.0)
 
@@ -98,29 +221,66 @@ class JassSingleAgentEnv(gym.Env):
         if terminated or truncated:
             return self._terminal_step(reward)
 
-        obs = self.env.observe("p0")["observation"]
+        obs = self.env.observation("p0")
         return obs, reward, False, False, {}
 
     def _terminal_step(self, reward: float = 0.0):
-        obs = np.zeros(self.observation_space.shape, dtype=np.float32)
-        return obs, reward, True, False, {}
+        info = {"team_points": tuple(self.env.state.team_points)}
+        if not self.auto_reset:
+            return self._terminal_obs, reward, True, False, info
+        obs, _ = self._new_round(None, None)
+        self._fresh_round = True
+        info["terminal_observation"] = self._terminal_obs
+        return obs, reward, True, False, info
 
     def _advance_to_agent(self) -> float:
         reward = 0.0
-        while self.env.agents and self.env.agent_selection != "p0":
+        while self.env.agents:
             agent = self.env.agent_selection
-            if self.env.terminations.get(agent) or self.env.truncations.get(agent):
+            finished = self.env.terminations.get(agent) or self.env.truncations.get(agent)
+            if agent == "p0":
+                action = None if finished else self._automatic_action(agent, self.auto_forced_learner)
+                if action is None:
+                    break
+            elif finished:
                 self.env.step(None)
                 reward += self.env.last_rewards.get("p0", 0.0)
                 continue
-            action = self._current_opponent_policy(self.env, agent)
+            else:
+                action = self._automatic_action(agent, self.auto_forced)
+                if action is None:
+                    action = self._current_opponent_policy(self.env, agent)
             self.env.step(action)
             reward += self.env.last_rewards.get("p0", 0.0)
         return reward
 
+    def _automatic_action(self, agent: str, forced: bool) -> Optional[int]:
+        phase = self.env.phase
+        if phase == "announce":
+            return ANNOUNCE_ACTION if self.auto_announce else None
+        if phase == "play" and forced:
+            legal = np.flatnonzero(self.env.action_mask(agent))
+            if len(legal) == 1:
+                return int(legal[0])
+        return None
+
+    def snapshot(self) -> SingleAgentSnapshot:
+        return SingleAgentSnapshot(
+            env=self.env.snapshot(),
+            rng_state=self._rng.getstate(),
+            opponent_policy=self._current_opponent_policy,
+            pending_reward=self._pending_reward,
+        )
+
+    def restore(self, snapshot: SingleAgentSnapshot) -> None:
+        self.env.restore(snapshot.env)
+        self._rng.setstate(snapshot.rng_state)
+        self._current_opponent_policy = snapshot.opponent_policy
+        self._pending_reward = snapshot.pending_reward
+        self._fresh_round = False
+
     def get_action_mask(self) -> np.ndarray:
-        obs = self.env.observe("p0")
-        return obs["action_mask"]
+        return self.env.action_mask("p0")
 
     def action_masks(self) -> np.ndarray:
         return self.get_action_mask()
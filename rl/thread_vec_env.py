@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import gymnasium as gym
+except ImportError:  # pragma: no cover
+    import gym  # type: ignore
+
+from env.jass_aec_env import ACTION_COUNT
+from rl.single_agent_env import JassSingleAgentEnv
+
+try:
+    from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("stable-baselines3 is required for ThreadVecEnv") from exc
+
+OBS_SIZE = 118
+
+# Rows [start, stop) of the vec env -> None; run by the thread owning them.
+_Task = Callable[[int, int], None]
+
+
+def gil_enabled() -> bool:
+    # sys._is_gil_enabled exists from CPython 3.13 on; older builds always
+    # hold the GIL.
+    check = getattr(sys, "_is_gil_enabled", None)
+    return True if check is None else bool(check())
+
+
+def _thread_main(tasks: "queue.SimpleQueue", done: "queue.SimpleQueue", start: int, stop: int) -> None:
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        try:
+            task(start, stop)
+        except BaseException as exc:  # re-raised by the caller
+            done.put(exc)
+        else:
+            done.put(None)
+
+
+class ThreadVecEnv(VecEnv):
+    # In-process vector env for JassSingleAgentEnv-style envs. Each worker
+    # thread builds and owns a contiguous slice of `envs_per_thread` envs and
+    # writes their observations, masks, rewards and dones into its own rows of
+    # preallocated arrays, so nothing is pickled. Each env keeps its own state
+    # and RNG (opponent samplers draw with the env's RNG); core/env only hold
+    # read-only lookup tables at module level, and opponent models shared by
+    # several envs (rl.train_selfplay.OpponentPool) serialise their forward
+    # passes. Unlike one process per worker, envs, policies and tables exist once.
+    #
+    # Threads only pay off on free-threaded CPython. With the GIL enabled the
+    # env steps every slice sequentially in the calling thread instead, unless
+    # force_threads is set (used by the benchmark and tests).
+
+    def __init__(
+        self,
+        env_fns: List[Callable[[], gym.Env]],
+        envs_per_thread: int = 1,
+        observation_space: Optional[gym.spaces.Box] = None,
+        force_threads: bool = False,
+    ) -> None:
+        num_envs = len(env_fns)
+        self.envs_per_thread = envs_per_thread = max(1, envs_per_thread)
+        self.render_mode = None
+        if observation_space is None:
+            observation_space = gym.spaces.Box(low=0.0, high=1.0, shape=(OBS_SIZE,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, gym.spaces.Discrete(ACTION_COUNT))
+        shape, dtype = observation_space.shape, observation_space.dtype
+        self._obs = np.zeros((num_envs,) + shape, dtype=dtype)
+        self._terminal_obs = np.zeros((num_envs,) + shape, dtype=dtype)
+        self._masks = np.zeros((num_envs, ACTION_COUNT), dtype=np.int8)
+        self._rewards = np.zeros(num_envs, dtype=np.float32)
+        self._dones = np.zeros(num_envs, dtype=bool)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        self._infos: List[dict] = [{} for _ in range(num_envs)]
+        self._reset_args: List[tuple] = [(None, None)] * num_envs
+        self._env_fns = env_fns
+        self.envs: List[gym.Env] = [None] * num_envs  # type: ignore[list-item]
+
+        self.threaded = force_threads or not gil_enabled()
+        self._threads: List[threading.Thread] = []
+        self._tasks: List["queue.SimpleQueue"] = []
+        self._done: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._pending = False
+        if self.threaded:
+            for start in range(0, num_envs, envs_per_thread):
+                stop = min(num_envs, start + envs_per_thread)
+                tasks: "queue.SimpleQueue" = queue.SimpleQueue()
+                thread = threading.Thread(
+                    target=_thread_main, args=(tasks, self._done, start, stop), daemon=True
+                )
+                thread.start()
+                self._tasks.append(tasks)
+                self._threads.append(thread)
+        self._run(self._build_rows)
+        self.closed = False
+
+    @property
+    def num_threads(self) -> int:
+        return max(1, len(self._threads))
+
+    def _run(self, task: _Task) -> None:
+        self._submit(task)
+        self._wait()
+
+    def _submit(self, task: _Task) -> None:
+        if not self.threaded:
+            task(0, self.num_envs)
+            return
+        for tasks in self._tasks:
+            tasks.put(task)
+        self._pending = True
+
+    def _wait(self) -> None:
+        if not self._pending:
+            return
+        self._pending = False
+        error = None
+        for _ in self._tasks:
+            result = self._done.get()
+            if result is not None and error is None:
+                error = result
+        if error is not None:
+            raise error
+
+    def _build_rows(self, start: int, stop: int) -> None:
+        for index in range(start, stop):
+            self.envs[index] = self._env_fns[index]()
+
+    def _reset_rows(self, start: int, stop: int) -> None:
+        for index in range(start, stop):
+            env = self.envs[index]
+            seed, options = self._reset_args[index]
+            obs, _ = env.reset(seed=seed, options=options)
+            self._obs[index] = obs
+            self._masks[index] = env.action_masks()
+
+    def _step_rows(self, start: int, stop: int) -> None:
+        for index in range(start, stop):
+            env = self.envs[index]
+            obs, reward, terminated, truncated, info = env.step(int(self._actions[index]))
+            done = terminated or truncated
+            self._infos[index] = info
+            if done:
+                self._terminal_obs[index] = info.get("terminal_observation", obs)
+                obs, _ = env.reset()
+            self._obs[index] = obs
+            self._rewards[index] = reward
+            self._dones[index] = done
+            self._masks[index] = env.action_masks()
+
+    def reset(self) -> np.ndarray:
+        self._reset_args = [(self._seeds[index], self._options[index] or None) for index in range(self.num_envs)]
+        self._run(self._reset_rows)
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        # Threads start stepping right away; sequential mode steps in step_wait.
+        self._actions[:] = np.asarray(actions, dtype=np.int64).reshape(-1)
+        if self.threaded:
+            self._submit(self._step_rows)
+
+    def step_wait(self):
+        if self.threaded:
+            self._wait()
+        else:
+            self._step_rows(0, self.num_envs)
+        dones = self._dones.copy()
+        infos: List[dict] = [dict(info) for info in self._infos]
+        for index in np.flatnonzero(dones):
+            infos[index]["terminal_observation"] = self._terminal_obs[index].copy()
+        return self._obs.copy(), self._rewards.copy(), dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        return self._masks.copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._wait()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        for env in self.envs:
+            if env is not None:
+                env.close()
+        self.closed = True
+
+    # Attribute access runs in the calling thread: between steps the worker
+    # threads are idle, so the envs are not touched concurrently.
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        self._wait()
+        return [getattr(self.envs[index], attr_name) for index in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        self._wait()
+        for index in self._get_indices(indices):
+            setattr(self.envs[index], attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        self._wait()
+        if method_name == "action_masks":
+            return list(self._masks[list(self._get_indices(indices))])
+        return [
+            getattr(self.envs[index], method_name)(*method_args, **method_kwargs)
+            for index in self._get_indices(indices)
+        ]
+
+    def has_attr(self, attr_name: str) -> bool:
+        return attr_name == "action_masks" or super().has_attr(attr_name)
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+
+def _bench_env(seed: int) -> JassSingleAgentEnv:
+    return JassSingleAgentEnv(seed=seed)
+
+
+def _steps_per_sec(venv: VecEnv, seconds: float, seed: int) -> float:
+    rng = np.random.default_rng(seed)
+    venv.reset()
+    steps = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        masks = np.stack(venv.env_method("action_masks"))
+        venv.step(np.argmax(rng.random(masks.shape) * masks, axis=1))
+        steps += venv.num_envs
+    return steps / (time.perf_counter() - started)
+
+
+def scaling_report(
+    thread_counts: Sequence[int], seconds: float = 3.0, envs_per_thread: int = 1
+) -> List[Dict[str, float]]:
+    # DummyVecEnv steps all envs in one thread; ThreadVecEnv spreads them over
+    # `threads` threads (forced on, so GIL builds show the threading overhead).
+    rows = []
+    for threads in thread_counts:
+        num_envs = threads * envs_per_thread
+        env_fns = [lambda rank=rank: _bench_env(rank) for rank in range(num_envs)]
+        row: Dict[str, float] = {"threads": threads, "envs": num_envs}
+        factories = (
+            ("dummy", lambda: DummyVecEnv(env_fns)),
+            ("thread", lambda: ThreadVecEnv(env_fns, envs_per_thread=envs_per_thread, force_threads=True)),
+        )
+        for name, factory in factories:
+            venv = factory()
+            try:
+                row[name] = _steps_per_sec(venv, seconds, threads)
+            finally:
+                venv.close()
+        rows.append(row)
+    return rows
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DummyVecEnv vs ThreadVecEnv throughput")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--envs-per-thread", type=int, default=4)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    print(f"GIL enabled: {gil_enabled()}")
+    for row in scaling_report(args.threads, args.seconds, args.envs_per_thread):
+        print(
+            f"threads={row['threads']:>3} envs={row['envs']:>4} dummy={row['dummy']:>9.0f} steps/s "
+            f"thread={row['thread']:>9.0f} steps/s speedup={row['thread'] / row['dummy']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
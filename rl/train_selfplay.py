@@ -2,11 +2,24 @@ from __future__ import annotations
 
 import argparse
 import datetime
-from dataclasses import dataclass
+import functools
+import os
+import threading
+import time
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
+from env.instrumentation import merge_stats
+from rl.checkpoint_cache import CacheStats, CheckpointCache
+from rl.exploitability import ExploitabilityConfig, estimate
+from rl.fused_env import JassFusedEnv
+from rl.multi_seat import MultiSeatMaskablePPO, MultiSeatVecEnv
+from rl.packed_policy import packed_policy_kwargs
+from rl.shm_vec_env import WORKER_PRELOAD, ShmVecEnv, StartupTimer, preload_forkserver
 from rl.single_agent_env import JassSingleAgentEnv, OpponentPolicy, policy_lowest
+from rl.thread_vec_env import ThreadVecEnv
+from rl.vector_env import BatchPolicy, JassVectorEnv, batch_policy_lowest
 
 try:
     from sb3_contrib import MaskablePPO
@@ -15,6 +28,11 @@ except ImportError as exc:  # pragma: no cover
     raise ImportError("sb3-contrib is required for training") from exc
 
 
+# Worker processes unpickle _WorkerEnv from this module, so the forkserver
+# imports it (and sb3-contrib) once for all of them.
+TRAIN_WORKER_PRELOAD = WORKER_PRELOAD + ("sb3_contrib", "rl.train_selfplay")
+
+
 @dataclass
 class TrainConfig:
     seed: int
@@ -32,46 +50,278 @@ class TrainConfig:
     enable_bidding: bool
     mode: Optional[str]
     trump_suit: Optional[str]
+    # Best-response deals played against every checkpoint (0 disables), on
+    # exploitability_workers processes (None: one per CPU) with that many
+    # ISMCTS simulations per move.
+    exploitability_deals: int = 0
+    exploitability_workers: Optional[int] = None
+    exploitability_simulations: int = 200
+    # Weis announcements in the training envs and the exploitability check.
+    enable_weis: bool = True
+    # Envs stepped by each subprocess worker / thread (independent of n_envs).
+    envs_per_worker: int = 1
+    # Use JassFusedEnv (same trajectories, no AEC bookkeeping) per env.
+    fused_env: bool = False
+    # Skip forced plies (opponents / learner) and announce every Weis.
+    auto_forced: bool = False
+    auto_forced_learner: bool = False
+    auto_announce: bool = False
+    # uint8 observations (env.observation_packing), unpacked inside the policy.
+    packed_obs: bool = False
+    # Instrument every env and print merged EnvStats after each iteration.
+    env_stats: bool = False
+    # Terminal steps start the next round in place (no second reset).
+    auto_reset: bool = False
+    # "all" / "team": the learner plays every seat / both team A seats of
+    # n_envs in-process tables (rl.multi_seat); None trains p0 only.
+    multi_seat: Optional[str] = None
+    # Opponent checkpoints kept loaded (OpponentPool.cache): at most this many
+    # models and/or MiB of policy parameters (None: no bound); prefetch loads
+    # new checkpoints on a background thread.
+    opponent_cache_models: Optional[int] = 8
+    opponent_cache_mb: Optional[float] = None
+    opponent_prefetch: bool = False
+
+
+@dataclass
+class _Opponent:
+    # A loaded checkpoint and its two policy flavours, built once per load.
+    model: MaskablePPO
+    policy: OpponentPolicy
+    batch_policy: BatchPolicy
+
+
+def _load_opponent(path: Path) -> _Opponent:
+    model = MaskablePPO.load(path)
+    # ThreadVecEnv threads share the loaded model, and predict() flips the
+    # policy's training mode, so forward passes run one at a time.
+    lock = threading.Lock()
+
+    def policy(env, agent: str) -> int:
+        obs = env.observe(agent)
+        with lock:
+            action, _ = model.predict(
+                obs["observation"], action_masks=obs["action_mask"], deterministic=True
+            )
+        return int(action)
+
+    def batch_policy(observations, masks):
+        with lock:
+            actions, _ = model.predict(observations, action_masks=masks, deterministic=True)
+        return actions
+
+    return _Opponent(model, policy, batch_policy)
+
+
+def _opponent_bytes(opponent: _Opponent) -> int:
+    return sum(param.numel() * param.element_size() for param in opponent.model.policy.parameters())
+
+
+def _opponent_cache(
+    max_models: Optional[int], max_bytes: Optional[int], prefetch: bool
+) -> CheckpointCache[_Opponent]:
+    return CheckpointCache(
+        _load_opponent,
+        size=_opponent_bytes,
+        max_entries=max_models,
+        max_bytes=max_bytes,
+        background=prefetch,
+    )
+
+
+# Caches of unpickled OpponentPool copies in this process, by cache settings.
+_PROCESS_CACHES: Dict[Tuple[Optional[int], Optional[int], bool], CheckpointCache[_Opponent]] = {}
 
 
 class OpponentPool:
-    def __init__(self, selfplay_prob: float) -> None:
+    # Checkpoints are loaded when added (on a background thread with
+    # prefetch=True) into an LRU cache bounded by max_models and/or max_bytes
+    # (None: no bound); see pool.cache.stats. A draw looks its checkpoint up
+    # once and the policy it returns holds that model, so an episode never
+    # reloads it, even if the cache evicts the checkpoint meanwhile. While a
+    # checkpoint stays cached every draw returns the same policy object, which
+    # JassVectorEnv uses to group tables.
+    #
+    # Pickled copies (the sampler pushed to subprocess workers, see
+    # push_opponents) carry the settings and checkpoint list but no models.
+    # All copies in one process share that process's cache, so a worker loads
+    # a checkpoint on its first draw there, once for all of its envs. A copy
+    # pickled back to the parent brings (pid, cache stats) of its process in
+    # worker_stats.
+    def __init__(
+        self,
+        selfplay_prob: float,
+        max_models: Optional[int] = 8,
+        max_bytes: Optional[int] = None,
+        prefetch: bool = False,
+    ) -> None:
         self.selfplay_prob = selfplay_prob
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
         self.checkpoints: List[Path] = []
+        self.worker_stats: Optional[Tuple[int, CacheStats]] = None
+        self.cache = _opponent_cache(max_models, max_bytes, prefetch)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["worker_stats"] = (os.getpid(), state.pop("cache").stats)
+        return state
 
-    def add(self, path: Path) -> None:
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        key = (self.max_models, self.max_bytes, self.prefetch)
+        if key not in _PROCESS_CACHES:
+            _PROCESS_CACHES[key] = _opponent_cache(*key)
+        self.cache = _PROCESS_CACHES[key]
+
+    def add(self, path: Path, load: bool = True) -> None:
+        # load=False only records the checkpoint, e.g. when just the workers'
+        # copies draw from the pool.
         self.checkpoints.append(path)
+        if load:
+            self.cache.prefetch(path)
 
     def sample_policy(self, rng) -> OpponentPolicy:
         if not self.checkpoints or rng.random() > self.selfplay_prob:
             return policy_lowest
-        checkpoint = rng.choice(self.checkpoints)
-        model = MaskablePPO.load(checkpoint)
+        return self.cache.get(rng.choice(self.checkpoints)).policy
 
-        def _policy(env, agent: str) -> int:
-            obs = env.observe(agent)
-            action, _ = model.predict(
-                obs["observation"], action_masks=obs["action_mask"], deterministic=True
-            )
-            return int(action)
-
-        return _policy
-
-
-def _build_env(
-    config: TrainConfig,
-    opponent_sampler: Optional[Callable] = None,
-    seed: Optional[int] = None,
-) -> JassSingleAgentEnv:
-    env = JassSingleAgentEnv(
-        seed=seed if seed is not None else config.seed,
-        enable_bidding=config.enable_bidding,
-        mode=config.mode,
-        trump_suit=config.trump_suit,
-        opponent_policy=policy_lowest,
-        opponent_sampler=opponent_sampler,
+    def sample_batch_policy(self, rng) -> BatchPolicy:
+        # JassVectorEnv flavour: tables playing the same checkpoint share one
+        # policy object and therefore one forward pass.
+        if not self.checkpoints or rng.random() > self.selfplay_prob:
+            return batch_policy_lowest
+        return self.cache.get(self.checkpoints[int(rng.integers(len(self.checkpoints)))]).batch_policy
+
+
+@dataclass(frozen=True)
+class EnvSpec:
+    # The env options of a TrainConfig. Subprocess workers receive this and
+    # their env index only, never the whole config or an opponent pool.
+    seed: int
+    fused_env: bool = False
+    enable_bidding: bool = True
+    enable_weis: bool = True
+    mode: Optional[str] = None
+    trump_suit: Optional[str] = None
+    auto_forced: bool = False
+    auto_forced_learner: bool = False
+    auto_announce: bool = False
+    packed_obs: bool = False
+    env_stats: bool = False
+    auto_reset: bool = False
+
+    @classmethod
+    def from_config(cls, config: TrainConfig) -> "EnvSpec":
+        return cls(**{field.name: getattr(config, field.name) for field in fields(cls)})
+
+    def build(
+        self, seed: Optional[int] = None, opponent_sampler: Optional[Callable] = None
+    ) -> JassSingleAgentEnv:
+        env_cls = JassFusedEnv if self.fused_env else JassSingleAgentEnv
+        return env_cls(
+            seed=seed if seed is not None else self.seed,
+            enable_bidding=self.enable_bidding,
+            enable_weis=self.enable_weis,
+            mode=self.mode,
+            trump_suit=self.trump_suit,
+            opponent_policy=policy_lowest,
+            opponent_sampler=opponent_sampler,
+            auto_forced=self.auto_forced,
+            auto_forced_learner=self.auto_forced_learner,
+            auto_announce=self.auto_announce,
+            packed_observation=self.packed_obs,
+            instrument=self.env_stats,
+            auto_reset=self.auto_reset,
+        )
+
+
+@dataclass(frozen=True)
+class _WorkerEnv:
+    # env_fn of subprocess workers. All envs of a worker share one spec, so it
+    # is pickled once per worker; the env is built after the fork and seeded
+    # with spec.seed + index.
+    spec: EnvSpec
+    index: int
+
+    def __call__(self) -> JassSingleAgentEnv:
+        return self.spec.build(self.spec.seed + self.index)
+
+
+def _report_exploitability(config: TrainConfig, checkpoint: Path) -> None:
+    summary = estimate(
+        ExploitabilityConfig(
+            model_path=checkpoint,
+            deals=config.exploitability_deals,
+            seed=config.seed,
+            workers=config.exploitability_workers or os.cpu_count() or 1,
+            simulations=config.exploitability_simulations,
+            chunk_size=16,
+            enable_bidding=config.enable_bidding,
+            enable_weis=config.enable_weis,
+            mode=config.mode,
+            trump_suit=config.trump_suit,
+        )
+    )
+    print(
+        f"{checkpoint.name}: best-response gain {summary['gain_mean']:.1f} "
+        f"[{summary['gain_ci_low']:.1f}, {summary['gain_ci_high']:.1f}]"
+    )
+
+
+def _report_env_stats(env) -> None:
+    summary = merge_stats(env.env_method("stats")).summary()
+    print(
+        "env: {steps_per_sec:.0f} steps/s, engine {engine_seconds:.3f}s, "
+        "opponents {opponent_seconds:.3f}s, other {other_seconds:.3f}s".format(**summary)
+    )
+    for phase in ("bidding", "announce", "play"):
+        print(f"  {phase}: {summary[phase + '_steps']} steps, {summary[phase + '_seconds']:.3f}s")
+
+
+def _report_startup(env) -> None:
+    # Wrappers forward attribute lookups, so this finds ShmVecEnv / StartupTimer.
+    if not hasattr(env, "startup_stats"):
+        return
+    stats = env.startup_stats()
+    print(
+        f"vec env startup: {stats['workers']:.0f} workers ready in {stats['ready_seconds']:.2f}s, "
+        f"first step after {stats['first_step_seconds']:.2f}s"
+    )
+
+
+def push_opponents(env, pool: OpponentPool) -> None:
+    # Subprocess workers sample from their own copy of the pool; this replaces
+    # it with one holding the current checkpoint list.
+    env.env_method("set_opponent_sampler", pool.sample_policy)
+
+
+def worker_cache_stats(env) -> List[CacheStats]:
+    # Opponent cache stats of every worker process that received the pool.
+    stats: Dict[int, CacheStats] = {}
+    for sampler in env.get_attr("opponent_sampler"):
+        pool = getattr(sampler, "__self__", None)
+        if isinstance(pool, OpponentPool) and pool.worker_stats is not None:
+            pid, process_stats = pool.worker_stats
+            stats[pid] = process_stats
+    return list(stats.values())
+
+
+def _report_opponent_cache(pool: OpponentPool, workers: Optional[List[CacheStats]] = None) -> None:
+    if workers is None:
+        stats = pool.cache.stats
+        print(
+            f"opponent cache: {len(pool.cache)} models, {pool.cache.bytes / 2**20:.1f} MiB, "
+            f"{stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions, "
+            f"{stats.loads} loads in {stats.load_seconds:.2f}s"
+        )
+        return
+    print(
+        f"opponent cache ({len(workers)} workers): {sum(s.hits for s in workers)} hits, "
+        f"{sum(s.misses for s in workers)} misses, {sum(s.evictions for s in workers)} evictions, "
+        f"{sum(s.loads for s in workers)} loads in {sum(s.load_seconds for s in workers):.2f}s"
     )
-    return env
 
 
 def train(config: TrainConfig) -> Path:
@@ -80,27 +330,95 @@ def train(config: TrainConfig) -> Path:
     run_dir = config.save_dir / run_id
     run_dir.mkdir(parents=True, exist_ok=True)
 
-    opponent_pool = OpponentPool(config.selfplay_prob) if config.selfplay else None
+    opponent_pool = None
+    if config.selfplay:
+        opponent_pool = OpponentPool(
+            config.selfplay_prob,
+            max_models=config.opponent_cache_models,
+            max_bytes=None if config.opponent_cache_mb is None else int(config.opponent_cache_mb * 2**20),
+            prefetch=config.opponent_prefetch,
+        )
     opponent_sampler = opponent_pool.sample_policy if opponent_pool else None
+    remote_opponents = False
 
-    if config.n_envs <= 1:
-        env = _build_env(config, opponent_sampler=opponent_sampler)
+    model_cls = MaskablePPO
+    if config.multi_seat is not None:
+        unsupported = (
+            config.fused_env,
+            config.env_stats,
+            config.auto_forced,
+            config.auto_forced_learner,
+            config.auto_announce,
+            config.auto_reset,
+        )
+        if any(unsupported):
+            raise ValueError(
+                "--multi-seat steps JassAECEnv tables directly and does not support "
+                "--fused-env, --env-stats or the --auto-* options"
+            )
+        env = MultiSeatVecEnv(
+            config.n_envs,
+            seats=config.multi_seat,
+            seed=config.seed,
+            enable_bidding=config.enable_bidding,
+            enable_weis=config.enable_weis,
+            mode=config.mode,
+            trump_suit=config.trump_suit,
+            opponent_sampler=opponent_sampler,
+            packed_observation=config.packed_obs,
+        )
+        model_cls = MultiSeatMaskablePPO
+    elif config.vec_env == "numpy":
+        if config.env_stats:
+            raise ValueError("--env-stats needs per-table envs, not --vec-env numpy")
+        env = VecMonitor(
+            JassVectorEnv(
+                config.n_envs,
+                seed=config.seed,
+                enable_bidding=config.enable_bidding,
+                enable_weis=config.enable_weis,
+                mode=config.mode,
+                trump_suit=config.trump_suit,
+                opponent_sampler=opponent_pool.sample_batch_policy if opponent_pool else None,
+                packed_observation=config.packed_obs,
+            )
+        )
+    elif config.n_envs <= 1:
+        env = EnvSpec.from_config(config).build(opponent_sampler=opponent_sampler)
     else:
-        env_fns = [
-            lambda rank=rank: _build_env(
-                config,
-                opponent_sampler=opponent_sampler,
-                seed=config.seed + rank,
+        spec = EnvSpec.from_config(config)
+        if config.vec_env in ("shm", "subproc"):
+            # Workers get the opponent pool through push_opponents().
+            remote_opponents = opponent_pool is not None
+            preload_forkserver(TRAIN_WORKER_PRELOAD)
+            env_fns = [_WorkerEnv(spec, rank) for rank in range(config.n_envs)]
+        else:
+            # In-process envs share the main process's opponent pool.
+            env_fns = [
+                functools.partial(spec.build, config.seed + rank, opponent_sampler)
+                for rank in range(config.n_envs)
+            ]
+        if config.vec_env == "shm" or (config.vec_env == "subproc" and config.envs_per_worker > 1):
+            env = ShmVecEnv(
+                env_fns,
+                envs_per_worker=config.envs_per_worker,
+                observation_space=spec.build().observation_space,
+                preload=TRAIN_WORKER_PRELOAD,
+            )
+        elif config.vec_env == "thread":
+            env = ThreadVecEnv(
+                env_fns,
+                envs_per_thread=config.envs_per_worker,
+                observation_space=spec.build().observation_space,
             )
-            for rank in range(config.n_envs)
-        ]
-        if config.vec_env == "subproc":
-            env = SubprocVecEnv(env_fns)
+        elif config.vec_env == "subproc":
+            created = time.time()
+            env = StartupTimer(SubprocVecEnv(env_fns), ready_seconds=time.time() - created)
         else:
             env = DummyVecEnv(env_fns)
         env = VecMonitor(env)
 
-    model = MaskablePPO(
+    model = model_cls(
         "MlpPolicy",
         env,
         verbose=1,
@@ -108,15 +426,28 @@ def train(config: TrainConfig) -> Path:
         n_steps=config.n_steps,
         batch_size=config.batch_size,
         device=config.device,
+        policy_kwargs=packed_policy_kwargs() if config.packed_obs else None,
     )
 
     for idx in range(config.iterations):
         model.learn(total_timesteps=config.steps_per_iter)
+        if idx == 0:
+            _report_startup(model.get_env())
+        if config.env_stats:
+            _report_env_stats(model.get_env())
         checkpoint = run_dir / f"checkpoint_{idx+1}.zip"
         model.save(checkpoint)
+        if config.exploitability_deals > 0:
+            _report_exploitability(config, checkpoint)
         if opponent_pool is not None:
-            opponent_pool.add(checkpoint)
+            workers = worker_cache_stats(env) if remote_opponents else None
+            _report_opponent_cache(opponent_pool, workers)
+            opponent_pool.add(checkpoint, load=not remote_opponents)
+            if remote_opponents:
+                push_opponents(env, opponent_pool)
 
+    if opponent_pool is not None:
+        opponent_pool.cache.close()
     final_path = run_dir / "model_final.zip"
     model.save(final_path)
     return final_path
@@ -130,14 +461,30 @@ def _parse_args() -> TrainConfig:
     parser.add_argument("--n-steps", type=int, default=256)
     parser.add_argument("--batch-size", type=int, default=64)
     parser.add_argument("--n-envs", type=int, default=1)
-    parser.add_argument("--vec-env", choices=["dummy", "subproc"], default="dummy")
+    parser.add_argument("--vec-env", choices=["dummy", "subproc", "shm", "thread", "numpy"], default="dummy")
+    parser.add_argument("--envs-per-worker", type=int, default=1)
+    parser.add_argument("--fused-env", action="store_true")
+    parser.add_argument("--auto-forced", action="store_true")
+    parser.add_argument("--auto-forced-learner", action="store_true")
+    parser.add_argument("--auto-announce", action="store_true")
+    parser.add_argument("--packed-obs", action="store_true")
+    parser.add_argument("--env-stats", action="store_true")
+    parser.add_argument("--auto-reset", action="store_true")
+    parser.add_argument("--multi-seat", choices=["all", "team"])
     parser.add_argument("--device", default="auto")
     parser.add_argument("--save-dir", default="models")
     parser.add_argument("--selfplay", action="store_true")
     parser.add_argument("--selfplay-prob", type=float, default=0.5)
+    parser.add_argument("--opponent-cache-models", type=int, default=8, help="0: no model cap")
+    parser.add_argument("--opponent-cache-mb", type=float)
+    parser.add_argument("--opponent-prefetch", action="store_true")
     parser.add_argument("--no-bidding", action="store_true")
+    parser.add_argument("--no-weis", action="store_true")
     parser.add_argument("--mode")
     parser.add_argument("--trump-suit")
+    parser.add_argument("--exploitability-deals", type=int, default=0)
+    parser.add_argument("--exploitability-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--exploitability-simulations", type=int, default=200)
     args = parser.parse_args()
 
     iterations = max(1, args.iterations)
@@ -159,6 +506,22 @@ def _parse_args() -> TrainConfig:
         enable_bidding=not args.no_bidding,
         mode=args.mode,
         trump_suit=args.trump_suit,
+        exploitability_deals=args.exploitability_deals,
+        exploitability_workers=max(1, args.exploitability_workers),
+        exploitability_simulations=args.exploitability_simulations,
+        enable_weis=not args.no_weis,
+        envs_per_worker=max(1, args.envs_per_worker),
+        fused_env=args.fused_env,
+        auto_forced=args.auto_forced,
+        auto_forced_learner=args.auto_forced_learner,
+        auto_announce=args.auto_announce,
+        packed_obs=args.packed_obs,
+        env_stats=args.env_stats,
+        auto_reset=args.auto_reset,
+        multi_seat=args.multi_seat,
+        opponent_cache_models=args.opponent_cache_models if args.opponent_cache_models > 0 else None,
+        opponent_cache_mb=args.opponent_cache_mb,
+        opponent_prefetch=args.opponent_prefetch,
     )
 
 
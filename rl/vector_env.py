@@ -0,0 +1,527 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    import gymnasium as gym
+except ImportError:  # pragma: no cover
+    import gym  # type: ignore
+
+from core.announcements.weis import resolve_weis
+from core.cards import ALL_CARDS, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, SUITS, Card
+from core.fast_engine import OVERTRUMPS, POINTS, STRENGTH, TRUMP_SUIT_INDEX, VARIANTS, variant_index
+from core.legal_moves import RuleSet
+from env.jass_aec_env import (
+    ACTION_COUNT,
+    ANNOUNCE_ACTION,
+    BIDDING_OBEABE_ACTION,
+    BIDDING_PUSH_ACTION,
+    BIDDING_TRUMP_ACTIONS,
+    BIDDING_UNEUFE_ACTION,
+    OBS_HAND_OFFSET,
+    OBS_PLAYED_OFFSET,
+    OBS_POINTS_OFFSET,
+    OBS_TRICK_INDEX_OFFSET,
+    OBS_TRICK_OFFSET,
+    OBS_TRUMP_MODE_OFFSET,
+    PASS_ACTION,
+)
+from env.observation_packing import PACKED_OBS_SIZE, pack_observation
+
+try:
+    from stable_baselines3.common.vec_env import VecEnv
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("stable-baselines3 is required for JassVectorEnv") from exc
+
+OBS_SIZE = 118
+
+PHASE_BIDDING = 0
+PHASE_ANNOUNCE = 1
+PHASE_PLAY = 2
+PHASE_DONE = 3
+
+# Batched opponent: (observations (k, 118), action masks (k, 45)) -> actions (k,).
+BatchPolicy = Callable[[np.ndarray, np.ndarray], np.ndarray]
+# Picks the opponents of one table at every reset (e.g. a pool checkpoint).
+BatchPolicySampler = Callable[[np.random.Generator], BatchPolicy]
+
+_POINTS = np.array(POINTS, dtype=np.int64)
+_STRENGTH = np.array(STRENGTH, dtype=np.int64)
+_OVERTRUMPS = np.array(
+    [[[mask >> card & 1 for card in range(36)] for mask in row] for row in OVERTRUMPS], dtype=bool
+)
+_SUIT = np.arange(36) // 9
+# Row 4 (index -1) is the empty suit used when a variant has no trump.
+_SUIT_CARDS = np.zeros((5, 36), dtype=bool)
+for _suit in range(4):
+    _SUIT_CARDS[_suit, _SUIT == _suit] = True
+_TRUMP = np.array(TRUMP_SUIT_INDEX, dtype=np.int64)
+
+_MODE_OBS = np.zeros((len(VARIANTS), 7), dtype=np.float32)
+for _variant, (_mode, _trump_suit) in enumerate(VARIANTS):
+    _MODE_OBS[_variant, (MODE_TRUMP, MODE_OBEABE, MODE_UNEUFE).index(_mode)] = 1.0
+    if _trump_suit is not None:
+        _MODE_OBS[_variant, 3 + SUITS.index(_trump_suit)] = 1.0
+
+_BID_VARIANT = np.full(ACTION_COUNT, -1, dtype=np.int64)
+for _action, _suit_name in BIDDING_TRUMP_ACTIONS.items():
+    _BID_VARIANT[_action] = variant_index(MODE_TRUMP, _suit_name)
+_BID_VARIANT[BIDDING_OBEABE_ACTION] = variant_index(MODE_OBEABE)
+_BID_VARIANT[BIDDING_UNEUFE_ACTION] = variant_index(MODE_UNEUFE)
+
+
+def batch_policy_lowest(observations: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    return np.argmax(masks, axis=1)
+
+
+def batch_policy_random(rng: np.random.Generator) -> BatchPolicy:
+    def _policy(observations: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        return np.argmax(rng.random(masks.shape) * masks, axis=1)
+
+    return _policy
+
+
+class JassVectorEnv(VecEnv):
+    # N single-agent tables (learner on p0, batched opponents on p1-p3) kept as
+    # arrays and stepped together. Rules, observations, masks and rewards match
+    # JassSingleAgentEnv; finished tables are reset automatically and report
+    # their final observation in info["terminal_observation"].
+    #
+    # `starter` (one seat or one per table) bids or leads the first trick;
+    # rotate_starter moves each table's starter on by one seat per round, as
+    # in Schieber. Points scored while opponents act right after a reset are
+    # kept in pending_reward and paid with the table's next step.
+    #
+    # With an opponent_sampler every table draws its own opponent policy at
+    # reset. Tables waiting on an opponent are grouped by policy and each group
+    # is answered by one batched call (one forward pass per checkpoint); the
+    # other tables sit still until every pending opponent move is applied.
+    #
+    # get_attr/set_attr address row i of the per-table arrays in TABLE_STATE;
+    # any other attribute belongs to the whole vec env and is shared by every
+    # index.
+
+    TABLE_STATE = (
+        "policy_slot",
+        "starter",
+        "pending_reward",
+        "hands",
+        "deals",
+        "variant",
+        "phase",
+        "current",
+        "pushed",
+        "announce_index",
+        "announced",
+        "leader",
+        "trick_cards",
+        "trick_len",
+        "winner",
+        "top",
+        "top_trump",
+        "trick_index",
+        "team_points",
+        "played",
+    )
+
+    def __init__(
+        self,
+        num_envs: int,
+        seed: Optional[int] = None,
+        enable_bidding: bool = True,
+        enable_weis: bool = True,
+        mode: Optional[str] = None,
+        trump_suit: Optional[str] = None,
+        starter: Union[int, Sequence[int]] = 0,
+        rotate_starter: bool = False,
+        ruleset: Optional[RuleSet] = None,
+        opponent_policy: Union[str, BatchPolicy] = "lowest",
+        opponent_sampler: Optional[BatchPolicySampler] = None,
+        packed_observation: bool = False,
+    ) -> None:
+        self.render_mode = None
+        # Packed tables emit env.observation_packing bytes to the learner and to
+        # batched opponents alike.
+        self.packed_observation = packed_observation
+        if packed_observation:
+            observation_space = gym.spaces.Box(low=0, high=255, shape=(PACKED_OBS_SIZE,), dtype=np.uint8)
+        else:
+            observation_space = gym.spaces.Box(low=0.0, high=1.0, shape=(OBS_SIZE,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, gym.spaces.Discrete(ACTION_COUNT))
+        self.enable_bidding = enable_bidding
+        self.enable_weis = enable_weis
+        self.preset_mode = mode
+        self.preset_trump_suit = trump_suit
+        self.rotate_starter = rotate_starter
+        self.ruleset = ruleset or RuleSet()
+        self.rng = np.random.default_rng(seed)
+        if opponent_policy == "lowest":
+            opponent_policy = batch_policy_lowest
+        elif opponent_policy == "random":
+            # Draws from self.rng at call time, so seeded resets reseed it too.
+            opponent_policy = self._policy_random
+        self.opponent_policy: BatchPolicy = opponent_policy
+        self.opponent_sampler = opponent_sampler
+        # Slot 0 stands for opponent_policy; sampled policies get a slot each,
+        # which is freed (and reused) once no table plays that policy.
+        self._policies: List[Optional[BatchPolicy]] = [None]
+        self._policy_slots: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+
+        n = num_envs
+        self.policy_slot = np.zeros(n, dtype=np.int64)
+        self.starter = np.zeros(n, dtype=np.int64)
+        self.starter[:] = starter
+        self.pending_reward = np.zeros(n, dtype=np.float32)
+        self.hands = np.zeros((n, 4, 36), dtype=bool)
+        self.deals = np.zeros((n, 4, 36), dtype=bool)
+        self.variant = np.zeros(n, dtype=np.int64)
+        self.phase = np.zeros(n, dtype=np.int64)
+        self.current = np.zeros(n, dtype=np.int64)
+        self.pushed = np.zeros(n, dtype=bool)
+        self.announce_index = np.zeros(n, dtype=np.int64)
+        self.announced = np.zeros((n, 4), dtype=bool)
+        self.leader = np.zeros(n, dtype=np.int64)
+        self.trick_cards = np.full((n, 4), -1, dtype=np.int64)
+        self.trick_len = np.zeros(n, dtype=np.int64)
+        self.winner = np.zeros(n, dtype=np.int64)
+        self.top = np.full(n, -1, dtype=np.int64)
+        self.top_trump = np.full(n, -1, dtype=np.int64)
+        self.trick_index = np.zeros(n, dtype=np.int64)
+        self.team_points = np.zeros((n, 2), dtype=np.int64)
+        self.played = np.zeros((n, 36), dtype=bool)
+        self._actions = np.zeros(n, dtype=np.int64)
+
+    # -- VecEnv interface -------------------------------------------------
+
+    def reset(self) -> np.ndarray:
+        seeds = [seed for seed in self._seeds if seed is not None]
+        if seeds:
+            self.rng = np.random.default_rng(seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_tables(np.arange(self.num_envs))
+        return self.observations(0)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        everyone = np.arange(self.num_envs)
+        before = self.team_points[:, 0].copy()
+        self._apply(everyone, self._actions)
+        self._advance()
+        rewards = (self.team_points[:, 0] - before).astype(np.float32) + self.pending_reward
+        self.pending_reward[:] = 0.0
+        dones = self.phase == PHASE_DONE
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        finished = np.flatnonzero(dones)
+        for idx in finished:
+            infos[idx]["terminal_observation"] = np.zeros(
+                self.observation_space.shape, dtype=self.observation_space.dtype
+            )
+        if len(finished):
+            if self.rotate_starter:
+                self.starter[finished] = (self.starter[finished] + 1) % 4
+            self._reset_tables(finished)
+        return self.observations(0), rewards, dones, infos
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        value = getattr(self, attr_name)
+        if attr_name in self.TABLE_STATE:
+            return [value[index] for index in self._get_indices(indices)]
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        if attr_name in self.TABLE_STATE:
+            getattr(self, attr_name)[list(self._get_indices(indices))] = value
+            return
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            return list(self.action_masks()[list(self._get_indices(indices))])
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    def action_masks(self) -> np.ndarray:
+        return self.masks(np.arange(self.num_envs), np.zeros(self.num_envs, dtype=np.int64))
+
+    def _policy_random(self, observations: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        return np.argmax(self.rng.random(masks.shape) * masks, axis=1)
+
+    # -- observations and masks --------------------------------------------
+
+    def observations(self, seat: int = 0) -> np.ndarray:
+        idx = np.arange(self.num_envs)
+        obs = self._observe(idx, np.full(self.num_envs, seat, dtype=np.int64))
+        return pack_observation(obs) if self.packed_observation else obs
+
+    def _observe(self, idx: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        obs = np.zeros((len(idx), OBS_SIZE), dtype=np.float32)
+        # Tables still bidding have no game state yet and observe zeros.
+        live = self.phase[idx] != PHASE_BIDDING
+        rows = np.flatnonzero(live)
+        if not len(rows):
+            return obs
+        tables = idx[rows]
+        obs[rows, OBS_HAND_OFFSET : OBS_HAND_OFFSET + 36] = self.hands[tables, seats[rows]]
+        trick = self.trick_cards[tables]
+        positions = np.arange(4)[None, :] < self.trick_len[tables][:, None]
+        trick_rows, trick_pos = np.nonzero(positions)
+        obs[rows[trick_rows], OBS_TRICK_OFFSET + trick[trick_rows, trick_pos]] = 1.0
+        obs[rows, OBS_PLAYED_OFFSET : OBS_PLAYED_OFFSET + 36] = self.played[tables]
+        obs[rows, OBS_TRUMP_MODE_OFFSET : OBS_TRUMP_MODE_OFFSET + 7] = _MODE_OBS[self.variant[tables]]
+        obs[rows, OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2] = self.team_points[tables]
+        obs[rows, OBS_TRICK_INDEX_OFFSET] = self.trick_index[tables]
+        return obs
+
+    def masks(self, idx: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        masks = np.zeros((len(idx), ACTION_COUNT), dtype=np.int8)
+        on_turn = (self.current[idx] == seats) & (self.phase[idx] != PHASE_DONE)
+        phase = self.phase[idx]
+
+        bidding = np.flatnonzero(on_turn & (phase == PHASE_BIDDING))
+        if len(bidding):
+            masks[bidding, 36:42] = 1
+            tables = idx[bidding]
+            may_push = ~self.pushed[tables] & (self.current[tables] == self.starter[tables])
+            masks[bidding[may_push], BIDDING_PUSH_ACTION] = 1
+
+        announcing = np.flatnonzero(on_turn & (phase == PHASE_ANNOUNCE))
+        masks[announcing, ANNOUNCE_ACTION] = 1
+        masks[announcing, PASS_ACTION] = 1
+
+        playing = np.flatnonzero(on_turn & (phase == PHASE_PLAY))
+        if len(playing):
+            masks[playing, :36] = self._legal(idx[playing], seats[playing])
+        return masks
+
+    def _legal(self, idx: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        # Vectorised core.legal_moves.legal_cards (see fast_engine.legal_mask).
+        rules = self.ruleset
+        hand = self.hands[idx, seats]
+        leading = self.trick_len[idx] == 0
+        variant = self.variant[idx]
+        trump = _TRUMP[variant]
+        led = np.where(leading, 4, _SUIT[np.maximum(self.trick_cards[idx, 0], 0)])
+        top_trump = self.top_trump[idx]
+        has_top_trump = (top_trump >= 0)[:, None]
+        over = _OVERTRUMPS[variant, np.maximum(top_trump, 0)] | ~has_top_trump
+
+        legal = hand.copy()
+        decided = leading.copy()
+        if rules.must_follow_suit:
+            suited = hand & _SUIT_CARDS[led]
+            follow = suited.any(axis=1) & ~decided
+            if rules.must_overtrump:
+                suited_over = suited & over
+                use_over = (led == trump) & suited_over.any(axis=1)
+                suited = np.where(use_over[:, None], suited_over, suited)
+            legal[follow] = suited[follow]
+            decided |= follow
+
+        if rules.must_trump:
+            partner_winning = self.winner[idx] == (seats + 2) % 4
+            trumps = hand & _SUIT_CARDS[trump]
+            forced = ~decided & (trump >= 0) & trumps.any(axis=1)
+            if not rules.must_trump_if_partner_winning:
+                forced &= ~partner_winning
+            if rules.must_overtrump:
+                trumps_over = trumps & over
+                trumps = np.where(trumps_over.any(axis=1)[:, None], trumps_over, trumps)
+            legal[forced] = trumps[forced]
+        return legal
+
+    # -- dynamics ------------------------------------------------------------
+
+    def _reset_tables(self, idx: np.ndarray) -> None:
+        count = len(idx)
+        order = np.argsort(self.rng.random((count, 36)), axis=1)
+        deals = np.zeros((count, 4, 36), dtype=bool)
+        for seat in range(4):
+            np.put_along_axis(deals[:, seat], order[:, seat * 9 : (seat + 1) * 9], True, axis=1)
+        self.deals[idx] = deals
+        self.hands[idx] = deals
+        self.pushed[idx] = False
+        self.played[idx] = False
+        self.team_points[idx] = 0
+        self.trick_index[idx] = 0
+        self.trick_len[idx] = 0
+        self.trick_cards[idx] = -1
+        self.top[idx] = -1
+        self.top_trump[idx] = -1
+        self.announced[idx] = False
+        self.announce_index[idx] = 0
+        self.leader[idx] = self.starter[idx]
+        self.winner[idx] = self.starter[idx]
+        if self.opponent_sampler is not None:
+            self.policy_slot[idx] = [self._slot(self.opponent_sampler(self.rng)) for _ in range(count)]
+            self._release_slots()
+        if self.enable_bidding:
+            self.phase[idx] = PHASE_BIDDING
+            self.current[idx] = self.starter[idx]
+        else:
+            self.variant[idx] = self._preset_variants(count)
+            self._start_round(idx)
+        self._advance()
+        # The tables started from zero points, so whatever they have now was
+        # scored before the learner's first decision.
+        self.pending_reward[idx] = self.team_points[idx, 0]
+
+    def _slot(self, policy: BatchPolicy) -> int:
+        # Samplers hand out one object per checkpoint, so identity groups tables.
+        slot = self._policy_slots.get(id(policy))
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._policies[slot] = policy
+            else:
+                slot = len(self._policies)
+                self._policies.append(policy)
+            self._policy_slots[id(policy)] = slot
+        return slot
+
+    def _release_slots(self) -> None:
+        # Drops policies no table plays any more, so samplers that return a new
+        # object per draw keep at most one slot per table.
+        used = np.bincount(self.policy_slot, minlength=len(self._policies)) > 0
+        for slot in np.flatnonzero(~used[1:]) + 1:
+            policy = self._policies[slot]
+            if policy is not None:
+                del self._policy_slots[id(policy)]
+                self._policies[slot] = None
+                self._free_slots.append(int(slot))
+
+    def _preset_variants(self, count: int) -> np.ndarray:
+        if self.preset_mode is not None and (
+            self.preset_mode != MODE_TRUMP or self.preset_trump_suit is not None
+        ):
+            return np.full(count, variant_index(self.preset_mode, self.preset_trump_suit))
+        suits = self.rng.integers(4, size=count)
+        if self.preset_mode == MODE_TRUMP:
+            return suits
+        # Same distribution as JassAECEnv: the mode first, then the trump suit.
+        modes = self.rng.integers(3, size=count)
+        if self.preset_trump_suit is not None:
+            suits[:] = SUITS.index(self.preset_trump_suit)
+        return np.where(modes == 0, suits, np.where(modes == 1, 4, 5))
+
+    def _start_round(self, idx: np.ndarray) -> None:
+        self.current[idx] = self.leader[idx]
+        self.phase[idx] = PHASE_ANNOUNCE if self.enable_weis else PHASE_PLAY
+
+    def _advance(self) -> None:
+        # Opponents act until every table waits for p0 or is finished.
+        while True:
+            idx = np.flatnonzero((self.current != 0) & (self.phase != PHASE_DONE))
+            if not len(idx):
+                return
+            seats = self.current[idx]
+            observations = self._observe(idx, seats)
+            if self.packed_observation:
+                observations = pack_observation(observations)
+            masks = self.masks(idx, seats)
+            slots = self.policy_slot[idx]
+            if len(self._policies) == 1:
+                actions = self.opponent_policy(observations, masks)
+            else:
+                actions = np.empty(len(idx), dtype=np.int64)
+                for slot in np.unique(slots):
+                    rows = np.flatnonzero(slots == slot)
+                    policy = self._policies[slot] or self.opponent_policy
+                    actions[rows] = policy(observations[rows], masks[rows])
+            self._apply(idx, np.asarray(actions, dtype=np.int64))
+
+    def _apply(self, idx: np.ndarray, actions: np.ndarray) -> None:
+        masks = self.masks(idx, self.current[idx])
+        if not masks[np.arange(len(idx)), actions].all():
+            raise ValueError("illegal action")
+        phase = self.phase[idx]
+        for value, handler in (
+            (PHASE_BIDDING, self._apply_bidding),
+            (PHASE_ANNOUNCE, self._apply_announce),
+            (PHASE_PLAY, self._apply_play),
+        ):
+            rows = np.flatnonzero(phase == value)
+            if len(rows):
+                handler(idx[rows], actions[rows])
+
+    def _apply_bidding(self, idx: np.ndarray, actions: np.ndarray) -> None:
+        push = actions == BIDDING_PUSH_ACTION
+        pushed = idx[push]
+        self.pushed[pushed] = True
+        self.current[pushed] = (self.starter[pushed] + 2) % 4
+        chosen = idx[~push]
+        self.variant[chosen] = _BID_VARIANT[actions[~push]]
+        self._start_round(chosen)
+
+    def _apply_announce(self, idx: np.ndarray, actions: np.ndarray) -> None:
+        self.announced[idx, self.current[idx]] = actions == ANNOUNCE_ACTION
+        self.announce_index[idx] += 1
+        self.current[idx] = (self.leader[idx] + self.announce_index[idx]) % 4
+        done = idx[self.announce_index[idx] == 4]
+        for table in done:
+            # Weis are scored once per round, so a per-table call is cheap.
+            team_cards: List[List[Card]] = [[], []]
+            for seat in range(4):
+                if self.announced[table, seat]:
+                    team_cards[seat % 2].extend(ALL_CARDS[card] for card in np.flatnonzero(self.hands[table, seat]))
+            points_a, points_b, _, _ = resolve_weis(team_cards[0], team_cards[1])
+            self.team_points[table, 0] += points_a
+            self.team_points[table, 1] += points_b
+        self.phase[done] = PHASE_PLAY
+        self.current[done] = self.leader[done]
+
+    def _apply_play(self, idx: np.ndarray, cards: np.ndarray) -> None:
+        seats = self.current[idx]
+        variant = self.variant[idx]
+        position = self.trick_len[idx]
+        self.hands[idx, seats, cards] = False
+        self.played[idx, cards] = True
+        self.trick_cards[idx, position] = cards
+
+        leading = position == 0
+        led = _SUIT[np.where(leading, cards, self.trick_cards[idx, 0])]
+        top = np.where(leading, cards, self.top[idx])
+        wins = leading | (_STRENGTH[variant, led, cards] > _STRENGTH[variant, led, top])
+        self.winner[idx] = np.where(wins, seats, self.winner[idx])
+        self.top[idx] = np.where(wins, cards, self.top[idx])
+        top_trump = self.top_trump[idx]
+        is_trump = _SUIT[cards] == _TRUMP[variant]
+        higher = (top_trump < 0) | _OVERTRUMPS[variant, np.maximum(top_trump, 0), cards]
+        self.top_trump[idx] = np.where(is_trump & higher, cards, top_trump)
+        self.trick_len[idx] = position + 1
+        self.current[idx] = (seats + 1) % 4
+
+        full = idx[position == 3]
+        if not len(full):
+            return
+        points = _POINTS[self.variant[full, None], self.trick_cards[full]].sum(axis=1)
+        points += np.where(self.trick_index[full] == 8, 5, 0)
+        winners = self.winner[full]
+        self.team_points[full, winners % 2] += points
+        self.leader[full] = winners
+        self.current[full] = winners
+        self.trick_len[full] = 0
+        self.trick_cards[full] = -1
+        self.top[full] = -1
+        self.top_trump[full] = -1
+        self.trick_index[full] += 1
+        finished = full[self.trick_index[full] == 9]
+        self.phase[finished] = PHASE_DONE
+
+    def table_deal(self, index: int) -> List[List[Card]]:
+        # The hands table `index` was dealt at its last reset.
+        return [[ALL_CARDS[card] for card in np.flatnonzero(self.deals[index, seat])] for seat in range(4)]
+
+    def table_mode(self, index: int) -> Sequence[Optional[str]]:
+        return VARIANTS[int(self.variant[index])]
@@ -0,0 +1,24 @@
+from .anytime import LatencyStats, deadline_policy
+from .bidding_advisor import BiddingAdvice, BiddingAdvisor, advisor_bidding_policy, estimate_push_value
+from .endgame import EndgameSolver, endgame_policy
+from .ismcts import ISMCTSAgent, SearchStats
+from .parallel import ParallelSearch
+from .par import ParTable, build_par_table
+from .position import SearchPosition
+
+__all__ = [
+    "BiddingAdvice",
+    "BiddingAdvisor",
+    "EndgameSolver",
+    "ISMCTSAgent",
+    "LatencyStats",
+    "ParTable",
+    "ParallelSearch",
+    "SearchPosition",
+    "SearchStats",
+    "advisor_bidding_policy",
+    "build_par_table",
+    "deadline_policy",
+    "endgame_policy",
+    "estimate_push_value",
+]
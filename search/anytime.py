@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+from core.cards import Card
+from core.game import Policy
+from core.state import GameState
+
+# Upper bucket edges in milliseconds for latency histograms.
+DEFAULT_BUCKETS_MS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class LatencyStats:
+    def __init__(self) -> None:
+        self.latencies_ms: List[float] = []
+        self.iterations: List[int] = []
+
+    def record(self, latency_ms: float, iterations: int) -> None:
+        self.latencies_ms.append(latency_ms)
+        self.iterations.append(iterations)
+
+    def clear(self) -> None:
+        self.latencies_ms.clear()
+        self.iterations.clear()
+
+    def percentiles(self) -> Dict[str, float]:
+        values = sorted(self.latencies_ms)
+        return {
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1] if values else 0.0,
+        }
+
+    def histogram(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS) -> List[Tuple[float, int]]:
+        counts = [0] * (len(buckets_ms) + 1)
+        for latency in self.latencies_ms:
+            for idx, edge in enumerate(buckets_ms):
+                if latency <= edge:
+                    counts[idx] += 1
+                    break
+            else:
+                counts[-1] += 1
+        edges = list(buckets_ms) + [math.inf]
+        return list(zip(edges, counts))
+
+    def summary(self) -> Dict[str, float]:
+        moves = len(self.latencies_ms)
+        summary = {"moves": float(moves)}
+        summary.update(self.percentiles())
+        summary["mean_iterations"] = sum(self.iterations) / moves if moves else 0.0
+        return summary
+
+
+def deadline_policy(agent: Any, budget_ms: float) -> Policy:
+    # Wraps a search agent exposing choose(state, player, deadline_ms) as a
+    # core.game.Policy with a fixed per-move budget.
+    def _policy(state: GameState, player: int) -> Card:
+        return agent.choose(state, player, budget_ms)
+
+    return _policy
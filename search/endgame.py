@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.cards import ALL_CARDS, Card
+from core.fast_engine import (
+    OVERTRUMPS,
+    POINTS,
+    STRENGTH,
+    SUIT_COUNT,
+    SUIT_MASK_LIST,
+    SUIT_SIZE,
+    TRUMP_SUIT_INDEX,
+    VARIANTS,
+    FastState,
+    iter_bits,
+    legal_mask,
+)
+from core.game import Policy
+from core.legal_moves import RuleSet
+from core.state import GameState
+
+_RANK_BITS = (1 << SUIT_SIZE) - 1
+_INF = 1 << 20
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+def canonical_key(hands: List[int], leader: int, variant: int) -> Tuple[int, int, Tuple[int, ...]]:
+    # Seats are rotated so the leader comes first and interchangeable suits
+    # (all four without trump, the three side suits with trump) are sorted,
+    # so positions that differ only by a suit relabelling share one entry.
+    suit_keys = []
+    for suit in range(SUIT_COUNT):
+        shift = suit * SUIT_SIZE
+        key = 0
+        for offset in range(4):
+            key |= ((hands[(leader + offset) % 4] >> shift) & _RANK_BITS) << (offset * SUIT_SIZE)
+        suit_keys.append(key)
+    trump = TRUMP_SUIT_INDEX[variant]
+    if trump < 0:
+        return (variant, -1, tuple(sorted(suit_keys)))
+    trump_key = suit_keys.pop(trump)
+    return (0, trump_key, tuple(sorted(suit_keys)))
+
+
+class EndgameSolver:
+    # Exact (perfect-information) alpha-beta solver for the tail of a round.
+    # Values are the points the leading team still takes; positions at trick
+    # boundaries are memoised as (lower, upper) bounds in a bounded LRU keyed
+    # by `canonical_key`. One solver serves one RuleSet.
+
+    def __init__(
+        self,
+        max_cards: int = 4,
+        cache_size: int = 200_000,
+        rules: Optional[RuleSet] = None,
+    ) -> None:
+        self.max_cards = max_cards
+        self.cache_size = cache_size
+        self.rules = rules or RuleSet()
+        self.cache: "OrderedDict[Tuple, Tuple[int, int]]" = OrderedDict()
+        self.stats = CacheStats()
+
+    def can_solve(self, fast: FastState) -> bool:
+        return max(hand.bit_count() for hand in fast.hands) <= self.max_cards
+
+    def value(self, fast: FastState) -> int:
+        # Points team 0 takes from here to the end under perfect play.
+        if fast.rules != self.rules:
+            raise ValueError("position uses a different RuleSet than the solver")
+        return self._search(fast, -_INF, _INF)
+
+    def final_points(self, fast: FastState) -> List[int]:
+        remaining = _remaining_points(fast)
+        team_a = self.value(fast)
+        return [fast.points[0] + team_a, fast.points[1] + remaining - team_a]
+
+    def move_values(self, fast: FastState) -> Dict[int, int]:
+        # Team-0 value of every legal move for the player to act.
+        values: Dict[int, int] = {}
+        for card in iter_bits(fast.legal_mask()):
+            child = fast.clone()
+            child.play(card)
+            values[card] = child.points[0] - fast.points[0] + self.value(child)
+        return values
+
+    def best_move(self, fast: FastState) -> int:
+        values = self.move_values(fast)
+        if fast.current_player % 2 == 0:
+            return max(values, key=lambda card: (values[card], -card))
+        return min(values, key=lambda card: (values[card], card))
+
+    def _search(self, fast: FastState, alpha: int, beta: int) -> int:
+        hands = list(fast.hands)
+        if not fast.trick:
+            return self._node(
+                hands, fast.leader, [], fast.leader, -1, -1, fast.tricks_played, fast.variant,
+                alpha, beta,
+            )
+        return self._node(
+            hands,
+            fast.leader,
+            list(fast.trick),
+            fast.winner,
+            fast.top,
+            fast.top_trump,
+            fast.tricks_played,
+            fast.variant,
+            alpha,
+            beta,
+        )
+
+    def _node(
+        self,
+        hands: List[int],
+        leader: int,
+        trick: List[int],
+        winner: int,
+        top: int,
+        top_trump: int,
+        tricks_played: int,
+        variant: int,
+        alpha: int,
+        beta: int,
+    ) -> int:
+        # Make/unmake recursion on plain ints; returns team-0 points from here.
+        count = len(trick)
+        entry_key = None
+        remaining = 0
+        if count == 0:
+            if tricks_played == 9 or not (hands[0] | hands[1] | hands[2] | hands[3]):
+                return 0
+            entry_key = canonical_key(hands, leader, variant)
+            remaining = _points_in(hands, variant) + 5
+            entry = self.cache.get(entry_key)
+            if entry is not None:
+                self.stats.hits += 1
+                self.cache.move_to_end(entry_key)
+                lower, upper = _to_team_a(entry, leader % 2, remaining)
+                if lower >= beta:
+                    return lower
+                if upper <= alpha:
+                    return upper
+                if lower == upper:
+                    return lower
+                alpha = max(alpha, lower)
+                beta = min(beta, upper)
+            else:
+                self.stats.misses += 1
+
+        player = (leader + count) % 4
+        hand = hands[player]
+        if count == 0:
+            legal = hand
+        else:
+            legal = legal_mask(
+                hand,
+                trick[0] // SUIT_SIZE,
+                variant,
+                winner == (player + 2) % 4,
+                top_trump,
+                self.rules,
+            )
+        in_play = hands[0] | hands[1] | hands[2] | hands[3]
+        for card in trick:
+            in_play |= 1 << card
+
+        alpha_start, beta_start = alpha, beta
+        maximizing = player % 2 == 0
+        best = -_INF if maximizing else _INF
+        trump = TRUMP_SUIT_INDEX[variant]
+        overtrumps = OVERTRUMPS[variant]
+        points = POINTS[variant]
+        for card in _distinct_moves(legal, in_play, variant):
+            hands[player] = hand & ~(1 << card)
+            if count == 0:
+                new_winner, new_top = player, card
+            else:
+                row = STRENGTH[variant][trick[0] // SUIT_SIZE]
+                if row[card] > row[top]:
+                    new_winner, new_top = player, card
+                else:
+                    new_winner, new_top = winner, top
+            new_top_trump = top_trump
+            if card // SUIT_SIZE == trump and (top_trump < 0 or overtrumps[top_trump] >> card & 1):
+                new_top_trump = card
+            trick.append(card)
+            if count == 3:
+                gained = 0
+                if new_winner % 2 == 0:
+                    gained = points[trick[0]] + points[trick[1]] + points[trick[2]] + points[card]
+                    if tricks_played == 8:
+                        gained += 5
+                value = gained + self._node(
+                    hands, new_winner, [], new_winner, -1, -1, tricks_played + 1, variant,
+                    alpha - gained, beta - gained,
+                )
+            else:
+                value = self._node(
+                    hands, leader, trick, new_winner, new_top, new_top_trump, tricks_played,
+                    variant, alpha, beta,
+                )
+            trick.pop()
+            hands[player] = hand
+            if maximizing:
+                if value > best:
+                    best = value
+                    if best > alpha:
+                        alpha = best
+            else:
+                if value < best:
+                    best = value
+                    if best < beta:
+                        beta = best
+            if alpha >= beta:
+                break
+
+        if entry_key is not None:
+            lower, upper = -_INF, _INF
+            if best <= alpha_start:
+                upper = best
+            elif best >= beta_start:
+                lower = best
+            else:
+                lower = upper = best
+            leader_team = leader % 2
+            previous = self.cache.get(entry_key)
+            if previous is not None:
+                prev_lower, prev_upper = _to_team_a(previous, leader_team, remaining)
+                lower, upper = max(lower, prev_lower), min(upper, prev_upper)
+            self.cache[entry_key] = _to_team_a((lower, upper), leader_team, remaining)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.stats.evictions += 1
+        return best
+
+
+def _build_suit_orders():
+    # Per variant and suit: cards from strongest to weakest.
+    orders = []
+    for variant in range(len(VARIANTS)):
+        by_suit = []
+        for suit in range(SUIT_COUNT):
+            row = STRENGTH[variant][suit]
+            cards = range(suit * SUIT_SIZE, (suit + 1) * SUIT_SIZE)
+            by_suit.append(sorted(cards, key=lambda card: -row[card]))
+        orders.append(by_suit)
+    return orders
+
+
+_SUIT_ORDERS = _build_suit_orders()
+
+
+def _distinct_moves(legal: int, in_play: int, variant: int) -> List[int]:
+    # Cards of a suit that are adjacent among the cards still in play and
+    # score the same are interchangeable; only the first of each run is kept.
+    # Within a suit the strongest card comes first, which orders cutoffs well.
+    moves: List[int] = []
+    points = POINTS[variant]
+    for suit in range(SUIT_COUNT):
+        if not legal & SUIT_MASK_LIST[suit]:
+            continue
+        previous = -1
+        for card in _SUIT_ORDERS[variant][suit]:
+            if not in_play >> card & 1:
+                continue
+            if legal >> card & 1:
+                if previous < 0 or points[previous] != points[card]:
+                    moves.append(card)
+                previous = card
+            else:
+                previous = -1
+    return moves
+
+
+def _points_in(hands: List[int], variant: int) -> int:
+    table = POINTS[variant]
+    return sum(table[card] for hand in hands for card in iter_bits(hand))
+
+
+def _remaining_points(fast: FastState) -> int:
+    table = POINTS[fast.variant]
+    total = sum(table[card] for hand in fast.hands for card in iter_bits(hand))
+    total += sum(table[card] for card in fast.trick)
+    return total + (5 if fast.tricks_played < 9 else 0)
+
+
+def _to_team_a(bounds: Tuple[int, int], leader_team: int, remaining: int) -> Tuple[int, int]:
+    # Converts between leader-relative and team-0 bounds (the map is its own inverse).
+    lower, upper = bounds
+    if leader_team == 0:
+        return lower, upper
+    new_lower = -_INF if upper >= _INF else remaining - upper
+    new_upper = _INF if lower <= -_INF else remaining - lower
+    return new_lower, new_upper
+
+
+def endgame_policy(solver: EndgameSolver, fallback: Policy) -> Policy:
+    # Perfect finisher: once every hand is within the solver's reach it plays
+    # the double-dummy best move on the true deal, otherwise defers to fallback.
+    def _policy(state: GameState, player: int) -> Card:
+        fast = FastState.from_game_state(state, rules=solver.rules)
+        if not solver.can_solve(fast):
+            return fallback(state, player)
+        return ALL_CARDS[solver.best_move(fast)]
+
+    return _policy
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.cards import ALL_CARDS, Card
+from core.determinization import DealSampler
+from core.fast_engine import FastState, iter_bits, random_card, random_playout
+from core.legal_moves import RuleSet
+from core.state import GameState
+
+from .anytime import LatencyStats
+from .endgame import EndgameSolver
+from .position import SearchPosition
+
+ROUND_POINTS = 157.0
+
+
+@dataclass
+class SearchStats:
+    decisions: int = 0
+    iterations: int = 0
+    nodes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def iterations_per_sec(self) -> float:
+        return self.iterations / self.seconds if self.seconds else 0.0
+
+    def add(self, other: "SearchStats") -> None:
+        self.decisions += other.decisions
+        self.iterations += other.iterations
+        self.nodes += other.nodes
+        self.seconds += other.seconds
+
+
+class _Node:
+    __slots__ = ("player", "children", "visits", "available", "reward")
+
+    def __init__(self, player: int) -> None:
+        # `player` made the move leading here; rewards are from its team's view.
+        self.player = player
+        self.children: Dict[int, "_Node"] = {}
+        self.visits = 0
+        self.available = 0
+        self.reward = 0.0
+
+
+@dataclass
+class _Tree:
+    key: Tuple[int, int, int]
+    plays: List[int]
+    root: _Node
+
+
+def best_move(statistics: Dict[int, Tuple[int, float]], legal: int) -> int:
+    # Most visited legal move, ties broken by accumulated reward.
+    return max(
+        iter_bits(legal),
+        key=lambda card: statistics.get(card, (-1, 0.0)),
+    )
+
+
+class ISMCTSAgent:
+    # Single-observer information-set MCTS: every iteration samples a deal
+    # consistent with what `player` has seen, descends the shared tree over
+    # the moves legal in that deal and finishes with a random playout on the
+    # fast engine. The tree is kept per seat and re-rooted on the next
+    # decision, so statistics from the previous ply carry over.
+
+    def __init__(
+        self,
+        simulations: int = 400,
+        exploration: float = 0.7,
+        ruleset: Optional[RuleSet] = None,
+        seed: Optional[int] = None,
+        reuse_tree: bool = True,
+        endgame: Optional[EndgameSolver] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.simulations = simulations
+        self.exploration = exploration
+        self.ruleset = ruleset or RuleSet()
+        self.reuse_tree = reuse_tree
+        # Rollouts stop and are solved exactly once the hands fit the solver.
+        self.endgame = endgame
+        self.rng = random.Random(seed)
+        # Deadlines and latencies are measured on `clock` (seconds).
+        self.clock = clock
+        self.stats = SearchStats()
+        self.last_stats = SearchStats()
+        self.latency = LatencyStats()
+        self._trees: Dict[int, _Tree] = {}
+
+    def __call__(self, state: GameState, player: int) -> Card:
+        return ALL_CARDS[self.search(state, player)]
+
+    def reset(self) -> None:
+        self._trees.clear()
+
+    def search(self, state: GameState, player: int) -> int:
+        if player != state.current_player:
+            raise ValueError("not this player's turn")
+        return self.search_position(SearchPosition.from_state(state, player, self.ruleset))
+
+    def choose(self, state: GameState, player: int, deadline_ms: float) -> Card:
+        # Anytime entry point: searches until `deadline_ms` after the call and
+        # returns the best move found so far.
+        deadline = self.clock() + deadline_ms / 1000.0
+        if player != state.current_player:
+            raise ValueError("not this player's turn")
+        position = SearchPosition.from_state(state, player, self.ruleset)
+        return ALL_CARDS[self.search_position(position, deadline=deadline)]
+
+    def search_position(
+        self,
+        position: SearchPosition,
+        iterations: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> int:
+        root, legal = self._run(position, iterations, deadline)
+        return best_move(
+            {card: (child.visits, child.reward) for card, child in root.children.items()}, legal
+        )
+
+    def root_statistics(
+        self,
+        position: SearchPosition,
+        iterations: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[int, Tuple[int, float]]:
+        # `deadline` is a value of `self.clock`; it stops the search early
+        # and without `iterations` the search runs until the deadline.
+        root, legal = self._run(position, iterations, deadline)
+        return {
+            card: (child.visits, child.reward)
+            for card, child in root.children.items()
+            if legal >> card & 1
+        }
+
+    def _run(
+        self, position: SearchPosition, iterations: Optional[int], deadline: Optional[float]
+    ) -> Tuple[_Node, int]:
+        clock = self.clock
+        started = clock()
+        template = position.fast_state()
+        legal = template.legal_mask()
+        if legal & (legal - 1) == 0:
+            self._record(SearchStats(decisions=1, seconds=clock() - started))
+            root = _Node(player=(position.player + 3) % 4)
+            root.children[legal.bit_length() - 1] = _Node(position.player)
+            return root, legal
+
+        if iterations is None and deadline is None:
+            iterations = self.simulations
+        root = self._root_for(position)
+        sampler = position.sampler()
+        nodes = 0
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or clock() < deadline):
+            nodes += self._iterate(root, template, sampler)
+            done += 1
+        self._record(
+            SearchStats(
+                decisions=1,
+                iterations=done,
+                nodes=nodes,
+                seconds=clock() - started,
+            )
+        )
+        return root, legal
+
+    def _record(self, stats: SearchStats) -> None:
+        self.last_stats = stats
+        self.stats.add(stats)
+        self.latency.record(stats.seconds * 1000.0, stats.iterations)
+
+    def _root_for(self, position: SearchPosition) -> _Node:
+        player = position.player
+        plays = [card for _, card in position.plays]
+        key = (position.variant, player, position.own_cards)
+
+        tree = self._trees.get(player)
+        root: Optional[_Node] = None
+        if (
+            self.reuse_tree
+            and tree is not None
+            and tree.key == key
+            and plays[: len(tree.plays)] == tree.plays
+        ):
+            root = tree.root
+            for card in plays[len(tree.plays) :]:
+                root = root.children.get(card)
+                if root is None:
+                    break
+        if root is None:
+            root = _Node(player=(player + 3) % 4)
+        self._trees[player] = _Tree(key=key, plays=plays, root=root)
+        return root
+
+    def _iterate(self, root: _Node, template: FastState, sampler: DealSampler) -> int:
+        fast = template.clone()
+        fast.hands = list(sampler.sample_mask(self.rng))
+        start_points = fast.points[:]
+        path = [root]
+        node = root
+        depth = 0
+
+        while not fast.is_terminal:
+            legal = fast.legal_mask()
+            untried = [card for card in iter_bits(legal) if card not in node.children]
+            children = [(card, node.children[card]) for card in iter_bits(legal) if card in node.children]
+            for _, child in children:
+                child.available += 1
+            player = fast.current_player
+            if untried:
+                card = untried[self.rng.randrange(len(untried))]
+                child = _Node(player)
+                child.available = 1
+                node.children[card] = child
+                fast.play(card)
+                path.append(child)
+                depth += 1
+                break
+            log_scale = self.exploration
+            card, node = max(
+                children,
+                key=lambda item: item[1].reward / item[1].visits
+                + log_scale * math.sqrt(math.log(item[1].available) / item[1].visits),
+            )
+            fast.play(card)
+            path.append(node)
+            depth += 1
+
+        depth += 4 * (9 - fast.tricks_played) - len(fast.trick)
+        points = self._finish(fast)
+        gained = [(points[team] - start_points[team]) / ROUND_POINTS for team in (0, 1)]
+        for visited in path:
+            visited.visits += 1
+            visited.reward += gained[visited.player % 2]
+        return depth
+
+    def _finish(self, fast: FastState) -> List[int]:
+        solver = self.endgame
+        if solver is None:
+            return random_playout(fast, self.rng)
+        while fast.tricks_played < 9:
+            if not fast.trick and solver.can_solve(fast):
+                return solver.final_points(fast)
+            fast.play(random_card(fast.legal_mask(), self.rng))
+        return fast.points
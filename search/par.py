@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import random
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.cards import Card, mask_cards
+from core.fast_engine import VARIANTS, FastState, variant_index
+
+from .endgame import EndgameSolver
+
+# Deal bank: .npy array of shape (deals, 4) uint64 hand masks, seat 0 leads.
+# Par table: .npy array of shape (deals, 6) uint8 with the double-dummy points
+# of team 0 per variant (fast_engine.VARIANTS order); UNSOLVED marks open cells.
+UNSOLVED = 255
+
+# Measured size of one EndgameSolver cache entry (key, bounds, LRU links).
+CACHE_ENTRY_BYTES = 400
+# Per-worker cap: beyond this the table stops paying for itself on 9-card deals.
+MAX_CACHE_SIZE = 1_000_000
+
+
+def generate_deals(count: int, seed: int = 0, cards_per_hand: int = 9) -> np.ndarray:
+    rng = random.Random(seed)
+    deck = list(range(36))
+    deals = np.zeros((count, 4), dtype=np.uint64)
+    for idx in range(count):
+        rng.shuffle(deck)
+        for seat in range(4):
+            cards = deck[seat * cards_per_hand : (seat + 1) * cards_per_hand]
+            deals[idx, seat] = sum(1 << card for card in cards)
+    return deals
+
+
+def save_deal_bank(path: Path, deals: np.ndarray) -> None:
+    np.save(Path(path), deals.astype(np.uint64))
+
+
+def load_deal_bank(path: Path) -> np.ndarray:
+    return np.load(Path(path), mmap_mode="r")
+
+
+def deal_hands(deals: np.ndarray, index: int) -> List[List[Card]]:
+    # Bank entry as card lists, e.g. for JassAECEnv.reset(options={"hands": ...}).
+    return [mask_cards(int(mask)) for mask in deals[index]]
+
+
+def solve_deal(hands: Sequence[int], variant: int, solver: EndgameSolver) -> int:
+    # Team-0 points under perfect play of all four seats with seat 0 leading.
+    fast = FastState([int(hand) for hand in hands], variant, 0, solver.rules)
+    fast.tricks_played = 9 - fast.hands[0].bit_count()
+    return solver.final_points(fast)[0]
+
+
+def open_par_table(path: Path, deals: int) -> np.ndarray:
+    # Opens an existing table for resuming, or creates one with every cell open.
+    path = Path(path)
+    if path.exists():
+        table = np.lib.format.open_memmap(path, mode="r+")
+        if table.shape != (deals, len(VARIANTS)):
+            raise ValueError(f"par table {path} has shape {table.shape}, expected {(deals, len(VARIANTS))}")
+        return table
+    table = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(deals, len(VARIANTS)))
+    table[:] = UNSOLVED
+    table.flush()
+    return table
+
+
+def _solve_chunk(task: Tuple[str, List[int], Tuple[int, ...], int]) -> List[Tuple[int, List[int]]]:
+    bank_path, indices, variants, cache_size = task
+    deals = load_deal_bank(Path(bank_path))
+    results = []
+    for index in indices:
+        values = [UNSOLVED] * len(VARIANTS)
+        for variant in variants:
+            # A fresh table per deal: positions rarely repeat across deals.
+            solver = EndgameSolver(max_cards=9, cache_size=cache_size)
+            values[variant] = solve_deal(deals[index], variant, solver)
+        results.append((index, values))
+    return results
+
+
+def worker_cache_size(workers: int, memory_mb: int) -> int:
+    # Splits a total memory budget over the workers' solver caches.
+    entries = memory_mb * 2**20 // (CACHE_ENTRY_BYTES * max(1, workers))
+    return max(1_000, min(MAX_CACHE_SIZE, entries))
+
+
+def default_chunk_size(pending: int, workers: int) -> int:
+    # One 9-card deal takes 16-295 s per variant on one core, so chunks stay
+    # small enough for about four per worker and the last ones finish together.
+    return max(1, min(8, pending // (4 * max(1, workers))))
+
+
+def build_par_table(
+    bank_path: Path,
+    par_path: Path,
+    workers: int = 1,
+    chunk_size: Optional[int] = None,
+    variants: Optional[Sequence[int]] = None,
+    cache_size: Optional[int] = None,
+    memory_mb: int = 4096,
+    start_method: Optional[str] = None,
+    verbose: bool = False,
+) -> int:
+    # Solves every open cell in chunks of deals; each finished chunk is written
+    # and flushed, so an interrupted run resumes where it stopped. Returns the
+    # number of deals solved in this call. Without `cache_size` the solver
+    # caches of all workers share `memory_mb`; without `chunk_size` it follows
+    # the worker count. Expected cost: 16-295 s per variant and 9-card deal on
+    # one core, i.e. roughly 25-500 core-hours for 1000 deals in all six variants.
+    variants = tuple(range(len(VARIANTS))) if variants is None else tuple(variants)
+    deals = load_deal_bank(bank_path)
+    table = open_par_table(par_path, len(deals))
+    pending = [
+        idx for idx in range(len(deals)) if (table[idx, list(variants)] == UNSOLVED).any()
+    ]
+    if cache_size is None:
+        cache_size = worker_cache_size(workers, memory_mb)
+    if chunk_size is None:
+        chunk_size = default_chunk_size(len(pending), workers)
+    tasks = [
+        (str(bank_path), pending[pos : pos + chunk_size], variants, cache_size)
+        for pos in range(0, len(pending), chunk_size)
+    ]
+    started = time.perf_counter()
+    solved = 0
+    context = mp.get_context(start_method)
+    with context.Pool(workers) as pool:
+        for results in pool.imap_unordered(_solve_chunk, tasks):
+            for index, values in results:
+                for variant in variants:
+                    table[index, variant] = values[variant]
+            table.flush()
+            solved += len(results)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"solved {solved}/{len(pending)} deals in {elapsed:.1f}s")
+    return solved
+
+
+class ParTable:
+    # Read-only, memory-mapped par lookup for evaluation and reporting.
+
+    def __init__(self, path: Path) -> None:
+        self.values = np.load(Path(path), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def par(self, deal_index: int, mode: str, trump_suit: Optional[str] = None) -> int:
+        value = int(self.values[deal_index, variant_index(mode, trump_suit)])
+        if value == UNSOLVED:
+            raise KeyError(f"deal {deal_index} has no par for {mode}/{trump_suit}")
+        return value
+
+    def solved(self) -> int:
+        return int((self.values != UNSOLVED).all(axis=1).sum())
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Double-dummy par database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="write a deal bank")
+    generate.add_argument("bank")
+    generate.add_argument("--deals", type=int, default=1000)
+    generate.add_argument("--seed", type=int, default=0)
+    solve = commands.add_parser("solve", help="fill (or resume) a par table")
+    solve.add_argument("bank")
+    solve.add_argument("par")
+    solve.add_argument("--workers", type=int, default=mp.cpu_count())
+    solve.add_argument("--chunk-size", type=int, help="deals per task (default: by workers)")
+    solve.add_argument("--cache-size", type=int, help="solver cache entries per worker")
+    solve.add_argument("--memory-mb", type=int, default=4096, help="cache budget of all workers")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.command == "generate":
+        save_deal_bank(Path(args.bank), generate_deals(args.deals, args.seed))
+        return
+    build_par_table(
+        Path(args.bank),
+        Path(args.par),
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        cache_size=args.cache_size,
+        memory_mb=args.memory_mb,
+        verbose=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.cards import ALL_CARDS, Card, MODE_TRUMP
+from core.game import play_round
+from core.legal_moves import RuleSet
+from core.state import GameState
+
+from .ismcts import ISMCTSAgent, SearchStats, best_move
+from .anytime import LatencyStats
+from .position import SearchPosition
+
+AgentFactory = Callable[..., Any]
+
+
+def _worker(conn, factory: AgentFactory, kwargs: Dict[str, Any]) -> None:
+    # Each worker owns one agent (and therefore its own trees) for its lifetime.
+    agent = factory(**kwargs)
+    while True:
+        message = conn.recv()
+        command = message[0]
+        if command == "search":
+            _, data, iterations, budget = message
+            clock = getattr(agent, "clock", time.perf_counter)
+            deadline = None if budget is None else clock() + budget
+            stats = agent.root_statistics(SearchPosition.decode(data), iterations, deadline)
+            conn.send((stats, agent.last_stats))
+        elif command == "reset":
+            agent.reset()
+        elif command == "close":
+            conn.close()
+            return
+
+
+class ParallelSearch:
+    # Root parallelisation over a persistent pool: every worker searches the
+    # same position with its own trees and sampled deals, and root visit counts
+    # are summed. Positions travel as SearchPosition.encode() bytes; only the
+    # per-move root statistics come back.
+
+    def __init__(
+        self,
+        workers: int,
+        simulations: int = 400,
+        factory: AgentFactory = ISMCTSAgent,
+        seed: int = 0,
+        ruleset: Optional[RuleSet] = None,
+        start_method: Optional[str] = None,
+        reply_margin_ms: float = 2.0,
+        **agent_kwargs: Any,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.workers = workers
+        self.simulations = simulations
+        self.ruleset = ruleset or RuleSet()
+        self.stats = SearchStats()
+        self.last_stats = SearchStats()
+        self.latency = LatencyStats()
+        # Workers stop this much before the deadline to leave time for replies.
+        self.reply_margin_ms = reply_margin_ms
+        context = mp.get_context(start_method)
+        self._conns = []
+        self._processes = []
+        for rank in range(workers):
+            parent, child = context.Pipe()
+            kwargs = dict(agent_kwargs, seed=seed + rank, ruleset=self.ruleset)
+            process = context.Process(target=_worker, args=(child, factory, kwargs), daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+
+    def __call__(self, state: GameState, player: int) -> Card:
+        return ALL_CARDS[self.search(state, player)]
+
+    def __enter__(self) -> "ParallelSearch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def search(self, state: GameState, player: int) -> int:
+        if player != state.current_player:
+            raise ValueError("not this player's turn")
+        position = SearchPosition.from_state(state, player, self.ruleset)
+        merged, _ = self.root_statistics(position)
+        return best_move(merged, position.fast_state().legal_mask())
+
+    def choose(self, state: GameState, player: int, deadline_ms: float) -> Card:
+        started = time.perf_counter()
+        if player != state.current_player:
+            raise ValueError("not this player's turn")
+        position = SearchPosition.from_state(state, player, self.ruleset)
+        remaining_ms = deadline_ms - (time.perf_counter() - started) * 1000.0
+        budget = max(0.0, remaining_ms - self.reply_margin_ms) / 1000.0
+        merged, _ = self.root_statistics(position, budget=budget, started=started)
+        return ALL_CARDS[best_move(merged, position.fast_state().legal_mask())]
+
+    def root_statistics(
+        self,
+        position: SearchPosition,
+        simulations: Optional[int] = None,
+        budget: Optional[float] = None,
+        started: Optional[float] = None,
+    ) -> Tuple[Dict[int, Tuple[int, float]], List[SearchStats]]:
+        # With a `budget` (seconds) workers search until it runs out instead of
+        # splitting a fixed number of simulations.
+        started = time.perf_counter() if started is None else started
+        data = position.encode()
+        if budget is not None:
+            for conn in self._conns:
+                conn.send(("search", data, None, budget))
+        else:
+            total = self.simulations if simulations is None else simulations
+            share, extra = divmod(total, self.workers)
+            for rank, conn in enumerate(self._conns):
+                conn.send(("search", data, share + (1 if rank < extra else 0), None))
+
+        merged: Dict[int, Tuple[int, float]] = {}
+        worker_stats: List[SearchStats] = []
+        for conn in self._conns:
+            stats, search_stats = conn.recv()
+            worker_stats.append(search_stats)
+            for card, (visits, reward) in stats.items():
+                prev_visits, prev_reward = merged.get(card, (0, 0.0))
+                merged[card] = (prev_visits + visits, prev_reward + reward)
+
+        last = SearchStats(
+            decisions=1,
+            iterations=sum(stats.iterations for stats in worker_stats),
+            nodes=sum(stats.nodes for stats in worker_stats),
+            seconds=time.perf_counter() - started,
+        )
+        self.last_stats = last
+        self.stats.add(last)
+        self.latency.record(last.seconds * 1000.0, last.iterations)
+        return merged, worker_stats
+
+    def reset(self) -> None:
+        for conn in self._conns:
+            conn.send(("reset",))
+
+    def close(self) -> None:
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._conns = []
+        self._processes = []
+
+
+def _policy_lowest(state: GameState, player: int) -> Card:
+    return min(state.legal_cards_for(player), key=lambda card: ALL_CARDS.index(card))
+
+
+def scaling_report(
+    max_workers: int, simulations: int, rounds: int = 2, seed: int = 0
+) -> List[Dict[str, float]]:
+    # Same total simulations per move for every worker count; efficiency is
+    # speedup over one worker divided by the worker count.
+    rows: List[Dict[str, float]] = []
+    baseline = 0.0
+    for workers in range(1, max_workers + 1):
+        with ParallelSearch(workers, simulations=simulations, seed=seed) as search:
+            for idx in range(rounds):
+                play_round(
+                    [search, _policy_lowest, search, _policy_lowest],
+                    MODE_TRUMP,
+                    trump_suit="rosen",
+                    seed=seed + idx,
+                )
+                search.reset()
+            seconds = search.stats.seconds
+            nodes_per_sec = search.stats.nodes_per_sec
+        if workers == 1:
+            baseline = seconds
+        speedup = baseline / seconds if seconds else 0.0
+        rows.append(
+            {
+                "workers": workers,
+                "seconds": seconds,
+                "nodes_per_sec": nodes_per_sec,
+                "speedup": speedup,
+                "efficiency": speedup / workers,
+            }
+        )
+    return rows
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Root-parallel search scaling benchmark")
+    parser.add_argument("--max-workers", type=int, default=mp.cpu_count())
+    parser.add_argument("--simulations", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    for row in scaling_report(args.max_workers, args.simulations, args.rounds, args.seed):
+        print(
+            f"workers={row['workers']:>3} seconds={row['seconds']:.2f} "
+            f"nodes/s={row['nodes_per_sec']:.0f} speedup={row['speedup']:.2f} "
+            f"efficiency={row['efficiency']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from core.beliefs import BeliefTracker
+from core.cards import ALL_CARDS, CARD_INDEX, card_mask, mask_cards
+from core.determinization import DealSampler, tracker_constraints
+from core.fast_engine import VARIANTS, FastState, variant_index
+from core.legal_moves import RuleSet
+from core.state import GameState
+
+_RULE_FIELDS = (
+    "must_follow_suit",
+    "must_trump",
+    "must_overtrump",
+    "must_trump_if_partner_winning",
+)
+
+
+@dataclass(frozen=True)
+class SearchPosition:
+    # Everything a searching player knows: its own hand and the public play
+    # history. Encodes to ~50 bytes for shipping to worker processes.
+    variant: int
+    player: int
+    leader: int
+    hand: int
+    plays: Tuple[Tuple[int, int], ...]
+    team_points: Tuple[int, int]
+    rules: RuleSet = RuleSet()
+
+    @classmethod
+    def from_state(
+        cls, state: GameState, player: int, ruleset: Optional[RuleSet] = None
+    ) -> "SearchPosition":
+        plays = [
+            (seat, CARD_INDEX[card])
+            for trick in list(state.completed_tricks) + [state.trick]
+            for seat, card in trick.plays
+        ]
+        return cls(
+            variant=variant_index(state.mode, state.trump_suit),
+            player=player,
+            leader=state.leader,
+            hand=card_mask(state.hands[player]),
+            plays=tuple(plays),
+            team_points=(state.team_points[0], state.team_points[1]),
+            rules=ruleset or RuleSet(),
+        )
+
+    def encode(self) -> bytes:
+        rule_bits = sum(1 << idx for idx, name in enumerate(_RULE_FIELDS) if getattr(self.rules, name))
+        header = bytes([self.variant, self.player, self.leader, rule_bits, len(self.plays)])
+        plays = bytes(seat << 6 | card for seat, card in self.plays)
+        tail = self.hand.to_bytes(5, "little") + b"".join(
+            points.to_bytes(2, "little") for points in self.team_points
+        )
+        return header + plays + tail
+
+    @classmethod
+    def decode(cls, data: bytes) -> "SearchPosition":
+        variant, player, leader, rule_bits, count = data[:5]
+        plays = tuple((byte >> 6, byte & 63) for byte in data[5 : 5 + count])
+        tail = data[5 + count :]
+        rules = RuleSet(**{name: bool(rule_bits >> idx & 1) for idx, name in enumerate(_RULE_FIELDS)})
+        return cls(
+            variant=variant,
+            player=player,
+            leader=leader,
+            hand=int.from_bytes(tail[:5], "little"),
+            plays=plays,
+            team_points=(
+                int.from_bytes(tail[5:7], "little"),
+                int.from_bytes(tail[7:9], "little"),
+            ),
+            rules=rules,
+        )
+
+    @property
+    def tricks_played(self) -> int:
+        return len(self.plays) // 4
+
+    @property
+    def own_cards(self) -> int:
+        # Hand at the start of the round; identifies the round for tree reuse.
+        played = sum(1 << card for seat, card in self.plays if seat == self.player)
+        return self.hand | played
+
+    def hand_sizes(self) -> List[int]:
+        sizes = [9, 9, 9, 9]
+        for seat, _ in self.plays:
+            sizes[seat] -= 1
+        return sizes
+
+    def tracker(self) -> BeliefTracker:
+        mode, trump_suit = VARIANTS[self.variant]
+        tracker = BeliefTracker(mode, trump_suit, ruleset=self.rules)
+        for seat, card in self.plays:
+            tracker.record_play(seat, ALL_CARDS[card])
+        return tracker
+
+    def sampler(self) -> DealSampler:
+        return DealSampler(
+            tracker_constraints(
+                self.tracker(), self.player, mask_cards(self.hand), self.hand_sizes()
+            )
+        )
+
+    def fast_state(self, hands: Optional[List[int]] = None) -> FastState:
+        if hands is None:
+            hands = [0, 0, 0, 0]
+            hands[self.player] = self.hand
+        fast = FastState(hands, self.variant, self.leader, self.rules)
+        fast.points = list(self.team_points)
+        fast.tricks_played = self.tricks_played
+        for seat, card in self.plays[4 * self.tricks_played :]:
+            fast.add_to_trick(seat, card)
+        return fast
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from core.cards import Card, MODE_TRUMP, RANKS, SUITS
+from core.game import play_round
+from search.anytime import LatencyStats, deadline_policy
+from search.ismcts import ISMCTSAgent
+
+
+def _card_sort_key(card: Card) -> tuple[int, int]:
+    return (SUITS.index(card.suit), RANKS.index(card.rank))
+
+
+def _policy_lowest(state, player: int) -> Card:
+    legal = state.legal_cards_for(player)
+    return sorted(legal, key=_card_sort_key)[0]
+
+
+class _FakeClock:
+    # Advances one millisecond per reading, so a deadline is a number of reads.
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += 0.001
+        return self.now
+
+
+def test_choose_returns_by_deadline() -> None:
+    agent = ISMCTSAgent(seed=0, clock=_FakeClock())
+    policy = deadline_policy(agent, 15.0)
+    result = play_round([policy, _policy_lowest] * 2, MODE_TRUMP, trump_suit="rosen", seed=4)
+    assert sum(result.state.team_points) == 157
+    assert agent.stats.decisions == 18
+    summary = agent.latency.summary()
+    assert summary["moves"] == 18
+    # The search starts one reading after the deadline is set and reads once per
+    # iteration, so it never overruns the 15 ms budget.
+    assert summary["max"] == pytest.approx(15.0)
+    searched = [n for n in agent.latency.iterations if n]
+    assert searched and all(n == 13 for n in searched)
+
+
+def test_choose_wall_clock_stays_near_budget() -> None:
+    agent = ISMCTSAgent(seed=0)
+    policy = deadline_policy(agent, 15.0)
+    started = time.perf_counter()
+    play_round([policy, _policy_lowest] * 2, MODE_TRUMP, trump_suit="rosen", seed=4)
+    assert agent.latency.summary()["mean_iterations"] > 0
+    # Generous bound: 18 moves of 15 ms plus slack for slow or loaded machines.
+    assert time.perf_counter() - started < 18 * 0.015 + 10.0
+
+
+def test_latency_percentiles_and_histogram() -> None:
+    stats = LatencyStats()
+    for value in range(1, 101):
+        stats.record(float(value), value)
+    percentiles = stats.percentiles()
+    assert percentiles["p50"] == 50.0
+    assert percentiles["p95"] == 95.0
+    assert percentiles["p99"] == 99.0
+    histogram = dict(stats.histogram(buckets_ms=(10, 50)))
+    assert histogram[10] == 10
+    assert histogram[50] == 40
+    assert sum(count for _, count in stats.histogram()) == 100
@@ -0,0 +1,77 @@
+import random
+
+from core.beliefs import BeliefTracker
+from core.cards import ALL_CARDS, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, SUITS, Card, make_deck
+from core.legal_moves import RuleSet, legal_cards
+from core.state import GameState
+
+
+def _brute_force_exclusions(card, trick, mode, trump_suit, partner_is_winning, ruleset):
+    excluded = 0
+    for idx, other in enumerate(ALL_CARDS):
+        if other == card:
+            continue
+        legal = legal_cards(
+            [card, other],
+            trick,
+            mode,
+            trump_suit=trump_suit,
+            partner_is_winning=partner_is_winning,
+            ruleset=ruleset,
+        )
+        if card not in legal:
+            excluded |= 1 << idx
+    return excluded
+
+
+def test_exclusions_match_legal_cards() -> None:
+    rng = random.Random(0)
+    rulesets = [
+        RuleSet(),
+        RuleSet(must_trump_if_partner_winning=True),
+        RuleSet(must_overtrump=False),
+        RuleSet(must_follow_suit=False),
+        RuleSet(must_trump=False),
+    ]
+    for _ in range(500):
+        ruleset = rng.choice(rulesets)
+        mode = rng.choice([MODE_TRUMP, MODE_OBEABE, MODE_UNEUFE])
+        trump_suit = rng.choice(SUITS) if mode == MODE_TRUMP else None
+        deck = make_deck()
+        rng.shuffle(deck)
+        leader = rng.randrange(4)
+        trick_size = rng.randint(1, 3)
+        tracker = BeliefTracker(mode, trump_suit, ruleset=ruleset)
+        state = GameState(hands=[[], [], [], []], mode=mode, trump_suit=trump_suit, leader=leader)
+        for offset in range(trick_size):
+            tracker.record_play((leader + offset) % 4, deck[offset])
+            state.trick.plays.append(((leader + offset) % 4, deck[offset]))
+        player = state.current_player
+        card = deck[trick_size]
+        partner_is_winning = state.current_winning_player() == state.partner(player)
+        expected = _brute_force_exclusions(
+            card, state.trick.cards, mode, trump_suit, partner_is_winning, ruleset
+        )
+        assert tracker.exclusions(player, card) == expected
+
+
+def test_tracker_records_void_and_removes_played_cards() -> None:
+    tracker = BeliefTracker(MODE_TRUMP, "rosen")
+    tracker.record_play(0, Card("schilten", "6"))
+    tracker.record_play(1, Card("eicheln", "A"))
+    assert tracker.is_void(1, "schilten")
+    assert tracker.is_void(1, "rosen")
+    assert not tracker.may_hold(1, Card("rosen", "J"))
+    assert not tracker.may_hold(2, Card("schilten", "6"))
+    assert tracker.may_hold(2, Card("rosen", "J"))
+    assert not tracker.is_void(2, "schilten")
+
+
+def test_undertrump_reveals_missing_overtrumps() -> None:
+    tracker = BeliefTracker(MODE_TRUMP, "rosen")
+    tracker.record_play(0, Card("rosen", "A"))
+    tracker.record_play(1, Card("rosen", "6"))
+    assert not tracker.may_hold(1, Card("rosen", "J"))
+    assert not tracker.may_hold(1, Card("rosen", "9"))
+    assert tracker.may_hold(1, Card("rosen", "K"))
+    assert not tracker.is_void(1, "rosen")
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from core.cards import ALL_CARDS, MODE_TRUMP, SUITS, Card
+from core.fast_engine import VARIANTS, FastState
+from core.legal_moves import RuleSet
+from env.jass_aec_env import JassAECEnv
+from rl.single_agent_env import policy_bidding
+from search.bidding_advisor import BiddingAdvisor, estimate_push_value, greedy_playout
+
+
+def _relabel(hand, permutation):
+    return [Card(permutation[card.suit], card.rank) for card in hand]
+
+
+def test_greedy_playout_distributes_all_points() -> None:
+    rng = random.Random(0)
+    deck = list(range(36))
+    for variant in range(len(VARIANTS)):
+        rng.shuffle(deck)
+        hands = [sum(1 << card for card in deck[idx * 9 : (idx + 1) * 9]) for idx in range(4)]
+        state = FastState(hands, variant, rng.randrange(4), RuleSet())
+        assert sum(greedy_playout(state)) == 157
+        assert state.is_terminal and not any(state.hands)
+
+
+def test_push_value_is_mean_best_value_after_push() -> None:
+    advisor = BiddingAdvisor(samples=4, seed=2)
+    rng = random.Random(2)
+    best = [max(advisor.advise(rng.sample(list(ALL_CARDS), 9), can_push=False).values.values())]
+    best.append(max(advisor.mode_values(rng.sample(list(ALL_CARDS), 9), leader=2).values()))
+    assert estimate_push_value(hands=2, samples=4, seed=2) == pytest.approx(sum(best) / 2)
+
+
+def test_suit_relabelling_shares_cache_entry(tmp_path) -> None:
+    rng = random.Random(1)
+    hand = rng.sample(list(ALL_CARDS), 9)
+    shuffled = list(SUITS)
+    rng.shuffle(shuffled)
+    permutation = dict(zip(SUITS, shuffled))
+
+    advisor = BiddingAdvisor(samples=8, seed=0, cache_path=tmp_path / "advice.json")
+    values = advisor.mode_values(hand)
+    relabelled = advisor.mode_values(_relabel(hand, permutation))
+    assert (advisor.hits, advisor.misses) == (1, 1)
+    for suit in SUITS:
+        assert relabelled[(MODE_TRUMP, permutation[suit])] == values[(MODE_TRUMP, suit)]
+
+    advisor.save()
+    restored = BiddingAdvisor(samples=8, cache_path=tmp_path / "advice.json")
+    assert restored.mode_values(hand) == values
+    assert restored.misses == 0
+
+
+def test_push_only_when_allowed() -> None:
+    hand = list(ALL_CARDS[:9])
+    advisor = BiddingAdvisor(samples=4, seed=0, push_value=200.0)
+    assert advisor.advise(hand).push
+    advice = advisor.advise(hand, can_push=False)
+    assert not advice.push
+    assert advice.values[(advice.best.mode, advice.best.trump_suit)] == advice.best_value
+
+
+def test_env_policy_bids_from_dealt_hands() -> None:
+    env = JassAECEnv(seed=3, enable_weis=False)
+    env.reset()
+    dealt = [env.dealt_hand(player) for player in range(4)]
+    policy = policy_bidding(BiddingAdvisor(samples=4, seed=0))
+    while env.phase == "bidding":
+        agent = env.agent_selection
+        action = policy(env, agent)
+        assert env.observe(agent)["action_mask"][action] == 1
+        env.step(action)
+    assert env.state.hands == dealt
+
+
+def test_cache_file_with_other_settings_is_not_reused(tmp_path) -> None:
+    hand = list(ALL_CARDS[:9])
+    path = tmp_path / "advice.json"
+    advisor = BiddingAdvisor(samples=8, seed=0, cache_path=path)
+    advisor.mode_values(hand)
+    advisor.save()
+
+    for other in (
+        BiddingAdvisor(samples=16, cache_path=path),
+        BiddingAdvisor(samples=8, rules=RuleSet(must_overtrump=False), cache_path=path),
+    ):
+        assert other.cache == {}
+        with pytest.raises(ValueError):
+            other.load(path)
+    assert BiddingAdvisor(samples=8, cache_path=path).cache == advisor.cache
+
+
+def test_estimate_depends_on_leader() -> None:
+    hand = list(ALL_CARDS[:9])
+    advisor = BiddingAdvisor(samples=8, seed=0)
+    chooser_leads = advisor.mode_values(hand, leader=0)
+    partner_leads = advisor.mode_values(hand, leader=2)
+    assert advisor.misses == 2
+    assert chooser_leads != partner_leads
+    assert advisor.advise(hand, can_push=False).values == partner_leads
@@ -0,0 +1,71 @@
+import pickle
+import threading
+from pathlib import Path
+
+from rl.checkpoint_cache import CheckpointCache
+
+
+class _Loader:
+    def __init__(self) -> None:
+        self.loaded = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, path: Path) -> str:
+        self.release.wait(timeout=5)
+        self.loaded.append(path)
+        return path.stem
+
+
+def _stem(path: Path) -> str:
+    return path.stem
+
+
+def test_cache_evicts_least_recently_used_entry() -> None:
+    loader = _Loader()
+    cache = CheckpointCache(loader, max_entries=2)
+    a, b, c = Path("a.zip"), Path("b.zip"), Path("c.zip")
+    assert cache.get(a) == "a" and cache.get(b) == "b"
+    assert cache.get(a) == "a"
+    cache.get(c)
+    assert a in cache and c in cache and b not in cache
+    assert cache.get(b) == "b"
+    assert loader.loaded == [a, b, c, b]
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.loads) == (1, 4, 2, 4)
+    assert stats.hit_rate == 0.2
+
+
+def test_cache_respects_byte_budget_but_keeps_latest_entry() -> None:
+    cache = CheckpointCache(_Loader(), size=lambda value: 10 * len(value), max_entries=None, max_bytes=25)
+    cache.prefetch(Path("a.zip"))
+    cache.prefetch(Path("b.zip"))
+    assert len(cache) == 2 and cache.bytes == 20
+    cache.prefetch(Path("c.zip"))
+    assert len(cache) == 2 and Path("a.zip") not in cache
+    cache.get(Path("large.zip"))
+    assert len(cache) == 1 and cache.bytes == 50
+    assert cache.stats.evictions == 3
+
+
+def test_background_prefetch_is_shared_with_get() -> None:
+    loader = _Loader()
+    loader.release.clear()
+    cache = CheckpointCache(loader, background=True)
+    path = Path("a.zip")
+    cache.prefetch(path)
+    cache.prefetch(path)
+    assert path not in cache
+    loader.release.set()
+    assert cache.get(path) == "a"
+    cache.close()
+    assert loader.loaded == [path]
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.loads) == (1, 0, 1)
+
+
+def test_pickled_cache_starts_empty() -> None:
+    cache = CheckpointCache(_stem, max_entries=3)
+    cache.get(Path("a.zip"))
+    copy = pickle.loads(pickle.dumps(cache))
+    assert len(copy) == 0 and copy.max_entries == 3
+    assert copy.get(Path("b.zip")) == "b"
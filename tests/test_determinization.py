@@ -0,0 +1,130 @@
+import itertools
+import random
+
+import pytest
+
+from core.cards import MODE_OBEABE, MODE_TRUMP, card_mask, make_deck, mask_cards
+from core.determinization import DealSampler, determinize, infer_constraints, sample_deals
+from core.legal_moves import legal_cards
+from core.rankings import winning_card
+from core.state import GameState, Trick, TrickResult
+
+
+def _play_until(mode, trump_suit, seed, plays):
+    rng = random.Random(seed)
+    deck = make_deck()
+    rng.shuffle(deck)
+    state = GameState(
+        hands=[deck[i * 9 : (i + 1) * 9] for i in range(4)], mode=mode, trump_suit=trump_suit
+    )
+    for _ in range(plays):
+        player = state.current_player
+        state.play_card(player, rng.choice(state.legal_cards_for(player)))
+        if len(state.trick.plays) == 4:
+            cards = state.trick.cards
+            winning = winning_card(cards, state.trick.led_suit, mode, trump_suit)
+            winner = next(p for p, c in state.trick.plays if c == winning)
+            state.completed_tricks.append(
+                TrickResult(plays=list(state.trick.plays), winner=winner, points=0, last_trick=False)
+            )
+            state.trick = Trick()
+            state.trick_index += 1
+            state.leader = winner
+    return state
+
+
+def _history_is_legal(state, hands):
+    held = [set(hand) for hand in hands]
+    for trick in list(state.completed_tricks) + [state.trick]:
+        for _, card in trick.plays:
+            for seat, other in trick.plays:
+                if other == card:
+                    held[seat].add(card)
+    for trick in list(state.completed_tricks) + [state.trick]:
+        cards = []
+        for seat, card in trick.plays:
+            partner_winning = False
+            if cards:
+                winning = winning_card(cards, cards[0].suit, state.mode, state.trump_suit)
+                partner_winning = trick.plays[cards.index(winning)][0] == (seat + 2) % 4
+            legal = legal_cards(
+                held[seat], cards, state.mode, state.trump_suit, partner_is_winning=partner_winning
+            )
+            if card not in legal:
+                return False
+            held[seat].discard(card)
+            cards.append(card)
+    return True
+
+
+def test_sampled_deals_are_consistent_with_history() -> None:
+    rng = random.Random(0)
+    for seed in range(20):
+        state = _play_until(MODE_TRUMP, "rosen", seed, plays=rng.randint(4, 30))
+        player = rng.randrange(4)
+        for deal in sample_deals(state, player, 20, rng=rng):
+            hands = [mask_cards(mask) for mask in deal]
+            assert set(hands[player]) == set(state.hands[player])
+            assert [len(hand) for hand in hands] == [len(hand) for hand in state.hands]
+            assert _history_is_legal(state, hands)
+
+
+def test_count_matches_brute_force_late_in_round() -> None:
+    for seed in range(10):
+        state = _play_until(MODE_TRUMP, "schellen", seed, plays=28)
+        player = state.current_player
+        constraints = infer_constraints(state, player)
+        sampler = DealSampler(constraints)
+
+        others = [seat for seat in range(4) if seat != player]
+        unseen = mask_cards(constraints.unseen)
+        sizes = [len(state.hands[seat]) for seat in others]
+        consistent = 0
+        for perm in set(itertools.permutations([0] * sizes[0] + [1] * sizes[1] + [2] * sizes[2])):
+            hands = [[] for _ in range(4)]
+            hands[player] = list(state.hands[player])
+            for card, slot in zip(unseen, perm):
+                hands[others[slot]].append(card)
+            consistent += _history_is_legal(state, hands)
+        assert sampler.count == consistent
+
+
+def test_sampler_is_uniform_over_small_support() -> None:
+    state = _play_until(MODE_OBEABE, None, 3, plays=30)
+    sampler = DealSampler(infer_constraints(state, 0))
+    rng = random.Random(1)
+    counts = {}
+    draws = 200 * sampler.count
+    for _ in range(draws):
+        deal = sampler.sample_mask(rng)
+        counts[deal] = counts.get(deal, 0) + 1
+    assert len(counts) == sampler.count
+    assert max(counts.values()) < 1.5 * min(counts.values())
+
+
+def test_void_is_respected() -> None:
+    rosen = [card for card in make_deck() if card.suit == "rosen"]
+    rest = [card for card in make_deck() if card.suit != "rosen"]
+    hands = [rosen[0:3] + rest[0:6], rest[6:15], rosen[3:6] + rest[15:21], rosen[6:9] + rest[21:27]]
+    state = GameState(hands=hands, mode=MODE_OBEABE, trump_suit=None)
+    state.play_card(0, rosen[0])
+    state.play_card(1, rest[6])
+    constraints = infer_constraints(state, 0)
+    assert constraints.allowed[1] & card_mask(rosen) == 0
+    for seed in range(20):
+        determinized = determinize(state, 0, rng=random.Random(seed))
+        assert all(card.suit != "rosen" for card in determinized.hands[1])
+        assert determinized.hands[0] == state.hands[0]
+
+
+def test_inconsistent_sizes_rejected() -> None:
+    state = _play_until(MODE_OBEABE, None, 4, plays=5)
+    constraints = infer_constraints(state, 0)
+    broken = type(constraints)(
+        player=0,
+        allowed=constraints.allowed,
+        hand_sizes=(9, 9, 9, 9),
+        unseen=constraints.unseen,
+    )
+    with pytest.raises(ValueError):
+        DealSampler(broken)
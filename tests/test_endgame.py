@@ -0,0 +1,81 @@
+import random
+
+from core.cards import MODE_TRUMP, Card, RANKS, SUITS
+from core.fast_engine import FastState, iter_bits
+from core.game import play_round
+from search.endgame import EndgameSolver, canonical_key, endgame_policy
+
+
+def _minimax(fast):
+    if fast.tricks_played == 9:
+        return 0
+    values = []
+    for card in iter_bits(fast.legal_mask()):
+        child = fast.clone()
+        child.play(card)
+        values.append(child.points[0] - fast.points[0] + _minimax(child))
+    return max(values) if fast.current_player % 2 == 0 else min(values)
+
+
+def _endgame(rng, cards_per_hand, variant):
+    deck = list(range(36))
+    rng.shuffle(deck)
+    hands = [sum(1 << c for c in deck[i * cards_per_hand : (i + 1) * cards_per_hand]) for i in range(4)]
+    fast = FastState(hands, variant, leader=rng.randrange(4))
+    fast.tricks_played = 9 - cards_per_hand
+    return fast
+
+
+def test_solver_matches_minimax() -> None:
+    rng = random.Random(0)
+    solver = EndgameSolver(max_cards=3, cache_size=50)
+    for _ in range(60):
+        fast = _endgame(rng, rng.randint(1, 3), rng.randrange(6))
+        if rng.random() < 0.5:
+            fast.play(next(iter_bits(fast.legal_mask())))
+        assert solver.value(fast) == _minimax(fast)
+    assert solver.stats.hits > 0
+    assert len(solver.cache) <= 50
+    assert solver.stats.evictions > 0
+
+
+def test_suit_relabelling_shares_cache_entry() -> None:
+    rng = random.Random(1)
+    fast = _endgame(rng, 3, 4)
+    swapped = [
+        sum(((hand >> (s * 9)) & 511) << (p * 9) for s, p in enumerate((2, 0, 3, 1)))
+        for hand in fast.hands
+    ]
+    assert canonical_key(fast.hands, fast.leader, 4) == canonical_key(swapped, fast.leader, 4)
+    solver = EndgameSolver(max_cards=3)
+    other = FastState(swapped, 4, leader=fast.leader)
+    other.tricks_played = fast.tricks_played
+    assert solver.value(fast) == solver.value(other)
+
+
+def test_endgame_policy_finishes_round() -> None:
+    def _lowest(state, player):
+        return sorted(
+            state.legal_cards_for(player), key=lambda c: (SUITS.index(c.suit), RANKS.index(c.rank))
+        )[0]
+
+    solver = EndgameSolver(max_cards=4)
+    finisher = endgame_policy(solver, _lowest)
+    ours = theirs = 0
+    for seed in range(8):
+        result = play_round([finisher, _lowest] * 2, MODE_TRUMP, trump_suit="rosen", seed=seed)
+        assert sum(result.state.team_points) == 157
+        ours += result.state.team_points[0]
+        theirs += result.state.team_points[1]
+    assert solver.stats.misses > 0
+    assert ours > theirs
+
+
+def test_ismcts_uses_endgame_cutoff() -> None:
+    from search.ismcts import ISMCTSAgent
+
+    solver = EndgameSolver(max_cards=3)
+    agent = ISMCTSAgent(simulations=40, seed=0, endgame=solver)
+    result = play_round([agent] * 4, MODE_TRUMP, trump_suit="schilten", seed=3)
+    assert sum(result.state.team_points) == 157
+    assert solver.stats.hits + solver.stats.misses > 0
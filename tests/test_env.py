@@ -81,3 +81,135 @@ def test_play_through_game() -> None:
         env.step(int(legal_actions[0]))
 
     assert all(env.terminations.values())
+
+
+def test_belief_observation_block_tracks_voids() -> None:
+    import numpy as np
+
+    from core.beliefs import BeliefTracker
+    from env.jass_aec_env import BELIEF_OBS_SIZE, BELIEF_SEAT_SIZE
+
+    env = JassAECEnv(
+        enable_bidding=False,
+        enable_weis=False,
+        mode=MODE_TRUMP,
+        trump_suit="rosen",
+        seed=7,
+        belief_observation=True,
+    )
+    env.reset()
+    rng = np.random.default_rng(0)
+    for agent in env.agent_iter():
+        if env.terminations[agent]:
+            env.step(None)
+            continue
+        obs = env.observe(agent)
+        assert obs["beliefs"].shape == (BELIEF_OBS_SIZE,)
+
+        player = int(agent[1:])
+        expected = BeliefTracker.from_state(env.state)
+        for offset in range(1, 4):
+            seat = (player + offset) % 4
+            block = obs["beliefs"][(offset - 1) * BELIEF_SEAT_SIZE :][:BELIEF_SEAT_SIZE]
+            for idx in range(36):
+                held_by_me = obs["observation"][idx] == 1.0
+                possible = bool(expected.possible[seat] >> idx & 1) and not held_by_me
+                assert block[idx] == float(possible)
+            assert list(block[36:]) == [float(expected.voids[seat] >> i & 1) for i in range(4)]
+        env.step(int(rng.choice(np.flatnonzero(obs["action_mask"]))))
+
+
+def test_incremental_observation_matches_rebuild() -> None:
+    import random
+
+    import numpy as np
+
+    rng = random.Random(0)
+    env = JassAECEnv(seed=4)
+    expected = np.zeros(118, dtype=np.float32)
+    for episode in range(3):
+        env.reset(seed=episode)
+        while not all(env.terminations.values()):
+            for agent in env.possible_agents:
+                observed = env.observe(agent)["observation"]
+                assert np.array_equal(observed, env._compute_observation(agent, expected))
+            legal = np.flatnonzero(env.observe(env.agent_selection)["action_mask"])
+            env.step(int(rng.choice(list(legal))))
+
+
+def test_action_mask_is_built_once_per_step(monkeypatch) -> None:
+    env = JassAECEnv(enable_bidding=False, enable_weis=False, mode=MODE_TRUMP, trump_suit="rosen", seed=2)
+    env.reset()
+    calls = []
+    build = env._build_action_mask
+    monkeypatch.setattr(env, "_build_action_mask", lambda agent: calls.append(agent) or build(agent))
+
+    agent = env.agent_selection
+    mask = env.action_mask(agent)
+    assert env.observe(agent)["action_mask"] is mask
+    env.action_mask(agent)
+    assert calls == [agent]
+
+    env.step(int(mask.nonzero()[0][0]))
+    env.action_mask(agent)
+    assert calls == [agent, agent]
+    assert env.action_mask(agent).sum() == 0
+
+
+def test_snapshot_restore_replays_identically() -> None:
+    import copy
+
+    import numpy as np
+
+    def _run(env, rng, steps):
+        trace = []
+        for _ in range(steps):
+            if all(env.terminations.values()):
+                break
+            agent = env.agent_selection
+            action = int(rng.choice(np.flatnonzero(env.action_mask(agent))))
+            env.step(action)
+            trace.append((agent, action, env.observation(agent).copy(), dict(env.last_rewards)))
+        return trace
+
+    env = JassAECEnv(seed=4, belief_observation=True)
+    env.reset()
+    _run(env, np.random.default_rng(0), 13)
+    snapshot = env.snapshot()
+    expected_obs = {agent: env.observe(agent) for agent in env.agents}
+    expected_obs = copy.deepcopy(expected_obs)
+    first = _run(env, np.random.default_rng(1), 40)
+    env.restore(snapshot)
+    for agent, obs in expected_obs.items():
+        restored = env.observe(agent)
+        for key in obs:
+            assert np.array_equal(restored[key], obs[key])
+    second = _run(env, np.random.default_rng(1), 40)
+    assert len(first) == len(second)
+    for (agent, action, obs, rewards), (agent2, action2, obs2, rewards2) in zip(first, second):
+        assert (agent, action, rewards) == (agent2, action2, rewards2)
+        assert np.array_equal(obs, obs2)
+    # The snapshot is immutable and stays valid after restoring from it.
+    with pytest.raises(AttributeError):
+        snapshot.phase = "play"
+    env.restore(snapshot)
+    assert env.snapshot() == snapshot
+
+
+def test_reset_leaves_previous_state_intact() -> None:
+    env = JassAECEnv(
+        enable_bidding=False, enable_weis=False, mode=MODE_TRUMP, trump_suit="rosen", seed=2
+    )
+    env.reset()
+    for _ in range(6):
+        agent = env.agent_selection
+        env.step(int(env.observe(agent)["action_mask"].nonzero()[0][0]))
+    state = env.state
+    hands = [list(hand) for hand in state.hands]
+    points = list(state.team_points)
+    tricks = len(state.completed_tricks)
+
+    env.reset(seed=3)
+    assert env.state is not state
+    assert state.hands == hands and state.team_points == points
+    assert len(state.completed_tricks) == tricks == 1
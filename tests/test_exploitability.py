@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("sb3_contrib")
+
+from sb3_contrib import MaskablePPO
+
+from core.cards import MODE_TRUMP
+from rl.exploitability import DealResult, ExploitabilityConfig, estimate, summarize
+from rl.single_agent_env import JassSingleAgentEnv
+
+
+def _config(model_path, workers: int) -> ExploitabilityConfig:
+    return ExploitabilityConfig(
+        model_path=model_path,
+        deals=4,
+        seed=0,
+        workers=workers,
+        simulations=10,
+        chunk_size=2,
+        enable_bidding=False,
+        enable_weis=False,
+        mode=MODE_TRUMP,
+        trump_suit="rosen",
+    )
+
+
+def test_estimate_is_reproducible_across_workers(tmp_path) -> None:
+    env = JassSingleAgentEnv(seed=0, enable_bidding=False, enable_weis=False, mode=MODE_TRUMP, trump_suit="rosen")
+    model = MaskablePPO("MlpPolicy", env, seed=0, n_steps=16, batch_size=16, device="cpu")
+    model.save(tmp_path / "model.zip")
+
+    serial = estimate(_config(tmp_path / "model.zip", workers=1))
+    parallel = estimate(_config(tmp_path / "model.zip", workers=2))
+    assert serial["deals"] == parallel["deals"] == 4
+    assert serial["gain_mean"] == pytest.approx(parallel["gain_mean"])
+    assert serial["gain_ci_low"] <= serial["gain_mean"] <= serial["gain_ci_high"]
+    assert 0 <= serial["baseline_points"] <= 157
+
+
+def test_summarize_confidence_interval() -> None:
+    results = [DealResult(seed=idx, seat=idx % 4, best_response=80 + idx, baseline=70) for idx in range(5)]
+    summary = summarize(results)
+    assert summary["gain_mean"] == pytest.approx(12.0)
+    assert summary["gain_ci_low"] < 12.0 < summary["gain_ci_high"]
+
+
+def test_training_check_uses_run_settings(tmp_path, monkeypatch) -> None:
+    from rl import train_selfplay
+
+    seen = []
+    monkeypatch.setattr(
+        train_selfplay,
+        "estimate",
+        lambda config: seen.append(config) or {"gain_mean": 0.0, "gain_ci_low": 0.0, "gain_ci_high": 0.0},
+    )
+    config = train_selfplay.TrainConfig(
+        seed=0,
+        total_steps=1,
+        iterations=1,
+        steps_per_iter=1,
+        n_steps=8,
+        batch_size=8,
+        n_envs=1024,
+        vec_env="numpy",
+        device="cpu",
+        save_dir=tmp_path,
+        selfplay=False,
+        selfplay_prob=0.5,
+        enable_bidding=False,
+        mode=None,
+        trump_suit=None,
+        exploitability_deals=8,
+        exploitability_workers=3,
+        exploitability_simulations=50,
+        enable_weis=False,
+    )
+    train_selfplay._report_exploitability(config, tmp_path / "checkpoint_1.zip")
+    (checked,) = seen
+    assert (checked.workers, checked.simulations) == (3, 50)
+    assert not checked.enable_bidding and not checked.enable_weis
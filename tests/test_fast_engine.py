@@ -0,0 +1,64 @@
+import random
+
+from core.cards import ALL_CARDS, CARD_INDEX, MODE_OBEABE, MODE_TRUMP, MODE_UNEUFE, SUITS, card_mask
+from core.fast_engine import FastState, random_playout, variant_index
+from core.game import play_round
+from core.legal_moves import RuleSet
+
+
+def _random_policy(rng):
+    def _pick(state, player):
+        return rng.choice(state.legal_cards_for(player))
+
+    return _pick
+
+
+def test_fast_engine_matches_game_state() -> None:
+    rng = random.Random(0)
+    for seed in range(60):
+        mode = rng.choice([MODE_TRUMP, MODE_OBEABE, MODE_UNEUFE])
+        trump_suit = rng.choice(SUITS) if mode == MODE_TRUMP else None
+        leader = rng.randrange(4)
+        result = play_round(
+            [_random_policy(random.Random(seed))] * 4, mode, trump_suit, seed=seed, leader=leader
+        )
+
+        hands = [0, 0, 0, 0]
+        for player, card in result.play_log:
+            hands[player] |= 1 << CARD_INDEX[card]
+        fast = FastState(hands, variant_index(mode, trump_suit), leader=leader)
+        replay = play_round(
+            [_random_policy(random.Random(seed))] * 4, mode, trump_suit, seed=seed, leader=leader
+        )
+        for player, card in replay.play_log:
+            assert fast.current_player == player
+            assert fast.legal_mask() >> CARD_INDEX[card] & 1
+            fast.play(CARD_INDEX[card])
+        assert fast.is_terminal
+        assert fast.points == result.state.team_points
+
+
+def test_legal_mask_matches_legal_cards_midgame() -> None:
+    rng = random.Random(1)
+    for seed in range(40):
+        ruleset = rng.choice([RuleSet(), RuleSet(must_trump_if_partner_winning=True), RuleSet(must_overtrump=False)])
+        captured = []
+
+        def _policy(state, player, _rng=random.Random(seed)):
+            legal = state.legal_cards_for(player, ruleset)
+            fast = FastState.from_game_state(state, rules=ruleset)
+            captured.append(fast.legal_mask() == card_mask(legal))
+            return _rng.choice(legal)
+
+        play_round([_policy] * 4, MODE_TRUMP, rng.choice(SUITS), seed=seed, ruleset=ruleset)
+        assert all(captured)
+
+
+def test_random_playout_distributes_all_points() -> None:
+    rng = random.Random(2)
+    deck = list(range(len(ALL_CARDS)))
+    for variant in range(6):
+        rng.shuffle(deck)
+        hands = [sum(1 << card for card in deck[i * 9 : (i + 1) * 9]) for i in range(4)]
+        points = random_playout(FastState(hands, variant), rng)
+        assert sum(points) == 157
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip("gymnasium")
+
+from rl.fused_env import JassFusedEnv
+from rl.single_agent_env import JassSingleAgentEnv, policy_card, policy_lowest, policy_random
+
+
+def _highest_legal(state, player):
+    return state.legal_cards_for(player)[-1]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"enable_bidding": True, "enable_weis": True},
+        {"enable_bidding": True, "enable_weis": False, "starter": 1},
+        {"enable_bidding": False, "enable_weis": True},
+        {"enable_bidding": False, "enable_weis": False, "mode": "trump"},
+        {"enable_bidding": True, "enable_weis": True, "auto_forced": True, "auto_announce": True},
+        {"enable_bidding": False, "enable_weis": True, "starter": 2, "auto_forced": True,
+         "auto_forced_learner": True, "auto_announce": True},
+    ],
+)
+@pytest.mark.parametrize("opponent", ["lowest", "random", "card"])
+def test_fused_env_matches_single_agent_env(kwargs, opponent) -> None:
+    def _opponent():
+        if opponent == "random":
+            return policy_random(random.Random(7))
+        if opponent == "card":
+            return policy_card(_highest_legal)
+        return policy_lowest
+
+    reference = JassSingleAgentEnv(seed=3, opponent_policy=_opponent(), **kwargs)
+    fused = JassFusedEnv(seed=3, opponent_policy=_opponent(), **kwargs)
+    rng = np.random.default_rng(0)
+    for episode in range(6):
+        expected, _ = reference.reset(seed=11 if episode == 3 else None)
+        obs, _ = fused.reset(seed=11 if episode == 3 else None)
+        done = False
+        while not done:
+            assert np.array_equal(obs, expected)
+            mask = fused.action_masks()
+            assert np.array_equal(mask, reference.action_masks())
+            action = int(rng.choice(np.flatnonzero(mask)))
+            expected, expected_reward, expected_done, _, _ = reference.step(action)
+            obs, reward, done, _, _ = fused.step(action)
+            assert reward == expected_reward
+            assert done == expected_done
+        assert fused.state.team_points == reference.env.state.team_points
+        assert fused.state.completed_tricks == reference.env.state.completed_tricks
+
+
+def test_fused_env_samples_opponents_like_single_agent_env() -> None:
+    draws = []
+
+    def _sampler(rng):
+        draws.append(rng.random())
+        return policy_lowest
+
+    JassFusedEnv(seed=5, opponent_sampler=_sampler).reset()
+    JassSingleAgentEnv(seed=5, opponent_sampler=_sampler).reset()
+    assert draws[0] == draws[1]
@@ -0,0 +1,45 @@
+from core.cards import Card, MODE_OBEABE, MODE_TRUMP, RANKS, SUITS
+from core.game import play_round
+from search.ismcts import ISMCTSAgent
+
+
+def _card_sort_key(card: Card) -> tuple[int, int]:
+    return (SUITS.index(card.suit), RANKS.index(card.rank))
+
+
+def _policy_lowest(state, player: int) -> Card:
+    legal = state.legal_cards_for(player)
+    return sorted(legal, key=_card_sort_key)[0]
+
+
+def test_ismcts_plays_legal_round_and_reports_stats() -> None:
+    agent = ISMCTSAgent(simulations=30, seed=0)
+    result = play_round([agent, _policy_lowest] * 2, MODE_TRUMP, trump_suit="rosen", seed=1)
+    assert sum(result.state.team_points) == 157
+    assert agent.stats.decisions == 18
+    assert agent.stats.iterations > 0
+    assert agent.stats.nodes_per_sec > 0
+
+
+def test_tree_is_reused_between_decisions() -> None:
+    agent = ISMCTSAgent(simulations=200, seed=1)
+    visits = []
+
+    def _policy(state, player):
+        card = agent(state, player)
+        visits.append(agent._trees[player].root.visits - agent.last_stats.iterations)
+        return card
+
+    play_round([_policy, _policy_lowest, _policy_lowest, _policy_lowest], MODE_OBEABE, seed=3)
+    assert visits[0] == 0
+    assert any(count > 0 for count in visits[1:])
+
+
+def test_ismcts_beats_lowest_policy() -> None:
+    agent = ISMCTSAgent(simulations=100, seed=2)
+    ours = theirs = 0
+    for seed in range(6):
+        result = play_round([agent, _policy_lowest] * 2, MODE_TRUMP, trump_suit="eicheln", seed=seed)
+        ours += result.state.team_points[0]
+        theirs += result.state.team_points[1]
+    assert ours > theirs
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sb3_contrib")
+
+from env.jass_aec_env import OBS_POINTS_OFFSET
+from rl.multi_seat import MultiSeatMaskablePPO, MultiSeatVecEnv
+from rl.single_agent_env import policy_lowest
+
+
+@pytest.mark.parametrize("seats", ["all", "team"])
+def test_multi_seat_env_rewards_each_seat_its_team_points(seats) -> None:
+    rng = np.random.default_rng(0)
+    venv = MultiSeatVecEnv(3, seats=seats, seed=0, opponent_policy=policy_lowest)
+    venv.reset()
+    width = len(venv.seats)
+    finished = 0
+    while finished < 6:
+        slots = venv.acting_slots()
+        masks = venv.slot_action_masks(slots)
+        obs = venv.slot_observations(slots)
+        for row, slot in enumerate(slots):
+            table = venv.tables[slot // width]
+            seat = venv.seats[slot % width]
+            points = table.observation(f"p{seat}")[OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2]
+            expected = points if seat % 2 == 0 else points[::-1]
+            assert np.array_equal(obs[row, OBS_POINTS_OFFSET : OBS_POINTS_OFFSET + 2], expected)
+        points = [np.array(table.state.team_points) if table.state else np.zeros(2) for table in venv.tables]
+        actions = np.array([rng.choice(np.flatnonzero(mask)) for mask in masks])
+        rewards, dones, infos = venv.play(actions)
+        for index in range(len(venv.tables)):
+            rows = slice(index * width, (index + 1) * width)
+            if dones[rows].any():
+                assert dones[rows].all()
+                finished += 1
+                returns = [infos[slot]["episode"]["r"] for slot in range(index * width, (index + 1) * width)]
+                # Both seats of a team score the team's points; a round is worth 157 plus Weis.
+                if seats == "all":
+                    assert returns[0] == returns[2] and returns[1] == returns[3]
+                    assert returns[0] + returns[1] >= 157
+                else:
+                    assert returns[0] == returns[1]
+            else:
+                team_points = np.array(venv.tables[index].state.team_points) if venv.tables[index].state else 0
+                gained = team_points - points[index]
+                for k, seat in enumerate(venv.seats):
+                    assert rewards[index * width + k] == gained[seat % 2]
+
+
+def test_multi_seat_ppo_fills_one_trajectory_per_seat() -> None:
+    venv = MultiSeatVecEnv(2, seats="all", seed=0)
+    model = MultiSeatMaskablePPO("MlpPolicy", venv, n_steps=24, batch_size=48, n_epochs=1, seed=0, device="cpu")
+    model.learn(total_timesteps=400)
+    buffer = model.rollout_buffer
+    # Flattened by the last train() call: n_steps decisions for every slot.
+    assert buffer.full and len(buffer.observations) == 24 * venv.num_envs
+    assert buffer.rewards.sum() > 0
+    assert buffer.episode_starts.sum() >= 1
+    assert model.ep_info_buffer and all(info["l"] >= 9 for info in model.ep_info_buffer)
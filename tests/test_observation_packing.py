@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pettingzoo")
+pytest.importorskip("gymnasium")
+
+from env.jass_aec_env import JassAECEnv
+from env.observation_packing import PACKED_OBS_SIZE, pack_observation, unpack_observation
+from rl.single_agent_env import JassSingleAgentEnv
+
+
+def test_packed_observation_round_trips() -> None:
+    env = JassAECEnv(seed=2, packed_observation=True)
+    reference = JassAECEnv(seed=2)
+    env.reset()
+    reference.reset()
+    rng = np.random.default_rng(0)
+    while not all(env.terminations.values()):
+        for agent in env.possible_agents:
+            packed = env.observe(agent)["observation"]
+            assert packed.dtype == np.uint8 and packed.shape == (PACKED_OBS_SIZE,)
+            assert np.array_equal(unpack_observation(packed), reference.observation(agent))
+        action = int(rng.choice(np.flatnonzero(env.action_mask(env.agent_selection))))
+        env.step(action)
+        reference.step(action)
+    # Scores above 255 survive the uint16 fields.
+    obs = reference.observation("p0").copy()
+    obs[115:117] = [257, 300]
+    assert np.array_equal(unpack_observation(pack_observation(obs[None]))[0], obs)
+
+
+def test_single_agent_env_emits_packed_observations() -> None:
+    env = JassSingleAgentEnv(seed=1, packed_observation=True)
+    obs, _ = env.reset()
+    assert env.observation_space.contains(obs)
+    done = False
+    while not done:
+        obs, _, done, _, _ = env.step(int(np.flatnonzero(env.action_masks())[0]))
+        assert obs.dtype == np.uint8
+
+
+def test_packed_extractor_matches_numpy_unpacking() -> None:
+    torch = pytest.importorskip("torch")
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    from rl.packed_policy import PackedObservationExtractor, packed_policy_kwargs
+    from rl.vector_env import JassVectorEnv
+
+    venv = JassVectorEnv(8, seed=0, packed_observation=True)
+    packed = venv.reset()
+    extractor = PackedObservationExtractor(venv.observation_space)
+    features = extractor(torch.as_tensor(packed).float()).numpy()
+    assert np.array_equal(features, unpack_observation(packed))
+
+    model = sb3_contrib.MaskablePPO(
+        "MlpPolicy", venv, n_steps=8, batch_size=32, seed=0, device="cpu", policy_kwargs=packed_policy_kwargs()
+    )
+    model.learn(total_timesteps=64)
+    assert model.rollout_buffer.observations.dtype == np.uint8
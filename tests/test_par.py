@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from core.cards import MODE_OBEABE, MODE_TRUMP
+from core.fast_engine import VARIANT_INDEX
+from env.jass_aec_env import ANNOUNCE_ACTION, JassAECEnv
+from rl.single_agent_env import policy_lowest
+from search.endgame import EndgameSolver
+from search.par import (
+    UNSOLVED,
+    ParTable,
+    build_par_table,
+    deal_hands,
+    default_chunk_size,
+    generate_deals,
+    load_deal_bank,
+    open_par_table,
+    save_deal_bank,
+    solve_deal,
+    worker_cache_size,
+)
+
+
+def test_build_is_chunked_and_resumable(tmp_path) -> None:
+    bank_path = tmp_path / "bank.npy"
+    par_path = tmp_path / "par.npy"
+    save_deal_bank(bank_path, generate_deals(5, seed=0, cards_per_hand=3))
+
+    assert build_par_table(bank_path, par_path, workers=2, chunk_size=2) == 5
+    assert build_par_table(bank_path, par_path, workers=2, chunk_size=2) == 0
+
+    table = np.lib.format.open_memmap(par_path, mode="r+")
+    expected = table[3].copy()
+    table[3, 4] = UNSOLVED
+    table.flush()
+    del table
+    assert build_par_table(bank_path, par_path, workers=1, chunk_size=2) == 1
+
+    deals = load_deal_bank(bank_path)
+    par = ParTable(par_path)
+    assert par.solved() == 5
+    assert par.par(3, MODE_OBEABE) == expected[4]
+    solver = EndgameSolver(max_cards=9)
+    assert par.par(1, MODE_TRUMP, "rosen") == solve_deal(deals[1], 1, solver)
+
+
+def test_cache_and_chunks_follow_worker_count() -> None:
+    assert worker_cache_size(1, 4096) == 1_000_000
+    assert worker_cache_size(32, 4096) == 4096 * 2**20 // (400 * 32)
+    assert worker_cache_size(32, 4096) * 32 * 400 <= 4096 * 2**20
+    assert default_chunk_size(1000, 1) == 8
+    assert default_chunk_size(1000, 32) == 7
+    assert default_chunk_size(100, 32) == 1
+
+
+def test_env_plays_bank_deal() -> None:
+    deals = generate_deals(2, seed=1)
+    hands = deal_hands(deals, 1)
+    for bidding in (True, False):
+        env = JassAECEnv(seed=0, enable_bidding=bidding, mode=MODE_OBEABE)
+        env.reset(options={"hands": hands})
+        assert env.dealt_hand(2) == hands[2]
+
+
+def test_eval_points_vs_par_ignore_weis(tmp_path) -> None:
+    pytest.importorskip("sb3_contrib")
+    from rl.eval import EvalConfig, evaluate
+
+    # p0 holds every schellen card: with schellen trump team A takes all 157
+    # points whatever anyone plays, and the nine-card sequence is a big Weis.
+    # The other seats hold every third rank of the other suits (no Weis).
+    hands = [sum(1 << card for card in range(9)), 0, 0, 0]
+    for card in range(9, 36):
+        hands[1 + card % 3] |= 1 << card
+    deals = np.array([hands])
+    bank_path = tmp_path / "bank.npy"
+    par_path = tmp_path / "par.npy"
+    save_deal_bank(bank_path, deals)
+    table = open_par_table(par_path, 1)
+    table[0, VARIANT_INDEX[(MODE_TRUMP, "schellen")]] = 157
+    table.flush()
+    del table
+
+    config = EvalConfig(
+        model_path=tmp_path / "unused.zip",
+        episodes=2,
+        seed=0,
+        enable_bidding=False,
+        mode=MODE_TRUMP,
+        trump_suit="schellen",
+        deal_bank=bank_path,
+        par_table=par_path,
+        enable_weis=False,
+    )
+    def announce_weis(env, agent: str) -> int:
+        return ANNOUNCE_ACTION if env.phase == "announce" else policy_lowest(env, agent)
+
+    metrics = evaluate(config, policy=announce_weis)
+    assert metrics["avg_team_a_points"] == 157
+    assert metrics["avg_points_vs_par"] == 0
+
+    config.enable_weis = True
+    with pytest.raises(ValueError, match="card points only"):
+        evaluate(config, policy=announce_weis)
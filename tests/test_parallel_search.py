@@ -0,0 +1,37 @@
+import random
+
+from core.cards import MODE_OBEABE, MODE_TRUMP
+from core.game import play_round
+from core.legal_moves import RuleSet
+from search.parallel import ParallelSearch, _policy_lowest
+from search.position import SearchPosition
+
+
+def test_position_roundtrip() -> None:
+    captured = []
+
+    def _policy(state, player):
+        captured.append(SearchPosition.from_state(state, player, RuleSet(must_overtrump=False)))
+        return random.Random(len(captured)).choice(state.legal_cards_for(player))
+
+    play_round([_policy] * 4, MODE_TRUMP, trump_suit="rosen", seed=5)
+    for position in captured:
+        data = position.encode()
+        assert len(data) <= 5 + 36 + 9
+        assert SearchPosition.decode(data) == position
+
+
+def test_parallel_search_merges_worker_statistics() -> None:
+    with ParallelSearch(2, simulations=41, seed=0) as search:
+        visits = []
+
+        def _policy(state, player):
+            card = search(state, player)
+            visits.append(search.last_stats.iterations)
+            return card
+
+        result = play_round([_policy, _policy_lowest] * 2, MODE_OBEABE, seed=2)
+        assert sum(result.state.team_points) == 157
+        assert 41 in visits
+
+        assert search.stats.decisions == 18
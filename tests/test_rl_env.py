@@ -30,3 +30,133 @@ def test_single_agent_env_step() -> None:
         if terminated or truncated:
             break
     env.close()
+
+
+def test_single_agent_env_auto_resolves_forced_plies() -> None:
+    import numpy as np
+
+    env = JassSingleAgentEnv(seed=1, auto_forced=True, auto_forced_learner=True, auto_announce=True)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        env.reset()
+        total, steps, done = 0.0, 0, False
+        while not done:
+            mask = env.action_masks()
+            assert env.env.phase != "announce"
+            if env.env.phase == "play":
+                assert mask.sum() > 1
+            _, reward, done, _, info = env.step(int(rng.choice(np.flatnonzero(mask))))
+            total += reward
+            steps += 1
+        # Rewards of skipped plies (and Weis) still add up to the team's points.
+        assert total == info["team_points"][0] == env.env.state.team_points[0]
+        assert steps <= 10
+
+
+def test_single_agent_env_snapshot_restore() -> None:
+    import numpy as np
+
+    env = JassSingleAgentEnv(seed=2, auto_announce=True)
+    env.reset()
+    env.step(int(np.flatnonzero(env.action_masks())[0]))
+    snapshot = env.snapshot()
+
+    def _rollout():
+        rewards, done = [], False
+        while not done:
+            obs, reward, done, _, _ = env.step(int(np.flatnonzero(env.action_masks())[-1]))
+            rewards.append(reward)
+        next_obs, _ = env.reset()
+        return rewards, next_obs.copy()
+
+    first = _rollout()
+    env.restore(snapshot)
+    second = _rollout()
+    assert first[0] == second[0]
+    # The env RNG is part of the snapshot, so the next deal repeats as well.
+    assert np.array_equal(first[1], second[1])
+
+
+@pytest.mark.parametrize("env_cls", ["single", "fused"])
+def test_auto_reset_matches_explicit_reset(env_cls) -> None:
+    import numpy as np
+
+    from rl.fused_env import JassFusedEnv
+
+    cls = JassSingleAgentEnv if env_cls == "single" else JassFusedEnv
+    plain = cls(seed=4, auto_forced=True)
+    auto = cls(seed=4, auto_forced=True, auto_reset=True)
+    plain_obs, _ = plain.reset()
+    auto_obs, _ = auto.reset()
+    rounds = 0
+    while rounds < 5:
+        assert np.array_equal(plain_obs, auto_obs)
+        action = int(np.flatnonzero(plain.action_masks())[0])
+        plain_obs, plain_reward, plain_done, _, plain_info = plain.step(action)
+        auto_obs, auto_reward, auto_done, _, info = auto.step(action)
+        assert (plain_reward, plain_done) == (auto_reward, auto_done)
+        if plain_done:
+            rounds += 1
+            assert not plain_obs.any() and not info["terminal_observation"].any()
+            # The final scores come with the terminal step; auto's state has moved on.
+            assert info["team_points"] == plain_info["team_points"]
+            final = plain.env.state if env_cls == "single" else plain.state
+            assert info["team_points"] == tuple(final.team_points)
+            plain_obs, _ = plain.reset()
+            # The round auto_reset already dealt is kept, not replaced.
+            kept_obs, _ = auto.reset()
+            assert np.array_equal(kept_obs, auto_obs)
+
+
+@pytest.mark.parametrize("auto_announce", [False, True])
+def test_points_before_first_decision_are_paid_once(auto_announce) -> None:
+    # Without auto options the learner acts in every announcement and trick, so
+    # reset() earns nothing and the reward stream is the one from before
+    # pending rewards; auto_announce can score Weis during reset(), which the
+    # first step pays out.
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    paid_at_reset = 0
+    for starter in range(4):
+        for bidding in (True, False):
+            env = JassSingleAgentEnv(
+                seed=starter, starter=starter, enable_bidding=bidding, auto_announce=auto_announce
+            )
+            for _ in range(3):
+                env.reset()
+                pending = env.snapshot().pending_reward
+                assert pending == 0.0 or auto_announce
+                paid_at_reset += pending > 0
+                total, done = 0.0, False
+                while not done:
+                    action = int(rng.choice(np.flatnonzero(env.action_masks())))
+                    _, reward, done, _, info = env.step(action)
+                    total += reward
+                assert total == info["team_points"][0]
+    assert (paid_at_reset > 0) == auto_announce
+
+
+def test_instrumented_env_stats_merge_across_vec_env() -> None:
+    import numpy as np
+
+    vec_env = pytest.importorskip("stable_baselines3.common.vec_env")
+
+    from env.instrumentation import merge_stats
+
+    plain = JassSingleAgentEnv(seed=0)
+    assert "step" not in vars(plain) and "step" not in vars(plain.env)
+
+    venv = vec_env.DummyVecEnv([lambda rank=rank: JassSingleAgentEnv(seed=rank, instrument=True) for rank in range(2)])
+    venv.reset()
+    for _ in range(25):
+        masks = np.stack(venv.env_method("action_masks"))
+        venv.step(np.argmax(masks, axis=1))
+    merged = merge_stats(venv.env_method("stats"))
+    summary = merged.summary()
+    assert summary["agent_steps"] == 50
+    assert summary["bidding_steps"] > 0 and summary["announce_steps"] > 0 and summary["play_steps"] > 0
+    assert summary["opponent_calls"] > 0 and summary["resolve_trick_calls"] > 0
+    assert summary["agent_seconds"] >= summary["engine_seconds"] > 0
+    single = venv.env_method("stats", indices=[0])[0]
+    assert merged.phase_steps["play"] > single.phase_steps["play"]
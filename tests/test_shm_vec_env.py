@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("stable_baselines3")
+
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from rl.shm_vec_env import ShmVecEnv
+from rl.single_agent_env import JassSingleAgentEnv
+
+
+def _env_fns(count: int):
+    return [lambda rank=rank: JassSingleAgentEnv(seed=rank) for rank in range(count)]
+
+
+def test_shm_vec_env_matches_dummy_vec_env() -> None:
+    reference = DummyVecEnv(_env_fns(3))
+    venv = ShmVecEnv(_env_fns(3))
+    try:
+        rng = np.random.default_rng(0)
+        obs, expected_obs = venv.reset(), reference.reset()
+        done_seen = False
+        for _ in range(40):
+            masks = np.stack(venv.env_method("action_masks"))
+            assert np.array_equal(masks, np.stack(reference.env_method("action_masks")))
+            assert np.array_equal(obs, expected_obs)
+            actions = np.argmax(rng.random(masks.shape) * masks, axis=1)
+            obs, rewards, dones, infos = venv.step(actions)
+            expected_obs, expected_rewards, expected_dones, expected_infos = reference.step(actions)
+            assert np.array_equal(rewards, expected_rewards)
+            assert np.array_equal(dones, expected_dones)
+            for info, expected in zip(infos, expected_infos):
+                if "terminal_observation" in expected:
+                    done_seen = True
+                    assert np.array_equal(info["terminal_observation"], expected["terminal_observation"])
+        assert done_seen
+        assert venv.get_attr("opponent_policy", indices=[0])[0].__name__ == "policy_lowest"
+    finally:
+        venv.close()
+
+
+def test_shm_vec_env_batches_envs_per_worker() -> None:
+    reference = DummyVecEnv(_env_fns(5))
+    venv = ShmVecEnv(_env_fns(5), envs_per_worker=2)
+    try:
+        assert venv.num_workers == 3
+        rng = np.random.default_rng(1)
+        obs, expected_obs = venv.reset(), reference.reset()
+        for _ in range(30):
+            assert np.array_equal(obs, expected_obs)
+            masks = np.stack(venv.env_method("action_masks"))
+            actions = np.argmax(rng.random(masks.shape) * masks, axis=1)
+            obs, rewards, dones, _ = venv.step(actions)
+            expected_obs, expected_rewards, expected_dones, _ = reference.step(actions)
+            assert np.array_equal(rewards, expected_rewards)
+            assert np.array_equal(dones, expected_dones)
+        stats = venv.startup_stats()
+        assert stats["workers"] == 3
+        assert 0 <= stats["worker_start_seconds"] <= stats["ready_seconds"] <= stats["first_step_seconds"]
+        for index in range(5):
+            venv.set_attr("table", index, indices=[index])
+        assert venv.get_attr("table", indices=[4, 1, 2]) == [4, 1, 2]
+    finally:
+        venv.close()
+
+
+def test_startup_timer_reports_wrapped_vec_env(capsys) -> None:
+    from stable_baselines3.common.vec_env import VecMonitor
+
+    from rl.shm_vec_env import StartupTimer
+    from rl.train_selfplay import _report_startup
+
+    venv = VecMonitor(StartupTimer(DummyVecEnv(_env_fns(2)), ready_seconds=0.5))
+    venv.reset()
+    venv.step(np.argmax(np.stack(venv.env_method("action_masks")), axis=1))
+    stats = venv.startup_stats()
+    assert stats["workers"] == 2
+    # Only the reset and step round trips are added to the construction time.
+    assert 0.5 <= stats["first_step_seconds"] < 5.0
+    _report_startup(venv)
+    assert "2 workers ready in 0.50s" in capsys.readouterr().out
+
+
+def test_training_workers_receive_only_env_spec_and_index(monkeypatch) -> None:
+    import functools
+    import pickle
+    import sys
+
+    pytest.importorskip("sb3_contrib")
+    from rl.train_selfplay import EnvSpec, TrainConfig, _parse_args, _WorkerEnv
+
+    monkeypatch.setattr(sys, "argv", ["train", "--seed", "7", "--fused-env", "--no-weis"])
+    config = _parse_args()
+    spec = EnvSpec.from_config(config)
+    assert (spec.seed, spec.fused_env, spec.enable_weis) == (7, True, False)
+
+    env_fns = [_WorkerEnv(spec, rank) for rank in range(3)]
+    payload = pickle.dumps(env_fns[:2])
+    assert TrainConfig.__name__.encode() not in payload
+    assert payload.count(EnvSpec.__name__.encode()) == 1
+    reference = DummyVecEnv([functools.partial(spec.build, 7 + rank) for rank in range(3)])
+    venv = ShmVecEnv(env_fns, envs_per_worker=2)
+    try:
+        obs = venv.reset()
+        assert np.array_equal(obs, reference.reset())
+        for _ in range(12):
+            actions = np.argmax(venv.action_masks(), axis=1)
+            obs, rewards, dones, _ = venv.step(actions)
+            ref_obs, ref_rewards, ref_dones, _ = reference.step(actions)
+            assert np.array_equal(obs, ref_obs) and np.array_equal(rewards, ref_rewards)
+    finally:
+        venv.close()
+
+
+@pytest.mark.parametrize("transport", ["shm", "subproc"])
+def test_workers_draw_checkpoint_opponents_after_add(transport, tmp_path) -> None:
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+
+    from rl.train_selfplay import (
+        EnvSpec,
+        OpponentPool,
+        _WorkerEnv,
+        push_opponents,
+        worker_cache_stats,
+    )
+
+    spec = EnvSpec(seed=3, enable_bidding=False)
+    model = sb3_contrib.MaskablePPO(
+        "MlpPolicy", spec.build(), n_steps=8, batch_size=8, device="cpu"
+    )
+    model.save(tmp_path / "checkpoint.zip")
+    env_fns = [_WorkerEnv(spec, rank) for rank in range(2)]
+    if transport == "shm":
+        venv = ShmVecEnv(env_fns, envs_per_worker=2)
+    else:
+        venv = SubprocVecEnv(env_fns, start_method="forkserver")
+    pool = OpponentPool(selfplay_prob=1.0)
+    # The parent's copy draws the same checkpoint in-process as reference.
+    reference = DummyVecEnv(
+        [lambda rank=rank: spec.build(3 + rank, pool.sample_policy) for rank in range(2)]
+    )
+    lowest = DummyVecEnv([lambda rank=rank: spec.build(3 + rank) for rank in range(2)])
+    try:
+        assert worker_cache_stats(venv) == []
+        pool.add(tmp_path / "checkpoint.zip")
+        push_opponents(venv, pool)
+        venv.seed(0)
+        reference.seed(0)
+        lowest.seed(0)
+        obs, ref_obs, low_obs = venv.reset(), reference.reset(), lowest.reset()
+        differs = False
+        for _ in range(20):
+            assert np.array_equal(obs, ref_obs)
+            differs |= not np.array_equal(obs, low_obs)
+            obs, ref_obs, low_obs = (
+                env.step(np.argmax(np.stack(env.env_method("action_masks")), axis=1))[0]
+                for env in (venv, reference, lowest)
+            )
+        assert differs
+        workers = worker_cache_stats(venv)
+        assert len(workers) == (1 if transport == "shm" else 2)
+        # Each worker process loaded the checkpoint once for all of its envs.
+        assert all(stats.loads == 1 and stats.hits > 0 for stats in workers)
+    finally:
+        venv.close()
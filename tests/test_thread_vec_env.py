@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("stable_baselines3")
+
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from rl import thread_vec_env
+from rl.single_agent_env import JassSingleAgentEnv
+from rl.thread_vec_env import ThreadVecEnv
+
+
+@pytest.mark.parametrize("force_threads", [True, False])
+def test_thread_vec_env_matches_dummy_vec_env(force_threads, monkeypatch) -> None:
+    # Without force_threads the env must detect the GIL and step sequentially.
+    monkeypatch.setattr(thread_vec_env, "gil_enabled", lambda: True)
+    env_fns = [lambda rank=rank: JassSingleAgentEnv(seed=rank) for rank in range(5)]
+    venv = ThreadVecEnv(env_fns, envs_per_thread=2, force_threads=force_threads)
+    reference = DummyVecEnv(env_fns)
+    assert venv.threaded == force_threads
+    assert venv.num_threads == (3 if force_threads else 1)
+    rng = np.random.default_rng(0)
+    try:
+        obs = venv.reset()
+        assert np.array_equal(obs, reference.reset())
+        for _ in range(40):
+            masks = venv.action_masks()
+            assert np.array_equal(masks, np.stack(reference.env_method("action_masks")))
+            actions = np.argmax(rng.random(masks.shape) * masks, axis=1)
+            obs, rewards, dones, infos = venv.step(actions)
+            ref_obs, ref_rewards, ref_dones, ref_infos = reference.step(actions)
+            assert np.array_equal(obs, ref_obs)
+            assert np.array_equal(rewards, ref_rewards)
+            assert np.array_equal(dones, ref_dones)
+            for index in np.flatnonzero(dones):
+                assert np.array_equal(infos[index]["terminal_observation"], ref_infos[index]["terminal_observation"])
+                assert infos[index]["team_points"] == ref_infos[index]["team_points"]
+        assert venv.get_attr("auto_reset") == [False] * 5
+    finally:
+        venv.close()
+
+
+def test_seeded_thread_vec_env_with_shared_opponent_is_reproducible(tmp_path) -> None:
+    # All envs draw from one pool and share the loaded model across threads;
+    # each env samples with its own RNG, so two seeded runs agree step by step.
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    from rl.train_selfplay import OpponentPool
+
+    model = sb3_contrib.MaskablePPO(
+        "MlpPolicy", JassSingleAgentEnv(seed=0), n_steps=8, batch_size=8, device="cpu"
+    )
+    model.save(tmp_path / "checkpoint.zip")
+    pool = OpponentPool(selfplay_prob=0.5)
+    pool.add(tmp_path / "checkpoint.zip")
+
+    def run() -> list:
+        env_fns = [
+            lambda rank=rank: JassSingleAgentEnv(seed=rank, opponent_sampler=pool.sample_policy)
+            for rank in range(6)
+        ]
+        venv = ThreadVecEnv(env_fns, envs_per_thread=2, force_threads=True)
+        rng = np.random.default_rng(1)
+        try:
+            trace = [venv.reset()]
+            for _ in range(30):
+                masks = venv.action_masks()
+                obs, rewards, dones, _ = venv.step(np.argmax(rng.random(masks.shape) * masks, axis=1))
+                trace += [obs, rewards, dones]
+        finally:
+            venv.close()
+        return trace
+
+    first, second = run(), run()
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+    assert pool.cache.stats.hits > 0
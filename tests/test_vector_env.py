@@ -0,0 +1,274 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("stable_baselines3")
+
+from core.cards import MODE_TRUMP
+from core.legal_moves import RuleSet
+from env.jass_aec_env import JassAECEnv
+from rl.single_agent_env import JassSingleAgentEnv, policy_lowest
+from rl.vector_env import JassVectorEnv, batch_policy_lowest
+
+
+def _reference(venv: JassVectorEnv, index: int, **kwargs) -> JassSingleAgentEnv:
+    env = JassSingleAgentEnv(opponent_policy=policy_lowest, **kwargs)
+    env.env.ruleset = venv.ruleset
+    options = {"hands": venv.table_deal(index)}
+    if not venv.enable_bidding:
+        mode, trump_suit = venv.table_mode(index)
+        options.update(mode=mode, trump_suit=trump_suit)
+    env.reset(options=options)
+    return env
+
+
+@pytest.mark.parametrize(
+    "kwargs, ruleset",
+    [
+        ({"enable_bidding": True, "enable_weis": True}, RuleSet()),
+        ({"enable_bidding": False, "enable_weis": True}, RuleSet(must_trump_if_partner_winning=True)),
+        ({"enable_bidding": False, "enable_weis": False, "mode": MODE_TRUMP}, RuleSet(must_overtrump=False)),
+    ],
+)
+def test_vector_env_matches_single_agent_env(kwargs, ruleset) -> None:
+    rng = np.random.default_rng(0)
+    venv = JassVectorEnv(8, seed=1, ruleset=ruleset, **kwargs)
+    obs = venv.reset()
+    references = [_reference(venv, idx, **kwargs) for idx in range(venv.num_envs)]
+    finished = 0
+    for _ in range(60):
+        masks = venv.action_masks()
+        actions = np.zeros(venv.num_envs, dtype=np.int64)
+        for idx, env in enumerate(references):
+            assert np.array_equal(masks[idx], env.action_masks())
+            assert np.array_equal(obs[idx], env.env.observation("p0"))
+            legal = np.flatnonzero(masks[idx])
+            actions[idx] = rng.choice(legal)
+        obs, rewards, dones, infos = venv.step(actions)
+        for idx, env in enumerate(references):
+            ref_obs, ref_reward, terminated, _, _ = env.step(int(actions[idx]))
+            assert rewards[idx] == ref_reward
+            assert dones[idx] == terminated
+            if terminated:
+                finished += 1
+                assert np.array_equal(infos[idx]["terminal_observation"], ref_obs)
+                references[idx] = _reference(venv, idx, **kwargs)
+    assert finished >= venv.num_envs
+
+
+class _AECReference:
+    # Plays one table on JassAECEnv itself: policy_lowest on p1-p3 and every p0
+    # reward summed per learner decision, including points scored before the
+    # first one.
+
+    def __init__(self, venv: JassVectorEnv, index: int, **kwargs) -> None:
+        self.env = JassAECEnv(starter=int(venv.starter[index]), **kwargs)
+        self.env.ruleset = venv.ruleset
+        options = {"hands": venv.table_deal(index)}
+        if not venv.enable_bidding:
+            mode, trump_suit = venv.table_mode(index)
+            options.update(mode=mode, trump_suit=trump_suit)
+        self.env.reset(options=options)
+        self.pending = self._advance()
+
+    def _advance(self) -> float:
+        reward = 0.0
+        while self.env.agent_selection != "p0" and not self.env.terminations["p0"]:
+            agent = self.env.agent_selection
+            self.env.step(policy_lowest(self.env, agent))
+            reward += self.env.last_rewards.get("p0", 0.0)
+        return reward
+
+    def step(self, action: int):
+        reward, self.pending = self.pending, 0.0
+        self.env.step(action)
+        reward += self.env.last_rewards.get("p0", 0.0)
+        if not self.env.terminations["p0"]:
+            reward += self._advance()
+        return reward, self.env.terminations["p0"]
+
+
+@pytest.mark.parametrize(
+    "starter, rotate, kwargs",
+    [
+        (1, False, {"enable_bidding": True, "enable_weis": True}),
+        (3, False, {"enable_bidding": False, "enable_weis": True}),
+        ([0, 1, 2, 3, 1, 2], True, {"enable_bidding": True, "enable_weis": True}),
+    ],
+)
+def test_vector_env_matches_aec_env_with_starters(starter, rotate, kwargs) -> None:
+    rng = np.random.default_rng(2)
+    venv = JassVectorEnv(6, seed=4, starter=starter, rotate_starter=rotate, **kwargs)
+    obs = venv.reset()
+    references = [_AECReference(venv, idx, **kwargs) for idx in range(venv.num_envs)]
+    returns = np.zeros(venv.num_envs)
+    starters = [set() for _ in range(venv.num_envs)]
+    finished = 0
+    for _ in range(70):
+        masks = venv.action_masks()
+        for idx, reference in enumerate(references):
+            starters[idx].add(reference.env.starter)
+            assert np.array_equal(obs[idx], reference.env.observation("p0"))
+            assert np.array_equal(masks[idx], reference.env.action_mask("p0"))
+        actions = np.array([rng.choice(np.flatnonzero(mask)) for mask in masks])
+        obs, rewards, dones, _ = venv.step(actions)
+        returns += rewards
+        for idx, reference in enumerate(references):
+            reward, terminated = reference.step(int(actions[idx]))
+            assert rewards[idx] == reward
+            assert dones[idx] == terminated
+            if terminated:
+                # Every point of the round reached the learner.
+                assert returns[idx] == reference.env.state.team_points[0]
+                returns[idx] = 0.0
+                finished += 1
+                references[idx] = _AECReference(venv, idx, **kwargs)
+    assert finished >= venv.num_envs
+    assert all(len(seen) > 1 for seen in starters) == rotate
+
+
+def test_points_scored_during_reset_are_paid_on_next_step() -> None:
+    class _BonusOnDeal(JassVectorEnv):
+        # Stands in for points scored before the learner's first decision.
+        def _start_round(self, idx):
+            super()._start_round(idx)
+            self.team_points[idx, 0] += 7
+
+    venv = _BonusOnDeal(4, seed=0, enable_bidding=False, enable_weis=False)
+    venv.reset()
+    assert venv.pending_reward.tolist() == [7.0] * 4
+    returns = np.zeros(4)
+    for _ in range(9):
+        points = venv.team_points[:, 0].copy()
+        _, rewards, dones, _ = venv.step(np.argmax(venv.action_masks(), axis=1))
+        returns += rewards
+    # The returns add up to the final team points, bonus included.
+    assert dones.all() and returns.tolist() == (points + rewards).tolist()
+    assert venv.pending_reward.tolist() == [7.0] * 4
+
+
+def test_vector_env_trains_with_maskable_ppo() -> None:
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    venv = JassVectorEnv(4, seed=0, opponent_policy="random")
+    model = sb3_contrib.MaskablePPO("MlpPolicy", venv, n_steps=16, batch_size=32, seed=0, device="cpu")
+    model.learn(total_timesteps=64)
+
+
+def test_vector_env_batches_sampled_opponents_per_policy() -> None:
+    batches = {"a": [], "b": []}
+
+    def _counting(name):
+        def _policy(observations, masks):
+            batches[name].append(len(masks))
+            return batch_policy_lowest(observations, masks)
+
+        return _policy
+
+    policies = [_counting("a"), _counting("b")]
+    draws = iter(range(10_000))
+    venv = JassVectorEnv(8, seed=3, opponent_sampler=lambda rng: policies[next(draws) % 2])
+    reference = JassVectorEnv(8, seed=3)
+    obs, expected = venv.reset(), reference.reset()
+    for _ in range(20):
+        assert np.array_equal(obs, expected)
+        actions = np.argmax(venv.action_masks(), axis=1)
+        obs, rewards, dones, _ = venv.step(actions)
+        expected, expected_rewards, _, _ = reference.step(actions)
+        assert np.array_equal(rewards, expected_rewards)
+    # Half of the tables play each policy; every call covers a whole group.
+    assert max(batches["a"]) > 1 and max(batches["b"]) > 1
+    assert max(batches["a"] + batches["b"]) <= 4
+
+
+def test_opponent_pool_shares_one_batch_policy_per_checkpoint(tmp_path) -> None:
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    from rl.train_selfplay import OpponentPool
+
+    model = sb3_contrib.MaskablePPO("MlpPolicy", JassVectorEnv(2, seed=0), n_steps=8, batch_size=16, device="cpu")
+    model.save(tmp_path / "checkpoint.zip")
+    pool = OpponentPool(selfplay_prob=1.0)
+    rng = np.random.default_rng(0)
+    assert pool.sample_batch_policy(rng) is batch_policy_lowest
+    pool.add(tmp_path / "checkpoint.zip")
+    policy = pool.sample_batch_policy(rng)
+    assert pool.sample_batch_policy(rng) is policy
+    venv = JassVectorEnv(4, seed=0, opponent_sampler=pool.sample_batch_policy)
+    venv.reset()
+    for _ in range(12):
+        venv.step(np.argmax(venv.action_masks(), axis=1))
+    # Loaded once on add; draws after that are cache hits.
+    assert pool.cache.stats.loads == 1 and pool.cache.stats.misses == 0
+    assert pool.cache.stats.hits > 0
+
+
+def test_opponent_pool_loads_at_most_once_per_episode(tmp_path) -> None:
+    # More checkpoints than cache slots: an episode holds the model it drew
+    # instead of looking it up (and reloading it) on every opponent move.
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    from rl.train_selfplay import OpponentPool
+
+    model = sb3_contrib.MaskablePPO("MlpPolicy", JassVectorEnv(2, seed=0), n_steps=8, batch_size=16, device="cpu")
+    pool = OpponentPool(selfplay_prob=1.0, max_models=1)
+    for index in range(3):
+        model.save(tmp_path / f"checkpoint_{index}.zip")
+        pool.add(tmp_path / f"checkpoint_{index}.zip")
+    assert pool.cache.stats.loads == 3 and len(pool.cache) == 1
+
+    env = JassSingleAgentEnv(seed=0, opponent_sampler=pool.sample_policy)
+    for episode in range(4):
+        env.reset()
+        done = False
+        while not done:
+            done = env.step(int(np.flatnonzero(env.action_masks())[0]))[2]
+        assert pool.cache.stats.loads <= 3 + episode + 1
+
+    venv = JassVectorEnv(4, seed=0, opponent_sampler=pool.sample_batch_policy)
+    loads = pool.cache.stats.loads
+    episodes = venv.num_envs
+    venv.reset()
+    for _ in range(30):
+        episodes += int(venv.step(np.argmax(venv.action_masks(), axis=1))[2].sum())
+    assert pool.cache.stats.loads - loads <= episodes
+
+
+def test_seeded_reset_reseeds_random_opponents() -> None:
+    # Built with different seeds, reseeded alike: same deals and opponent moves.
+    envs = [JassVectorEnv(4, seed=seed, opponent_policy="random") for seed in (0, 1)]
+    observations = []
+    for venv in envs:
+        venv.seed(5)
+        obs = [venv.reset()]
+        for _ in range(30):
+            obs.append(venv.step(np.argmax(venv.action_masks(), axis=1))[0])
+        observations.append(np.stack(obs))
+    assert np.array_equal(observations[0], observations[1])
+
+
+def test_get_attr_returns_rows_of_table_state() -> None:
+    venv = JassVectorEnv(3, seed=0)
+    venv.reset()
+    assert venv.get_attr("trick_index", [1]) == [venv.trick_index[1]]
+    assert np.array_equal(venv.get_attr("team_points")[2], venv.team_points[2])
+    assert venv.get_attr("starter") == [0, 0, 0]
+    venv.set_attr("starter", 1, [0])
+    assert venv.starter.tolist() == [1, 0, 0]
+    venv.set_attr("rotate_starter", True, [0])
+    assert venv.rotate_starter is True
+
+
+def test_unused_opponent_slots_are_released() -> None:
+    # A sampler returning a new object per draw must not grow the registry.
+    def fresh_policy(rng):
+        return lambda observations, masks: batch_policy_lowest(observations, masks)
+
+    venv = JassVectorEnv(4, seed=0, opponent_sampler=fresh_policy)
+    reference = JassVectorEnv(4, seed=0)
+    obs, expected = venv.reset(), reference.reset()
+    for _ in range(60):
+        assert np.array_equal(obs, expected)
+        actions = np.argmax(venv.action_masks(), axis=1)
+        obs = venv.step(actions)[0]
+        expected = reference.step(actions)[0]
+        assert len(venv._policy_slots) <= venv.num_envs
+        assert len(venv._policies) <= 2 * venv.num_envs + 1
+    live = {id(venv._policies[slot]) for slot in venv.policy_slot}
+    assert set(venv._policy_slots) == live